@@ -3,8 +3,17 @@ from ._constants import *
 from ._params import Form, Param
 from ._image_models import (ImageModel, SlicesModel, VolumeModel,
                             EmptySlicesModel, EmptyVolumeModel)
+from ._chunked import (ChunkedVolume, ChunkedVolumeModel, writeChunkedVolume,
+                       convertToChunked)
 from ._table_models import (TableModel, SlicesTableModel, ColumnInfo, ListModel,
                             TableConfig, ColumnConfig, EmptyTableModel,
                             SimpleTableModel)
-from ._picking import (Micrograph, Coordinate, PickerModel, PickerCmpModel,
-                       parseTextCoordinates)
+from ._masks import BitMask, RLEMask, MaskHistory
+from ._picking import (Micrograph, Coordinate, CoordinatesIndex, ScoreIndex,
+                       PickerModel, PickerCmpModel, extractBoxes)
+from ._picking_io import (readTextCoordinates, readCsvCoordinates,
+                          readBinaryCoordinates, writeTextCoordinates,
+                          writeCsvCoordinates, writeBinaryCoordinates,
+                          getCoordinatesColumns, loadCoordinates,
+                          importCoordinates, exportCoordinates,
+                          parseTextCoordinates)
@@ -0,0 +1,446 @@
+import os
+import json
+import zlib
+import itertools
+import threading
+
+import numpy as np
+
+from ..utils import LRUCache
+from ._image_models import ImageModel, VolumeModel
+
+
+# Name of the header file inside the volume directory
+CHUNKED_HEADER = 'volume.json'
+CHUNKED_VERSION = 1
+
+COMPRESSION_ZLIB = 'zlib'
+
+
+def _readHeader(path):
+    """ Read the JSON header of the chunked volume in the given directory """
+    headerPath = os.path.join(path, CHUNKED_HEADER)
+    if not os.path.exists(headerPath):
+        raise Exception("Not a chunked volume: '%s'" % path)
+    with open(headerPath) as f:
+        return json.load(f)
+
+
+def _getLevelShape(shape, level):
+    """ Return the shape of the volume downsampled by the given factor """
+    return tuple(-(-s // level) for s in shape)
+
+
+def _getChunkPath(path, level, index):
+    """ Return the path of the file of the chunk with the (z, y, x) index """
+    return os.path.join(path, str(level), '%d_%d_%d.chunk' % tuple(index))
+
+
+class _ChunkStore:
+    """ Load the chunks of one level of a chunked volume, keeping the last
+    used ones in a memory-budgeted :class:`LRUCache`. """
+    def __init__(self, path, header, level, cache):
+        if level not in header['levels']:
+            raise Exception("Level %s not found in chunked volume '%s'"
+                            % (level, path))
+        self.path = path
+        self.level = level
+        self.shape = _getLevelShape(header['shape'], level)
+        self.chunks = tuple(header['chunks'])
+        self.dtype = np.dtype(header['dtype'])
+        self.compression = header.get('compression')
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    def getChunkShape(self, index):
+        """ Return the shape of the chunk with the given index, that is smaller
+        than the others at the end of each axis. """
+        return tuple(min(c, s - i * c)
+                     for i, c, s in zip(index, self.chunks, self.shape))
+
+    def getChunk(self, index):
+        """ Return the array of the chunk with the given (z, y, x) index """
+        key = self.path, self.level, tuple(index)
+        with self._lock:
+            chunk = self._cache.get(key)
+        if chunk is None:
+            chunkPath = _getChunkPath(self.path, self.level, index)
+            if self.compression == COMPRESSION_ZLIB:
+                with open(chunkPath, 'rb') as f:
+                    chunk = np.frombuffer(zlib.decompress(f.read()),
+                                          dtype=self.dtype)
+            else:
+                chunk = np.fromfile(chunkPath, dtype=self.dtype)
+            chunk = chunk.reshape(self.getChunkShape(index))
+            with self._lock:
+                self._cache[key] = chunk
+        return chunk
+
+    def readRegion(self, ranges):
+        """ Read the region given by a (start, stop) range for each axis,
+        loading only the chunks that intersect it. """
+        out = np.empty([b - a for a, b in ranges], dtype=self.dtype)
+        if not out.size:
+            return out
+        chunkRanges = [range(a // c, (b - 1) // c + 1)
+                       for (a, b), c in zip(ranges, self.chunks)]
+        for index in itertools.product(*chunkRanges):
+            chunk = self.getChunk(index)
+            src, dst = [], []
+            for i, (a, b), c in zip(index, ranges, self.chunks):
+                c0 = i * c
+                lo, hi = max(a, c0), min(b, c0 + c)
+                src.append(slice(lo - c0, hi - c0))
+                dst.append(slice(lo - a, hi - a))
+            out[tuple(dst)] = chunk[tuple(src)]
+        return out
+
+    def readPoints(self, z, y, x):
+        """ Return the values at the given integer coordinates, loading each
+        chunk once. """
+        coords = [np.asarray(z, dtype=np.intp), np.asarray(y, dtype=np.intp),
+                  np.asarray(x, dtype=np.intp)]
+        out = np.empty(coords[0].shape, dtype=self.dtype)
+        flatCoords = [c.ravel() for c in coords]
+        if not out.size:
+            return out
+        nChunks = [-(-s // c) for s, c in zip(self.shape, self.chunks)]
+        ids = np.ravel_multi_index(
+            [c // n for c, n in zip(flatCoords, self.chunks)], nChunks)
+        order = np.argsort(ids, kind='stable')
+        sortedIds = ids[order]
+        starts = np.concatenate(
+            ([0], np.flatnonzero(sortedIds[1:] != sortedIds[:-1]) + 1,
+             [len(order)]))
+        flatOut = out.reshape(-1)
+        for s0, s1 in zip(starts[:-1], starts[1:]):
+            points = order[s0:s1]
+            index = np.unravel_index(sortedIds[s0], nChunks)
+            chunk = self.getChunk(index)
+            local = tuple(c[points] - i * n for c, i, n in
+                          zip(flatCoords, index, self.chunks))
+            flatOut[points] = chunk[local]
+        return out
+
+
+class ChunkedVolume:
+    """ Read-only 3D array-like object for volumes stored in the chunked
+    format written by :func:`writeChunkedVolume`.
+
+    Only the chunks that intersect the requested region are loaded, and the
+    last used chunks are kept in a cache with a memory budget, so volumes
+    larger than the memory can be browsed. It supports integer and slice
+    indexing, indexing with three integer arrays, and np.transpose (which
+    returns a view of the same chunks), so it can be used as the data of a
+    :class:`VolumeModel`.
+    """
+    def __init__(self, path, level=1, cacheBytes=1 << 31):
+        """ Open the chunked volume in the given directory.
+
+        Args:
+            path:       (str) The directory of the volume.
+            level:      (int) The downsampling factor of the level to read.
+                        The levels are given when the volume is written.
+            cacheBytes: (int) Memory budget of the chunks cache.
+        """
+        self._path = path
+        self._header = _readHeader(path)
+        self._cacheBytes = cacheBytes
+        cache = LRUCache(1 << 20, maxBytes=cacheBytes,
+                         sizeFunc=lambda c: c.nbytes)
+        self._store = _ChunkStore(path, self._header, level, cache)
+        self._axes = (0, 1, 2)
+
+    def __view(self, axes):
+        """ Return a new ChunkedVolume with the same chunks and the given
+        order of the axes. """
+        view = ChunkedVolume.__new__(ChunkedVolume)
+        view.__dict__.update(self.__dict__)
+        view._axes = tuple(axes)
+        return view
+
+    @property
+    def shape(self):
+        return tuple(self._store.shape[a] for a in self._axes)
+
+    @property
+    def dtype(self):
+        return self._store.dtype
+
+    @property
+    def ndim(self):
+        return 3
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        """ Load the whole volume. """
+        data = self[:, :, :]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def transpose(self, *axes):
+        """ Return a view with the axes permuted, see np.transpose. """
+        if len(axes) == 1 and not isinstance(axes[0], int):
+            axes = axes[0]
+        if not axes:
+            axes = (2, 1, 0)
+        return self.__view(self._axes[a] for a in axes)
+
+    @property
+    def T(self):
+        return self.transpose()
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (4 - len(key)) + key[i + 1:]
+        key = key + (slice(None),) * (3 - len(key))
+        if len(key) != 3:
+            raise Exception("Too many indices for a 3D volume: %s" % str(key))
+
+        # Key for each axis of the stored volume
+        storeKey = [None] * 3
+        for k, a in zip(key, self._axes):
+            storeKey[a] = k
+
+        if all(isinstance(k, (np.ndarray, list)) for k in key):
+            return self._store.readPoints(*storeKey)
+
+        ranges, steps, drop = [], [], []
+        for a, k in enumerate(storeKey):
+            n = self._store.shape[a]
+            if isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                if step < 0:
+                    raise Exception("Negative steps are not supported")
+                stop = max(start, stop)
+            else:
+                k = int(k)
+                if k < 0:
+                    k += n
+                if not 0 <= k < n:
+                    raise IndexError("Index %d out of range for axis with "
+                                     "size %d" % (k, n))
+                start, stop, step = k, k + 1, 1
+                drop.append(a)
+            ranges.append((start, stop))
+            steps.append(step)
+
+        data = self._store.readRegion(ranges)
+        if any(s != 1 for s in steps):
+            data = data[tuple(slice(None, None, s) for s in steps)]
+        # Back to the order of the axes of this view
+        axes = [a for a in self._axes if a not in drop]
+        order = sorted(axes)
+        data = data.reshape([data.shape[a] for a in order])
+        return np.ascontiguousarray(data.transpose([order.index(a)
+                                                    for a in axes]))
+
+    def getPath(self):
+        """ Return the directory of the volume. """
+        return self._path
+
+    def getLevel(self):
+        """ Return the downsampling factor of the level that is read. """
+        return self._store.level
+
+    def getLevels(self):
+        """ Return the list of downsampling factors stored in the volume. """
+        return list(self._header['levels'])
+
+    def openLevel(self, level):
+        """ Return a new ChunkedVolume for the given level of this volume. """
+        return ChunkedVolume(self._path, level=level,
+                             cacheBytes=self._cacheBytes)
+
+    def getMinMax(self):
+        """ Return the (min, max) values stored in the header, or None. """
+        if 'min' in self._header:
+            return self._header['min'], self._header['max']
+        return None
+
+    def getSample(self, maxSize=65536):
+        """ Return a 1D sample of the values with at most maxSize values,
+        read from a few evenly spaced chunks of the full resolution level.
+        The coarser levels are averages, so their values are not used. """
+        store = (self._store if self.getLevel() == 1
+                 else self.openLevel(1)._store)
+        nChunks = [-(-s // c) for s, c in zip(store.shape, store.chunks)]
+        total = int(np.prod(nChunks))
+        ids = np.unique(np.linspace(0, total - 1, min(total, 16)).astype(int))
+        values = np.concatenate([
+            store.getChunk(np.unravel_index(i, nChunks)).ravel()
+            for i in ids])
+        if values.dtype.kind in 'fc':
+            values = values[np.isfinite(values)]
+        step = max(1, -(-values.size // maxSize))
+        return values[::step]
+
+
+def _downsample(block, level):
+    """ Average the blocks of level^3 voxels. The blocks at the end of each
+    axis can be smaller. """
+    if level == 1:
+        return block
+    data = block.astype(np.float64)
+    for axis in range(3):
+        starts = np.arange(0, data.shape[axis], level)
+        counts = np.diff(np.append(starts, data.shape[axis]))
+        data = np.add.reduceat(data, starts, axis=axis)
+        shape = [1, 1, 1]
+        shape[axis] = len(counts)
+        data /= counts.reshape(shape)
+    if block.dtype.kind in 'iu':
+        data = np.rint(data)
+    return data.astype(block.dtype)
+
+
+def writeChunkedVolume(path, data, chunks=(32, 32, 32),
+                       compression=COMPRESSION_ZLIB, levels=(1,)):
+    """ Write a 3D array in the chunked volume format, that can be read with
+    :class:`ChunkedVolume`.
+
+    The volume is stored in a directory with a small JSON header and one
+    file for each chunk of each level. The data is read chunk by chunk, so
+    it can be a memory-mapped array larger than the memory.
+
+    Args:
+        path:        (str) The output directory.
+        data:        The (z, y, x) 3D array.
+        chunks:      (z, y, x) shape of the chunks.
+        compression: COMPRESSION_ZLIB or None for raw chunks.
+        levels:      List of downsampling factors. The level 1 (the full
+                     resolution) is always written. Each voxel of a level is
+                     the average of level^3 voxels.
+
+    Returns:
+        A :class:`ChunkedVolume` for the written volume.
+    """
+    if len(data.shape) != 3:
+        raise Exception("Data array should be three-dimensional. (%s)"
+                        % str(data.shape))
+    if compression not in (None, COMPRESSION_ZLIB):
+        raise Exception("Unknown compression: '%s'" % compression)
+
+    levels = sorted(set(levels) | {1})
+    chunks = tuple(int(c) for c in chunks)
+    mn = mx = None
+    for level in levels:
+        os.makedirs(os.path.join(path, str(level)), exist_ok=True)
+        shape = _getLevelShape(data.shape, level)
+        nChunks = [-(-s // c) for s, c in zip(shape, chunks)]
+        for index in itertools.product(*[range(n) for n in nChunks]):
+            region = tuple(slice(i * c * level, (i + 1) * c * level)
+                           for i, c in zip(index, chunks))
+            block = _downsample(np.asarray(data[region]), level)
+            if level == 1 and block.size:
+                bmn, bmx = block.min(), block.max()
+                mn = bmn if mn is None else min(mn, bmn)
+                mx = bmx if mx is None else max(mx, bmx)
+            block = np.ascontiguousarray(block)
+            with open(_getChunkPath(path, level, index), 'wb') as f:
+                if compression == COMPRESSION_ZLIB:
+                    f.write(zlib.compress(block.tobytes(), 1))
+                else:
+                    block.tofile(f)
+
+    header = {
+        'version': CHUNKED_VERSION,
+        'shape': [int(s) for s in data.shape],
+        'dtype': np.dtype(data.dtype).str,
+        'chunks': list(chunks),
+        'compression': compression,
+        'levels': levels
+    }
+    if mn is not None:
+        header['min'], header['max'] = mn.item(), mx.item()
+    with open(os.path.join(path, CHUNKED_HEADER), 'w') as f:
+        json.dump(header, f, indent=2)
+
+    return ChunkedVolume(path)
+
+
+def convertToChunked(inputPath, outputPath, shape=None, dtype=None, offset=0,
+                     **kwargs):
+    """ Convert a .npy file or a raw binary file to the chunked volume
+    format. The input file is memory-mapped, so it can be larger than the
+    memory.
+
+    Args:
+        inputPath:  (str) The .npy or raw file.
+        outputPath: (str) The output directory.
+        shape:      (z, y, x) shape of the volume, required for raw files.
+        dtype:      The type of the values, required for raw files.
+        offset:     (int) Size of the header of the raw file, in bytes.
+
+    Keyword Args:
+        The arguments of :func:`writeChunkedVolume` (chunks, compression,
+        levels).
+
+    Returns:
+        A :class:`ChunkedVolume` for the written volume.
+    """
+    if inputPath.endswith('.npy'):
+        data = np.load(inputPath, mmap_mode='r')
+    else:
+        if shape is None or dtype is None:
+            raise Exception("The shape and dtype are required for raw file: "
+                            "'%s'" % inputPath)
+        data = np.memmap(inputPath, dtype=dtype, mode='r', offset=offset,
+                         shape=tuple(shape))
+    return writeChunkedVolume(outputPath, data, **kwargs)
+
+
+class ChunkedVolumeModel(VolumeModel):
+    """ :class:`VolumeModel` for volumes stored in the chunked format.
+
+    The slices are read from the chunks that they intersect (see
+    :class:`ChunkedVolume`). The min-max values are taken from the header
+    and the statistics sample from a few chunks, so the volume is not
+    scanned when it is displayed. The slabs are computed from the slices
+    they contain, without the cumulative sums of the whole volume.
+
+    Example of use:
+        convertToChunked('tomogram.npy', 'tomogram.vol', levels=(1, 4, 16))
+        model = ChunkedVolumeModel('tomogram.vol', cacheBytes=4 << 30)
+        view = VolumeView(model=model, parent=None)
+    """
+    def __init__(self, path, level=1, cacheBytes=1 << 31):
+        """ Create a new ChunkedVolumeModel.
+
+        Args:
+            path:       (str) The directory of the volume.
+            level:      (int) The downsampling factor of the level to show.
+            cacheBytes: (int) Memory budget of the chunks cache.
+        """
+        VolumeModel.__init__(self, ChunkedVolume(path, level=level,
+                                                 cacheBytes=cacheBytes),
+                             location=(0, path))
+
+    def setData(self, data):
+        """ Reimplemented from :class:`VolumeModel` to take the statistics
+        from the chunked volume. """
+        VolumeModel.setData(self, data)
+        if isinstance(data, ChunkedVolume):
+            minMax = data.getMinMax()
+            if minMax is not None:
+                self._stats['minmax'] = minMax
+            self.getSample()
+
+    def getSample(self, maxSize=65536):
+        """ Reimplemented from :class:`ImageModel` """
+        key = 'sample', maxSize
+        if isinstance(self._data, ChunkedVolume) and key not in self._stats:
+            self._stats[key] = self._data.getSample(maxSize)
+        return ImageModel.getSample(self, maxSize)
@@ -6,6 +6,12 @@ AXIS_XYZ = 3
 
 DIM_N = -1
 
+# Projections of the slices along the slices axis
+PROJECTION_MAX = 'max'
+PROJECTION_MIN = 'min'
+PROJECTION_MEAN = 'mean'
+PROJECTION_SUM = 'sum'
+
 # Basic datatype that will be used for visualization
 TYPE_BOOL = 0
 TYPE_INT = 1
@@ -32,6 +38,9 @@ PARAM_TYPE_ENUM = 'enum'
 PARAM_TYPE_BOOL = 'bool'
 PARAM_TYPE_BUTTON = 'button'
 
+# Name of the param used by PickerModel to filter coordinates by score
+PARAM_SCORE_THRESHOLD = 'scoreThreshold'
+
 PARAM_DISPLAY_DEFAULT = 'default'
 # Valid for enum type
 PARAM_DISPLAY_COMBO = 'combo'
@@ -40,3 +49,8 @@ PARAM_DISPLAY_VLIST = 'vlist'
 # Valid for int or float with range
 PARAM_DISPLAY_SLIDER = 'slider'
 
+
+# Coordinates file formats (see importCoordinates and exportCoordinates)
+COORDS_FORMAT_TEXT = 'txt'
+COORDS_FORMAT_CSV = 'csv'
+COORDS_FORMAT_BINARY = 'npz'
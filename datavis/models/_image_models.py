@@ -1,8 +1,160 @@
 
-from ._constants import AXIS_X, AXIS_Y, AXIS_Z
+from ._constants import (AXIS_X, AXIS_Y, AXIS_Z, PROJECTION_MAX,
+                         PROJECTION_MIN, PROJECTION_MEAN, PROJECTION_SUM)
 import numpy as np
 
 
+# Approximate size of the blocks of data read at once for the projections
+_CHUNK_BYTES = 1 << 26
+
+# Maximum size of the cumulative sums of the slices kept for the slabs
+_SLAB_SUMS_BYTES = 1 << 29
+
+# {mode: (reduce function, function to combine two partial results)}
+_PROJECTIONS = {
+    PROJECTION_MAX: (np.max, np.maximum),
+    PROJECTION_MIN: (np.min, np.minimum),
+    PROJECTION_MEAN: (np.sum, np.add),
+    PROJECTION_SUM: (np.sum, np.add)
+}
+
+
+def _nbytes(value):
+    """ Return the memory used by the arrays in value (an array or a tuple),
+    ignoring memory-mapped arrays. """
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, np.ndarray) and not isinstance(value, np.memmap):
+        return value.nbytes
+    return 0
+
+
+def _iterChunks(data):
+    """ Split the 3D data in blocks along the axis that varies slowest in
+    memory, so each block is a contiguous region (e.g. of a memory-mapped
+    file), even when the data is a transposed view.
+
+    Yields:
+        (region, slices, block) tuples. If the blocks are split along the
+        first axis, slices is the slice of the first axis covered by the
+        block and region is None. Otherwise, region is the (rows, columns)
+        region of the 2D projection covered by the block and slices is None.
+    """
+    strides = getattr(data, 'strides', (1, 0, 0))
+    axis = int(np.argmax([abs(st) for st in strides]))
+    n = data.shape[axis]
+    step = max(1, _CHUNK_BYTES // max(1, data.nbytes // max(1, n)))
+    for i in range(0, n, step):
+        s = slice(i, min(i + step, n))
+        index = [slice(None)] * 3
+        index[axis] = s
+        block = np.asarray(data[tuple(index)])
+        if axis == 0:
+            yield None, s, block
+        else:
+            region = [slice(None)] * 2
+            region[axis - 1] = s
+            yield tuple(region), None, block
+
+
+def _project(data, mode):
+    """ Compute the projection of the 3D data along the first axis,
+    reading the data in blocks. """
+    if mode not in _PROJECTIONS:
+        raise Exception("Invalid projection: '%s'" % mode)
+    reduceFunc, combineFunc = _PROJECTIONS[mode]
+    kwargs = dict()
+    if reduceFunc is np.sum:
+        kwargs['dtype'] = np.float64
+    result = None
+    for region, _, block in _iterChunks(data):
+        part = reduceFunc(block, axis=0, **kwargs)
+        if region is None:
+            result = part if result is None else combineFunc(result, part,
+                                                             out=result)
+        else:
+            if result is None:
+                result = np.empty(data.shape[1:], dtype=part.dtype)
+            result[region] = part
+    if mode == PROJECTION_MEAN:
+        result /= data.shape[0]
+    return result
+
+
+def _getPlaneBasis(normal, angle):
+    """ Return the (u, v) orthonormal (x, y, z) vectors of the plane with
+    the given normal, rotated angle degrees around the normal. With angle 0,
+    u is the projection of the X axis (or of the Y axis if the normal is
+    close to X) into the plane. """
+    n = np.asarray(normal, dtype=np.float64)
+    norm = np.linalg.norm(n)
+    if norm == 0:
+        raise Exception("Invalid plane normal: %s" % str(normal))
+    n = n / norm
+    ref = np.array([1., 0., 0.]) if abs(n[0]) < 0.9 else np.array([0., 1., 0.])
+    u = ref - np.dot(ref, n) * n
+    u /= np.linalg.norm(u)
+    v = np.cross(n, u)
+    a = np.radians(angle)
+    return np.cos(a) * u + np.sin(a) * v, np.cos(a) * v - np.sin(a) * u
+
+
+def _interpolate(data, x, y, z, fill):
+    """ Trilinear interpolation of the 3D (z, y, x) data at the given
+    (float32) coordinates. Points outside the volume are set to fill. """
+    nz, ny, nx = data.shape
+    result = np.full(x.shape, fill, dtype=np.float32)
+    inside = ((x >= 0) & (x <= nx - 1) & (y >= 0) & (y <= ny - 1) &
+              (z >= 0) & (z <= nz - 1))
+    x, y, z = x[inside], y[inside], z[inside]
+    if not x.size:
+        return result
+
+    # The lower corner is clipped, so points on the last voxel use fraction 1
+    x0 = np.clip(x.astype(np.intp), 0, max(nx - 2, 0))
+    y0 = np.clip(y.astype(np.intp), 0, max(ny - 2, 0))
+    z0 = np.clip(z.astype(np.intp), 0, max(nz - 2, 0))
+    fx, fy, fz = x - x0, y - y0, z - z0
+    dx, dy, dz = int(nx > 1), int(ny > 1), int(nz > 1)
+
+    if isinstance(data, np.ndarray) and data.flags.c_contiguous:
+        # Gather the corners from flat indexes, with constant offsets
+        flat = data.reshape(-1)
+        base = (z0 * ny + y0) * nx + x0
+
+        def _corner(i, j, k):
+            return flat.take(base + (k * dz * ny + j * dy) * nx + i * dx)
+    else:
+        def _corner(i, j, k):
+            return data[z0 + k * dz, y0 + j * dy, x0 + i * dx]
+
+    c00 = _corner(0, 0, 0) * (1 - fx) + _corner(1, 0, 0) * fx
+    c10 = _corner(0, 1, 0) * (1 - fx) + _corner(1, 1, 0) * fx
+    c01 = _corner(0, 0, 1) * (1 - fx) + _corner(1, 0, 1) * fx
+    c11 = _corner(0, 1, 1) * (1 - fx) + _corner(1, 1, 1) * fx
+    c0 = c00 * (1 - fy) + c10 * fy
+    c1 = c01 * (1 - fy) + c11 * fy
+    result[inside] = c0 * (1 - fz) + c1 * fz
+    return result
+
+
+def _prefixSums(data):
+    """ Return the (n+1, rows, columns) array with the cumulative sums of
+    the n slices of the data, starting with a slice of zeros. The sum of the
+    slices [i, j) is sums[j] - sums[i]. """
+    sums = np.empty((data.shape[0] + 1,) + data.shape[1:], dtype=np.float64)
+    sums[0] = 0
+    for region, s, block in _iterChunks(data):
+        if region is None:
+            out = sums[s.start + 1:s.stop + 1]
+            np.cumsum(block, axis=0, dtype=np.float64, out=out)
+            out += sums[s.start]
+        else:
+            np.cumsum(block, axis=0, dtype=np.float64,
+                      out=sums[(slice(1, None),) + region])
+    return sums
+
+
 class ImageModel:
     """ Base model class that represents 2D or 3D image binary data.
 
@@ -18,7 +170,9 @@ class ImageModel:
             data: An initial numpy array can be provided.
             location: (index, path) tuple representing the location of the data.
         """
-        self._data = self._dim = self._minmax = None
+        self._data = self._dim = None
+        # Cached statistics computed over a sample of the data
+        self._stats = dict()
         self._location = location
         self.setData(data)
 
@@ -36,10 +190,128 @@ class ImageModel:
         if self._data is None:
             return None
 
-        if self._minmax is None:
-            self._minmax = np.min(self._data), np.max(self._data)
+        if 'minmax' not in self._stats:
+            data = self._data
+            if getattr(data, 'ndim', 0) > 2:
+                # Single pass over blocks of slices, so each block is read
+                # once for both values (e.g. memory-mapped data)
+                step = max(1, (1 << 24) // max(1, data[0].nbytes))
+                blocks = [(np.min(b), np.max(b)) for b in
+                          (data[i:i + step]
+                           for i in range(0, data.shape[0], step))]
+                mn, mx = min(b[0] for b in blocks), max(b[1] for b in blocks)
+            else:
+                mn, mx = np.min(data), np.max(data)
+            self._stats['minmax'] = mn, mx
+
+        return self._stats['minmax']
+
+    def getNBytes(self):
+        """ Return the approximate memory (bytes) used by the data and the
+        cached statistics. Memory-mapped data is not counted, since it is
+        not loaded in memory. """
+        return _nbytes(self._data) + sum(_nbytes(v)
+                                         for v in self._stats.values())
+
+    def getStatistics(self):
+        """ Return the dict with the cached statistics of the data (min-max,
+        sample, histogram, levels). It can be given to
+        :meth:`setStatistics` of other models with the same values, so the
+        statistics are computed only once.
+        """
+        return self._stats
+
+    def setStatistics(self, stats):
+        """ Use the given statistics dict, returned by
+        :meth:`getStatistics` of a model with the same values (e.g. the same
+        data in another order). The dict is shared, so the statistics
+        computed later by any of the models are available to all of them.
+        The statistics are reset again when new data is set.
+        """
+        self._stats = stats
+
+    def getSample(self, maxSize=65536):
+        """ Return a strided sample of the data with at most maxSize values.
+        The same step is used along all axes. The sample is cached, so it is
+        used for the statistics of the data (histogram, levels) instead of
+        the full resolution array.
 
-        return self._minmax
+        Args:
+            maxSize: (int) Maximum number of values in the sample.
+
+        Returns:
+            A 1D numpy array with the sampled data or None if there is no data.
+        """
+        if self._data is None:
+            return None
+
+        key = 'sample', maxSize
+        if key not in self._stats:
+            data = self._data
+            shape = data.shape
+            step = int((data.size / float(maxSize)) ** (1. / len(shape)))
+            step = max(1, step)
+            while np.prod([-(-s // step) for s in shape]) > maxSize:
+                step += 1
+            sample = np.asarray(data[(slice(None, None, step),) * len(shape)])
+            sample = sample.ravel()
+            if sample.dtype.kind in 'fc':
+                sample = sample[np.isfinite(sample)]
+            self._stats[key] = sample
+
+        return self._stats[key]
+
+    def getHistogram(self, bins=500):
+        """ Return the histogram of the data, computed over the cached
+        sample (see getSample).
+
+        Args:
+            bins: (int) The number of bins. For integer data, the bins are
+                  rounded to have integer width.
+
+        Returns:
+            (values, counts) tuple of arrays, with the left edge of each bin
+            and the number of values inside it, or (None, None) if there
+            is no data.
+        """
+        sample = self.getSample()
+        if sample is None or not sample.size:
+            return None, None
+
+        key = 'histogram', bins
+        if key not in self._stats:
+            if sample.dtype.kind in 'uib':
+                mn, mx = int(sample.min()), int(sample.max())
+                step = max(1, int(np.ceil((mx - mn) / float(bins))))
+                edges = np.arange(mn, mx + step + 1, step)
+            else:
+                edges = bins
+            counts, edges = np.histogram(sample, bins=edges)
+            self._stats[key] = edges[:-1], counts
+
+        return self._stats[key]
+
+    def getLevels(self, lower=0, upper=100):
+        """ Return the display levels for the given percentiles of the data,
+        computed over the cached sample (see getSample).
+
+        Args:
+            lower: (float) Percentile of the minimum level, in [0, 100].
+            upper: (float) Percentile of the maximum level, in [0, 100].
+
+        Returns:
+            (min, max) tuple or None if there is no data.
+        """
+        sample = self.getSample()
+        if sample is None or not sample.size:
+            return None
+
+        key = 'levels', lower, upper
+        if key not in self._stats:
+            mn, mx = np.percentile(sample, (lower, upper))
+            self._stats[key] = float(mn), float(mx)
+
+        return self._stats[key]
 
     def getData(self):
         """ Return a 2D array-like object (e.g numpy array) containing
@@ -59,8 +331,8 @@ class ImageModel:
              data: Input 2D array-like object (e.g numpy array).
         """
         self._data = data
-        # Reset min-max cached value
-        self._minmax = None
+        # Reset min-max and statistics cached values
+        self._stats = dict()
         self._dim = None
 
         if self._data is not None:
@@ -118,6 +390,95 @@ class SlicesModel(ImageModel):
         """
         return ImageModel(data=self.getData(i))
 
+    def setData(self, data):
+        """ Reimplemented from :class:`ImageModel` """
+        self._prefixSums = None
+        ImageModel.setData(self, data)
+
+    def getNBytes(self):
+        """ Reimplemented from :class:`ImageModel` to count the cumulative
+        sums of the slabs. """
+        return ImageModel.getNBytes(self) + self.getSlabsNBytes()
+
+    def getSlabsNBytes(self):
+        """ Return the memory (bytes) used by the cumulative sums of the
+        slabs (see :meth:`getSlabData`), 0 if they are not computed. """
+        return _nbytes(self._prefixSums)
+
+    def getProjection(self, mode):
+        """ Return the projection of all slices. The projection is computed
+        once, reading the data in blocks (so it works with memory-mapped
+        data), and cached until the data is changed.
+
+        Args:
+            mode: PROJECTION_MAX, PROJECTION_MIN, PROJECTION_MEAN or
+                  PROJECTION_SUM
+
+        Returns:
+            A 2D array or None if there is no data. The mean and sum
+            projections are float64 arrays.
+        """
+        if self._data is None:
+            return None
+
+        # The statistics can be shared with other orders of the same data
+        # (see VolumeModel.getSlicesModel), so the key contains the layout
+        key = ('projection', mode, self._data.shape,
+               getattr(self._data, 'strides', None))
+        if key not in self._stats:
+            self._stats[key] = _project(self._data, mode)
+
+        return self._stats[key]
+
+    def getSlabData(self, i, thickness):
+        """ Return the average of the slices in a slab centered at the given
+        slice. The slab is clipped at the first and last slices.
+
+        For numpy arrays in memory, the cumulative sums of the slices are
+        computed once (and kept until the data is changed), so each slab
+        costs a single subtraction of two slices. Notice that the cumulative
+        sums are stored as float64, using twice the memory of the float32
+        slices, so they are only used if they take less than 512 MB.
+        Memory-mapped arrays, larger volumes and other
+        array-like data (e.g. a :class:`ChunkedVolume`) are not loaded
+        completely: the slices of each slab are read and averaged when it is
+        requested.
+
+        Args:
+            i:         Index of the center slice, in (0, n-1) range.
+            thickness: (int) The number of slices of the slab.
+
+        Returns:
+            A 2D float64 array.
+        """
+        if self._data is None:
+            return None
+
+        n = self._dim[2]
+        if not 0 <= i < n:
+            raise Exception("Index should be between 0 and %d" % (n - 1))
+        if thickness < 1:
+            raise Exception("Invalid slab thickness: %s" % thickness)
+
+        first = max(0, i - (thickness - 1) // 2)
+        last = min(n, first + thickness)
+        if not self.__useSlabSums():
+            return np.mean(self._data[first:last], axis=0, dtype=np.float64)
+
+        if self._prefixSums is None:
+            self._prefixSums = _prefixSums(self._data)
+        sums = self._prefixSums
+        return (sums[last] - sums[first]) / (last - first)
+
+    def __useSlabSums(self):
+        """ Return True if the slabs are computed from the cumulative sums
+        of the slices (see getSlabData). """
+        data = self._data
+        if not isinstance(data, np.ndarray) or isinstance(data, np.memmap):
+            return False
+        sumsBytes = (data.shape[0] + 1) * data[0].size * 8
+        return sumsBytes <= _SLAB_SUMS_BYTES
+
 
 class VolumeModel(ImageModel):
     """ Model for 3D volume data.
@@ -134,19 +495,36 @@ class VolumeModel(ImageModel):
             z, y, x = self._data.shape
             self._dim = x, y, z
 
+    def setData(self, data):
+        """ Reimplemented from :class:`ImageModel` """
+        # SlicesModel of each axis: {axis: SlicesModel}
+        self._slicesModels = dict()
+        ImageModel.setData(self, data)
+
+    def getNBytes(self):
+        """ Reimplemented from :class:`ImageModel` to count the caches of the
+        slices models. """
+        return ImageModel.getNBytes(self) + sum(
+            m.getSlabsNBytes() for m in self._slicesModels.values())
+
     def getSlicesModel(self, axis):
-        """ Creates a :class:`SlicesModel <datavis.models.SlicesModel>`
-        representing the data from a given axis:
+        """ Return a :class:`SlicesModel <datavis.models.SlicesModel>`
+        representing the data from a given axis. The models are created once
+        and kept until the data is changed, so their caches (e.g. the slabs)
+        are kept with the volume.
 
         Args:
             axis: Should be AXIS_X, AXIS_Y or AXIS_Z
 
         Returns:
-            A new :class:`SlicesModel <datavis.models.SlicesModel>` instance.
+            A :class:`SlicesModel <datavis.models.SlicesModel>` instance.
         """
         if self._data is None:
             return None
 
+        if axis in self._slicesModels:
+            return self._slicesModels[axis]
+
         z, y, x = (0, 1, 2)
         if axis == AXIS_Z:
             data = self._data
@@ -157,7 +535,12 @@ class VolumeModel(ImageModel):
         else:
             raise Exception("Axis should be AXIS_X, AXIS_Y or AXIS_Z")
 
-        return SlicesModel(data)
+        # The slices contain the same values, so the statistics of the volume
+        # are shared instead of computed again for each axis
+        slicesModel = SlicesModel(data)
+        slicesModel.setStatistics(self._stats)
+        self._slicesModels[axis] = slicesModel
+        return slicesModel
 
     def getSliceData(self, axis, i):
         """ Return a 2D array of the slice data.
@@ -185,6 +568,68 @@ class VolumeModel(ImageModel):
         else:
             raise Exception("Axis should be one of: AXIS_X, AXIS_Y, AXIS_Z")
 
+    def getProjection(self, axis, mode):
+        """ Return the projection of the volume along the given axis.
+        See :meth:`SlicesModel.getProjection`.
+
+        Args:
+            axis: should be AXIS_X, AXIS_Y or AXIS_Z
+            mode: PROJECTION_MAX, PROJECTION_MIN, PROJECTION_MEAN or
+                  PROJECTION_SUM
+        """
+        slicesModel = self.getSlicesModel(axis)
+        return None if slicesModel is None else slicesModel.getProjection(mode)
+
+    def getObliqueSliceData(self, center=None, normal=(0, 0, 1), angle=0,
+                            size=None, step=1.0, fill=0, blockRows=64):
+        """ Return a 2D slice of the volume along an arbitrary plane, with
+        trilinear interpolation of the voxel values.
+
+        The image is computed in blocks of rows, so the temporary arrays of
+        the interpolation are small even for big slices.
+
+        Args:
+            center:    (x, y, z) position of the center of the slice, in voxels.
+                       By default, the center of the volume.
+            normal:    (x, y, z) vector normal to the plane. By default, the
+                       Z axis (the slice is the same as in AXIS_Z).
+            angle:     (float) Rotation (degrees) of the slice around the
+                       normal.
+            size:      (width, height) of the slice in pixels. By default, the
+                       largest dimension of the volume.
+            step:      (float) Distance between the pixels, in voxels.
+            fill:      The value of the pixels outside the volume.
+            blockRows: (int) Number of rows interpolated at once.
+
+        Returns:
+            A (height, width) float32 array or None if there is no data.
+        """
+        if self._data is None:
+            return None
+
+        x, y, z = self._dim
+        if center is None:
+            center = (x - 1) / 2., (y - 1) / 2., (z - 1) / 2.
+        if size is None:
+            size = (max(self._dim),) * 2
+        w, h = int(size[0]), int(size[1])
+        u, v = _getPlaneBasis(normal, angle)
+        u, v = u * step, v * step
+        # Position of the first pixel
+        origin = (np.asarray(center, dtype=np.float64) -
+                  u * (w - 1) / 2. - v * (h - 1) / 2.)
+        cols = np.arange(w, dtype=np.float32)
+
+        result = np.empty((h, w), dtype=np.float32)
+        for r0 in range(0, h, blockRows):
+            rows = np.arange(r0, min(r0 + blockRows, h),
+                             dtype=np.float32)[:, None]
+            coords = [np.float32(origin[i]) + np.float32(u[i]) * cols +
+                      np.float32(v[i]) * rows for i in range(3)]
+            result[r0:r0 + len(rows)] = _interpolate(self._data, *coords,
+                                                     fill=fill)
+        return result
+
     def getSliceImageModel(self, axis, i):
         """ Return an :class:`ImageModel <datavis.models.ImageModel>` for
         the requested slice in the given axis.
@@ -0,0 +1,152 @@
+
+import numpy as np
+
+
+class BitMask:
+    """ Binary mask stored with 1 bit per pixel.
+
+    The rows of the mask are packed independently, so a rectangular region
+    can be expanded without expanding the whole mask.
+    """
+    def __init__(self, data):
+        """ Create a new BitMask from the given 2D array. All non-zero
+        values will be set in the mask.
+        """
+        data = np.asarray(data)
+        if data.ndim != 2:
+            raise Exception("Mask data should be two-dimensional. (%s)"
+                            % str(data.shape))
+        self._shape = data.shape
+        self._packed = np.packbits(data != 0, axis=1)
+
+    def getShape(self):
+        """ Return the (rows, columns) shape of the mask. """
+        return self._shape
+
+    def getNBytes(self):
+        """ Return the number of bytes used to store the mask. """
+        return self._packed.nbytes
+
+    def toArray(self, dtype=np.uint8):
+        """ Expand the mask to a dense array of 0 and 1 values. """
+        return self.getRegion(dtype=dtype)
+
+    def getRegion(self, rows=slice(None), cols=slice(None), dtype=np.uint8):
+        """ Expand only the given region of the mask.
+
+        Args:
+            rows: slice with the rows of the region.
+            cols: slice with the columns of the region.
+            dtype: The type of the returned array.
+
+        Returns:
+            A dense 2D array of 0 and 1 values.
+        """
+        c0, c1, _ = cols.indices(self._shape[1])
+        b0, b1 = c0 // 8, (c1 + 7) // 8
+        bits = np.unpackbits(self._packed[rows, b0:b1], axis=1)
+        return bits[:, c0 - 8 * b0:c1 - 8 * b0].astype(dtype, copy=False)
+
+
+class RLEMask:
+    """ Run-length encoded integer mask.
+
+    Masks are usually made of a few large regions, so storing the runs of
+    equal values is much smaller than the dense array. All values of the
+    mask are kept, so the dense array can be restored exactly.
+    """
+    def __init__(self, data):
+        """ Create a new RLEMask from the given 2D array. """
+        data = np.asarray(data)
+        flat = data.ravel()
+        self._shape = data.shape
+        self._dtype = data.dtype
+
+        if flat.size:
+            starts = np.concatenate(
+                ([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+            self._values = flat[starts]
+            self._lengths = np.diff(np.append(starts, flat.size)).astype(
+                np.min_scalar_type(flat.size))
+        else:
+            self._values = flat[:0].copy()
+            self._lengths = np.empty(0, dtype=np.uint8)
+
+    def getShape(self):
+        """ Return the shape of the mask. """
+        return self._shape
+
+    def getNBytes(self):
+        """ Return the number of bytes used to store the mask. """
+        return self._values.nbytes + self._lengths.nbytes
+
+    def toArray(self):
+        """ Expand the mask to a dense array with the original type. """
+        data = np.repeat(self._values, self._lengths)
+        return data.astype(self._dtype, copy=False).reshape(self._shape)
+
+
+class MaskHistory:
+    """ Undo/redo history of the edits of a mask.
+
+    The states of the mask are stored as :class:`RLEMask` snapshots.
+    """
+    def __init__(self, maxLevels=20):
+        """ Create a new MaskHistory.
+
+        Args:
+            maxLevels: (int) The maximum number of undo levels.
+        """
+        self._maxLevels = maxLevels
+        self._undo = []
+        self._redo = []
+        self._modified = False
+
+    def push(self, data):
+        """ Save the given state of the mask before it is modified. """
+        self._undo.append(RLEMask(data))
+        if len(self._undo) > self._maxLevels:
+            del self._undo[0]
+        self._redo = []
+        self._modified = True
+
+    def canUndo(self):
+        return bool(self._undo)
+
+    def canRedo(self):
+        return bool(self._redo)
+
+    def isModified(self):
+        """ Return True if the mask has been edited since the history was
+        created or cleared. """
+        return self._modified
+
+    def undo(self, data):
+        """ Return the previous state of the mask, or None if there is not.
+
+        Args:
+            data: The current state of the mask, that will be restored
+                if redo is called.
+        """
+        return self.__move(self._undo, self._redo, data)
+
+    def redo(self, data):
+        """ Return the state of the mask before the last undo, or None.
+
+        Args:
+            data: The current state of the mask.
+        """
+        return self.__move(self._redo, self._undo, data)
+
+    def clear(self):
+        """ Remove all the saved states. """
+        self._undo = []
+        self._redo = []
+        self._modified = False
+
+    def __move(self, fromList, toList, data):
+        if not fromList:
+            return None
+        toList.append(RLEMask(data))
+        self._modified = True
+        return fromList.pop().toArray()
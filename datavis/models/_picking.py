@@ -1,10 +1,13 @@
 
 import os
-from collections import namedtuple
+from collections import namedtuple, Counter
 from itertools import chain
 
+import numpy as np
+
 from ._constants import *
-from ._table_models import TableModel, ColumnConfig
+from ._table_models import TableModel, ColumnConfig, SlicesTableModel
+from ._image_models import SlicesModel
 from ._params import Param, Form
 
 
@@ -62,6 +65,8 @@ class Micrograph:
         self._path = path
         # This should be accessed only from PickerModel
         self._coordinates = []
+        # Incremented by PickerModel when coordinates are added or removed
+        self._version = 0
 
     def __len__(self):
         """ The length of the Micrograph is the number of coordinates. """
@@ -87,6 +92,139 @@ class Micrograph:
         return self._path
 
 
+class CoordinatesIndex:
+    """ Spatial index over a list of coordinates.
+
+    The (x, y) positions are stored in numpy arrays sorted by x, so the
+    coordinates that fall inside a circle can be found without iterating
+    over all of them in Python. The index is a snapshot: it should be created
+    again if the coordinates are moved, added or removed.
+    """
+    def __init__(self, coords):
+        """ Create a new index.
+
+        Args:
+            coords: An iterable over the input coordinates.
+        """
+        self._coords = list(coords)
+        n = len(self._coords)
+        xy = np.fromiter((v for c in self._coords for v in (c.x, c.y)),
+                         dtype=float, count=2 * n).reshape((n, 2))
+        self._order = np.argsort(xy[:, 0], kind='stable')
+        self._xs = xy[self._order, 0]
+        self._ys = xy[self._order, 1]
+
+    def __len__(self):
+        return len(self._coords)
+
+    def findInCircle(self, x, y, radius):
+        """ Return a numpy array with the positions (in the input list) of the
+        coordinates that are inside the circle with given center and radius.
+        """
+        lo = np.searchsorted(self._xs, x - radius, side='left')
+        hi = np.searchsorted(self._xs, x + radius, side='right')
+        dx = self._xs[lo:hi] - x
+        dy = self._ys[lo:hi] - y
+        inside = dx * dx + dy * dy <= radius * radius
+        return self._order[lo:hi][inside]
+
+    def getCoordinates(self, indexes):
+        """ Return the list of coordinates at the given positions. """
+        return [self._coords[i] for i in indexes]
+
+
+def extractBoxes(data, xs, ys, boxSize, fill=0):
+    """ Extract the square boxes centered at the given positions.
+
+    The boxes that are inside the image are gathered in a single operation
+    from a strided view of all the windows of the image (no copy of the image
+    is done). The boxes crossing the image edges are gathered with clipped
+    indexes and the outside values are set to fill.
+
+    Args:
+        data: 2D numpy array with the image data (rows are the y axis).
+        xs: Array-like with the x position of the box centers.
+        ys: Array-like with the y position of the box centers.
+        boxSize: (int) The box size.
+        fill: Value for the pixels of the boxes that are outside the image.
+
+    Returns:
+        A (n, boxSize, boxSize) numpy array with the boxes.
+    """
+    data = np.asarray(data)
+    h, w = data.shape
+    b = int(boxSize)
+    x0 = np.rint(np.asarray(xs, dtype=float)).astype(np.intp) - b // 2
+    y0 = np.rint(np.asarray(ys, dtype=float)).astype(np.intp) - b // 2
+    boxes = np.empty((len(x0), b, b), dtype=data.dtype)
+
+    inside = (x0 >= 0) & (y0 >= 0) & (x0 + b <= w) & (y0 + b <= h)
+    if inside.any():
+        s0, s1 = data.strides
+        windows = np.lib.stride_tricks.as_strided(
+            data, shape=(h - b + 1, w - b + 1, b, b),
+            strides=(s0, s1, s0, s1), writeable=False)
+        boxes[inside] = windows[y0[inside], x0[inside]]
+
+    edge = ~inside
+    if edge.any():
+        r = y0[edge, None] + np.arange(b)
+        c = x0[edge, None] + np.arange(b)
+        values = data[np.clip(r, 0, h - 1)[:, :, None],
+                      np.clip(c, 0, w - 1)[:, None, :]]
+        valid = (((r >= 0) & (r < h))[:, :, None] &
+                 ((c >= 0) & (c < w))[:, None, :])
+        boxes[edge] = np.where(valid, values, fill)
+
+    return boxes
+
+
+class ScoreIndex:
+    """ Index of coordinates sorted by their score.
+
+    Allows to count or iterate over the coordinates above (score >= threshold)
+    or below (score < threshold) a given threshold with a binary search.
+    Coordinates without score (e.g. manually picked ones) are considered above
+    any threshold. As CoordinatesIndex, it should be created again if the
+    coordinates are added, removed or their scores modified.
+    """
+    def __init__(self, coords):
+        """ Create a new index.
+
+        Args:
+            coords: An iterable over the input coordinates.
+        """
+        coords = list(coords)
+        scores = np.fromiter((getattr(c, 'score', np.inf) for c in coords),
+                             dtype=float, count=len(coords))
+        order = np.argsort(scores, kind='stable')
+        self._scores = scores[order]
+        self._coords = [coords[i] for i in order]
+
+    def __len__(self):
+        return len(self._coords)
+
+    def countBelow(self, threshold):
+        """ Return the number of coordinates with score < threshold. """
+        return int(np.searchsorted(self._scores, threshold, side='left'))
+
+    def countAbove(self, threshold):
+        """ Return the number of coordinates with score >= threshold. """
+        return len(self._coords) - self.countBelow(threshold)
+
+    def iterBelow(self, threshold):
+        """ Iterate over the coordinates with score < threshold,
+        in increasing score order.
+        """
+        return iter(self._coords[:self.countBelow(threshold)])
+
+    def iterAbove(self, threshold):
+        """ Iterate over the coordinates with score >= threshold,
+        in increasing score order.
+        """
+        return iter(self._coords[self.countBelow(threshold):])
+
+
 class PickerModel(TableModel):
     """ Handles information about Coordinates and Micrographs.
 
@@ -105,7 +243,9 @@ class PickerModel(TableModel):
         def __init__(self,
                      currentMicChanged=False,
                      currentCoordsChanged=False,
-                     tableModelChanged=False):
+                     tableModelChanged=False,
+                     changedMicIds=None,
+                     changedColumns=None):
             """ Create a new instance with the provided values.
 
             This class is used as the return of many methods from the
@@ -116,19 +256,57 @@ class PickerModel(TableModel):
                 currentMicChanged: True if the data of the micrograph changed.
                 currentCoordsChanged: True if the coordinates of the current
                     micrograph changed
-                tableModelChanged: True if the whole table with micrographs
+                tableModelChanged: True if the table with micrographs
                     info changed and should be reloaded.
+                changedMicIds: If tableModelChanged is True, the ids of the
+                    micrographs (rows) that changed. None means all rows.
+                changedColumns: The indexes of the columns that changed in
+                    the changedMicIds rows. None means all columns.
             """
             self.currentMicChanged = currentMicChanged
             self.currentCoordsChanged = currentCoordsChanged
             self.tableModelChanged = tableModelChanged
+            self.changedMicIds = None if changedMicIds is None \
+                else set(changedMicIds)
+            self.changedColumns = None if changedColumns is None \
+                else set(changedColumns)
+
+        def merge(self, other):
+            """ Update this result with the changes notified by other one,
+            so a single refresh will be enough for both operations.
+
+            Returns:
+                This result instance.
+            """
+            def _union(a, b):
+                return None if a is None or b is None else a | b
+
+            if not other.tableModelChanged:
+                pass
+            elif not self.tableModelChanged:
+                self.changedMicIds = other.changedMicIds
+                self.changedColumns = other.changedColumns
+            else:
+                self.changedMicIds = _union(self.changedMicIds,
+                                            other.changedMicIds)
+                self.changedColumns = _union(self.changedColumns,
+                                             other.changedColumns)
+
+            self.currentMicChanged |= other.currentMicChanged
+            self.currentCoordsChanged |= other.currentCoordsChanged
+            self.tableModelChanged |= other.tableModelChanged
+            return self
 
     def __init__(self, boxSize=64):
         # Allow access to micrographs both by id and by index
         self._micList = []
         self._micDict = {}
+        self._micRows = {}
         self._boxsize = boxSize
         self._lastId = 0
+        # Score threshold and score indexes: {micId: (version, ScoreIndex)}
+        self._scoreThreshold = None
+        self._scoreIndexes = dict()
 
         # Create a class for Coordinates Labels
         self.Label = namedtuple('Label', ['name', 'color'])
@@ -152,6 +330,29 @@ class PickerModel(TableModel):
         """ Return the coordinates list of a given micrograph. """
         return self.getMicrograph(micId)._coordinates
 
+    def _getCoordsVersion(self, micId):
+        """ Return a value that changes when coordinates are added to or
+        removed from the micrograph.
+        """
+        return self.getMicrograph(micId)._version
+
+    def _touchMicrograph(self, micId):
+        """ Notify that the coordinates of the micrograph were modified. """
+        self.getMicrograph(micId)._version += 1
+
+    def _getScoreIndex(self, micId):
+        """ Return the :class:`ScoreIndex <datavis.models.ScoreIndex>` of the
+        micrograph, creating it again only if its coordinates were modified.
+        """
+        version = self._getCoordsVersion(micId)
+        cached = self._scoreIndexes.get(micId)
+
+        if cached is None or cached[0] != version:
+            cached = version, ScoreIndex(self._getCoordsList(micId))
+            self._scoreIndexes[micId] = cached
+
+        return cached[1]
+
     def _nextId(self):
         """ Generates the next id. """
         self._lastId += 1
@@ -179,6 +380,10 @@ class PickerModel(TableModel):
         """ Return the micrograph at this given index. """
         return self._micList[micIndex]
 
+    def getMicrographIndex(self, micId):
+        """ Return the index (table row) of the micrograph with this ID. """
+        return self._micRows[micId]
+
     def createCoordinate(self, x, y, label, **kwargs):
         """
         Return a Coordinate object. This is the preferred way to create
@@ -214,6 +419,7 @@ class PickerModel(TableModel):
         if mic.getId() is None:
             mic.setId(self._nextId())
 
+        self._micRows[mic.getId()] = len(self._micList)
         self._micList.append(mic)
         self._micDict[mic.getId()] = mic
 
@@ -278,9 +484,80 @@ class PickerModel(TableModel):
         on parameters such as threshold, or associate different labels
         to the coordinates.
         """
-        for coord in self._getCoordsList(micId):
+        if self._scoreThreshold is None:
+            coords = self._getCoordsList(micId)
+        else:
+            coords = self.iterCoordinatesAbove(micId)
+
+        for coord in coords:
             yield coord
 
+    def getScoreThreshold(self):
+        """ Return the current score threshold or None if not set. """
+        return self._scoreThreshold
+
+    def setScoreThreshold(self, threshold):
+        """ Set the score threshold. If not None, only the coordinates with
+        score >= threshold will be returned by iterCoordinates.
+
+        Returns:
+            :class:`Result <datavis.models.PickerModel.Result>` instance
+        """
+        self._scoreThreshold = threshold
+        return self.Result(currentCoordsChanged=True, tableModelChanged=True)
+
+    def createScoreThresholdParam(self, **kwargs):
+        """ Return a :class:`Param <datavis.models.Param>` for the score
+        threshold that can be included in the form returned by getParams.
+        Changes in this param are handled by changeParam and the PickerView
+        will apply them immediately.
+
+        Keyword Args:
+            Any of the Param kwargs to override the defaults.
+        """
+        kwargs.setdefault('value', self._scoreThreshold or 0.0)
+        kwargs.setdefault('display', PARAM_DISPLAY_SLIDER)
+        kwargs.setdefault('range', (0, 1.0))
+        kwargs.setdefault('label', 'Score threshold')
+        kwargs.setdefault('help', 'Display coordinates with score above '
+                                  'this value.')
+        return Param(PARAM_SCORE_THRESHOLD, PARAM_TYPE_FLOAT, **kwargs)
+
+    def countAbove(self, micId, threshold=None):
+        """ Return the number of coordinates with score >= threshold.
+        If threshold is None, the current score threshold will be used.
+        """
+        return self._getScoreIndex(micId).countAbove(
+            self._getThreshold(threshold))
+
+    def countBelow(self, micId, threshold=None):
+        """ Return the number of coordinates with score < threshold.
+        If threshold is None, the current score threshold will be used.
+        """
+        return self._getScoreIndex(micId).countBelow(
+            self._getThreshold(threshold))
+
+    def iterCoordinatesAbove(self, micId, threshold=None):
+        """ Iterate over the coordinates with score >= threshold.
+        If threshold is None, the current score threshold will be used.
+        """
+        return self._getScoreIndex(micId).iterAbove(
+            self._getThreshold(threshold))
+
+    def iterCoordinatesBelow(self, micId, threshold=None):
+        """ Iterate over the coordinates with score < threshold.
+        If threshold is None, the current score threshold will be used.
+        """
+        return self._getScoreIndex(micId).iterBelow(
+            self._getThreshold(threshold))
+
+    def _getThreshold(self, threshold):
+        """ Return the given threshold or the current one if None. """
+        if threshold is not None:
+            return threshold
+
+        return -np.inf if self._scoreThreshold is None else self._scoreThreshold
+
     def addCoordinates(self, micId, coords):
         """ Add coordinates to a given micrograph.
 
@@ -292,9 +569,11 @@ class PickerModel(TableModel):
             :class:`Result <datavis.models.PickerModel.Result>` instance
         """
         self._getCoordsList(micId).extend(coords)
+        self._touchMicrograph(micId)
         # Only notify changes in the coordinates that are not these
-        # already added
-        return self.Result(currentCoordsChanged=False)
+        # already added, and in the row of this micrograph
+        return self.Result(currentCoordsChanged=False, tableModelChanged=True,
+                           changedMicIds=[micId])
 
     def removeCoordinates(self, micId, coords):
         """ Remove coordinates from a given micrograph.
@@ -307,13 +586,21 @@ class PickerModel(TableModel):
             :class:`Result <datavis.models.PickerModel.Result>`
             instance.
         """
+        # Remove all of them in a single pass over the micrograph coordinates
+        toRemove = Counter(coords)
         micCoords = self._getCoordsList(micId)
-        for c in coords:
-            if c in micCoords:
-                micCoords.remove(c)
+        keep = []
+        for c in micCoords:
+            if toRemove[c] > 0:
+                toRemove[c] -= 1
+            else:
+                keep.append(c)
+        micCoords[:] = keep
+        self._touchMicrograph(micId)
         # Only notify changes in the coordinates that are not these
-        # already removed
-        return self.Result(currentCoordsChanged=False)
+        # already removed, and in the row of this micrograph
+        return self.Result(currentCoordsChanged=False, tableModelChanged=True,
+                           changedMicIds=[micId])
 
     def clearMicrograph(self, micId):
         """ Remove all coordinates from this micrograph.
@@ -322,6 +609,7 @@ class PickerModel(TableModel):
             :class:`Result <datavis.models.PickerModel.Result>` instance
         """
         self._getCoordsList(micId)[:] = []
+        self._touchMicrograph(micId)
         return self.Result()
 
     def selectMicrograph(self, newMicId):
@@ -345,6 +633,12 @@ class PickerModel(TableModel):
         in one of the parameters. This method should be re-implemented
         in subclasses that want to react to changes in parameters.
 
+        If the PickerView is created with paramsWorker=True, this method is
+        called from a worker thread while the GUI thread keeps reading the
+        model (micrographs, coordinates, table values), so the
+        implementation must be thread-safe. Otherwise it is called from the
+        GUI thread.
+
         Args:
             micId: micrograph ID
             paramName: name of the parameter that generated the change
@@ -355,6 +649,9 @@ class PickerModel(TableModel):
             :class:`Result <datavis.models.PickerModel.Result>` instance
 
         """
+        if paramName == PARAM_SCORE_THRESHOLD:
+            return self.setScoreThreshold(paramValue)
+
         return self.Result()
 
     def getImageInfo(self, micId):
@@ -372,6 +669,34 @@ class PickerModel(TableModel):
         """
         return {}
 
+    def getBoxes(self, micId, boxSize=None, fill=0):
+        """ Extract the boxes around the coordinates of the micrograph.
+
+        Args:
+            micId: The micrograph ID.
+            boxSize: (int) The box size. If None, the model box size is used.
+            fill: Value for the pixels of the boxes outside the micrograph.
+
+        Returns:
+            A (n, boxSize, boxSize) numpy array with one box for each of the
+            coordinates returned by iterCoordinates.
+        """
+        coords = list(self.iterCoordinates(micId))
+        n = len(coords)
+        xs = np.fromiter((c.x for c in coords), dtype=float, count=n)
+        ys = np.fromiter((c.y for c in coords), dtype=float, count=n)
+
+        return extractBoxes(self.getData(micId), xs, ys,
+                            boxSize or self._boxsize, fill=fill)
+
+    def getBoxesModel(self, micId, boxSize=None, fill=0):
+        """ Return a :class:`SlicesTableModel <datavis.models.SlicesTableModel>`
+        with the boxes of the micrograph (See getBoxes), that can be
+        displayed in a :class:`GalleryView <datavis.views.GalleryView>`.
+        """
+        boxes = self.getBoxes(micId, boxSize=boxSize, fill=fill)
+        return SlicesTableModel(SlicesModel(boxes), 'Particle')
+
     # --------------- Methods required by TableModel ---------------------------
 
     def _loadTable(self, tableName):
@@ -406,7 +731,9 @@ class PickerModel(TableModel):
         if col == 0:  # Name
             return 'Micrograph %02d' % mic.getId()
         elif col == 1:  # Coordinates
-            return len(mic)
+            if self._scoreThreshold is None:
+                return len(mic)
+            return self.countAbove(mic.getId())
         elif col == 2:  # Id
             return mic.getId()
         else:
@@ -437,6 +764,9 @@ class PickerCmpModel(PickerModel):
         c2 = self._models[1].getMicrograph(micId)._coordinates
         return chain(c1, c2)
 
+    def _getCoordsVersion(self, micId):
+        return tuple(m._getCoordsVersion(micId) for m in self._models)
+
     def _markCoordinates(self, listA, listB, radius):
         """
         Set the labels for the given list of Coordinates according to the
@@ -474,6 +804,9 @@ class PickerCmpModel(PickerModel):
     def getMicrographByIndex(self, micIndex):
         return self._models[0].getMicrographByIndex(micIndex)
 
+    def getMicrographIndex(self, micId):
+        return self._models[0].getMicrographIndex(micId)
+
     def getParams(self):
         proximityRadius = Param('proximityRadius', 'int', value=40,
                                 display='slider', range=(0, 100),
@@ -546,28 +879,3 @@ class PickerCmpModel(PickerModel):
             return mic.getId()
         else:
             raise Exception("Invalid column value '%s'" % col)
-
-
-# FIXME: Check if this function is need at all and remove it from here
-def parseTextCoordinates(path):
-    """ Parse (x, y) coordinates from a texfile assuming
-     that the first two columns on each line are x and y.
-    """
-    with open(path) as f:
-        for line in f:
-            li = line.strip()
-            if li:
-                parts = li.strip().split()
-                size = len(parts)
-                if size == 2:  # (x, y)
-                    yield int(parts[0]), int(parts[1]), ''
-                elif size == 3:  # (x, y, label)
-                    yield int(parts[0]), int(parts[1]), str(parts[2])
-                elif size == 4:  # (x1, y1, x2, y2)
-                    yield int(parts[0]), int(parts[1]), \
-                          int(parts[2]), int(parts[3]), ''
-                elif size == 5:  # (x1, y1, x2, y2, label):
-                    yield int(parts[0]), int(parts[1]), \
-                          int(parts[2]), int(parts[3]), str(parts[4])
-                else:
-                    yield ''
@@ -0,0 +1,429 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ._constants import *
+
+
+# Names of the columns for plain text files, based on the number of columns
+_TEXT_COLUMNS = {
+    2: ('x', 'y'),
+    3: ('x', 'y', 'label'),
+    4: ('x', 'y', 'x2', 'y2'),
+    5: ('x', 'y', 'x2', 'y2', 'label')
+}
+
+# Prefix used for the columns arrays stored in the binary files
+_BIN_PREFIX = 'col_'
+
+
+def _toColumn(values):
+    """ Convert the array of strings to float if possible. """
+    try:
+        return values.astype(float)
+    except ValueError:
+        return values
+
+
+def _splitRows(lines, sep, path):
+    """ Return a 2D numpy array of strings from the given non-empty lines. """
+    if not lines:
+        return None
+
+    ncols = len(lines[0].split(sep))
+    tokens = sep.join(lines).split(sep)
+
+    if len(tokens) != ncols * len(lines):
+        raise Exception("Inconsistent number of columns in file '%s'" % path)
+
+    return np.array([t.strip() for t in tokens]).reshape((-1, ncols))
+
+
+def readTextCoordinates(path):
+    """ Read the coordinates from a text file with space separated columns.
+
+    The columns are interpreted depending on their number:
+    (x, y), (x, y, label), (x1, y1, x2, y2) or (x1, y1, x2, y2, label).
+
+    Args:
+        path: The input text file.
+
+    Returns:
+        A dict with a numpy array for each column: 'x', 'y' and optionally
+        'x2', 'y2' and 'label'.
+    """
+    with open(path) as f:
+        lines = [li for li in f.read().splitlines() if li.strip()]
+
+    if not lines:
+        return {'x': np.empty(0), 'y': np.empty(0)}
+
+    names = _TEXT_COLUMNS.get(len(lines[0].split()))
+
+    if names is None:
+        raise Exception("Invalid number of columns in file '%s'" % path)
+
+    ncols = len(names)
+    tokens = ' '.join(lines).split()
+
+    if len(tokens) != ncols * len(lines):
+        raise Exception("Inconsistent number of columns in file '%s'" % path)
+
+    if names[-1] == 'label':
+        rows = np.array(tokens).reshape((-1, ncols))
+        columns = {n: rows[:, i].astype(float)
+                   for i, n in enumerate(names[:-1])}
+        columns['label'] = rows[:, -1]
+    else:
+        rows = np.array(tokens, dtype=float).reshape((-1, ncols))
+        columns = {n: rows[:, i] for i, n in enumerate(names)}
+
+    return columns
+
+
+def readCsvCoordinates(path):
+    """ Read the coordinates from a comma separated values file.
+
+    The first line should contain the columns names, where 'x' and 'y'
+    are required. Other columns ('label', 'x2', 'y2', 'score', etc) will be
+    set as properties of the coordinates when loaded in the model.
+
+    Args:
+        path: The input csv file.
+
+    Returns:
+        A dict with a numpy array for each column.
+    """
+    with open(path) as f:
+        lines = [li for li in f.read().splitlines() if li.strip()]
+
+    if not lines:
+        raise Exception("Missing header in file '%s'" % path)
+
+    names = [n.strip() for n in lines[0].split(',')]
+
+    if 'x' not in names or 'y' not in names:
+        raise Exception("Columns 'x' and 'y' are required in file '%s'"
+                        % path)
+
+    rows = _splitRows(lines[1:], ',', path)
+
+    if rows is None:
+        return {n: np.empty(0) for n in names}
+
+    if rows.shape[1] != len(names):
+        raise Exception("Inconsistent number of columns in file '%s'" % path)
+
+    return {n: _toColumn(rows[:, i]) for i, n in enumerate(names)}
+
+
+def readBinaryCoordinates(path):
+    """ Read all the coordinates from a binary file written by
+    :func:`writeBinaryCoordinates`.
+
+    Args:
+        path: The input binary file.
+
+    Returns:
+        A dict {micId: columns} where columns is a dict with a numpy array
+        for each column.
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        micIds = npz['micIds'].tolist()
+        offsets = np.cumsum(npz['counts'])[:-1]
+        columns = dict()
+        for key in npz.files:
+            if key.startswith(_BIN_PREFIX):
+                columns[key[len(_BIN_PREFIX):]] = npz[key]
+        if 'labelCodes' in npz.files:
+            columns['label'] = npz['labelNames'][npz['labelCodes']]
+
+    split = {n: np.split(values, offsets) for n, values in columns.items()}
+
+    return {micId: {n: split[n][i] for n in split}
+            for i, micId in enumerate(micIds)}
+
+
+def writeTextCoordinates(path, columns):
+    """ Write the coordinates columns into a text file.
+
+    Args:
+        path: The output text file.
+        columns: A dict with numpy arrays for the 'x' and 'y' columns and
+            optionally 'x2', 'y2' and 'label'. Other columns are ignored.
+    """
+    names = [n for n in ('x', 'y', 'x2', 'y2', 'label') if n in columns]
+    _writeRows(path, columns, names, ' ')
+
+
+def writeCsvCoordinates(path, columns):
+    """ Write the coordinates columns into a csv file.
+
+    Args:
+        path: The output csv file.
+        columns: A dict with a numpy array for each column.
+    """
+    names = ['x', 'y'] + [n for n in columns if n not in ('x', 'y')]
+    _writeRows(path, columns, names, ',', header=','.join(names))
+
+
+def _writeRows(path, columns, names, sep, header=None):
+    """ Write the given columns as text rows. """
+    values = [np.asarray(columns[n]) for n in names]
+    strValues = [v if v.dtype.kind in 'US' else np.char.mod('%.10g', v)
+                 for v in values]
+
+    with open(path, 'w') as f:
+        if header:
+            f.write(header + '\n')
+        if strValues and len(strValues[0]):
+            rows = np.char.add(strValues[0], '')
+            for v in strValues[1:]:
+                rows = np.char.add(np.char.add(rows, sep), v)
+            f.write('\n'.join(rows.tolist()))
+            f.write('\n')
+
+
+def writeBinaryCoordinates(path, micColumns):
+    """ Write the coordinates of many micrographs in a single binary file.
+
+    The file is a numpy .npz archive, with the columns of all micrographs
+    concatenated and the number of coordinates per micrograph. Labels are
+    stored as codes into the list of unique label names.
+
+    Args:
+        path: The output binary file.
+        micColumns: A dict {micId: columns} where columns is a dict with
+            a numpy array for each column. All micrographs should have
+            the same columns.
+    """
+    micIds = list(micColumns.keys())
+    colsList = [micColumns[micId] for micId in micIds]
+    names = set(colsList[0]) if colsList else {'x', 'y'}
+
+    for cols in colsList:
+        if set(cols) != names:
+            raise Exception("All micrographs should have the same columns.")
+
+    arrays = {
+        'micIds': np.array(micIds),
+        'counts': np.array([len(cols['x']) for cols in colsList],
+                           dtype=np.int64)
+    }
+
+    for n in names:
+        values = np.concatenate([np.asarray(cols[n]) for cols in colsList]) \
+            if colsList else np.empty(0)
+        if n == 'label':
+            labelNames, labelCodes = np.unique(values.astype(str),
+                                               return_inverse=True)
+            arrays['labelNames'] = labelNames
+            arrays['labelCodes'] = labelCodes.astype(np.int32)
+        else:
+            arrays[_BIN_PREFIX + n] = values
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def getCoordinatesFormat(path):
+    """ Return the coordinates format from the file extension. """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return COORDS_FORMAT_CSV
+    elif ext == '.npz':
+        return COORDS_FORMAT_BINARY
+    return COORDS_FORMAT_TEXT
+
+
+_READERS = {
+    COORDS_FORMAT_TEXT: readTextCoordinates,
+    COORDS_FORMAT_CSV: readCsvCoordinates
+}
+
+_WRITERS = {
+    COORDS_FORMAT_TEXT: writeTextCoordinates,
+    COORDS_FORMAT_CSV: writeCsvCoordinates
+}
+
+
+def getCoordinatesColumns(model, micId, extraColumns=None):
+    """ Return the coordinates of the micrograph as a dict of numpy arrays.
+
+    Args:
+        model: The :class:`PickerModel <datavis.models.PickerModel>`.
+        micId: The micrograph ID.
+        extraColumns: A list with the names of other coordinates properties
+            that will be also returned, e.g ['score'].
+
+    Returns:
+        A dict with the 'x', 'y', 'label' columns, the 'x2' and 'y2' if the
+        coordinates are filaments and the extra columns. Only the
+        coordinates returned by the model iterCoordinates are included (e.g.
+        above the score threshold). Missing extra properties are NaN.
+    """
+    coords = list(model.iterCoordinates(micId))
+    n = len(coords)
+
+    def _column(attr, dtype=float):
+        return np.fromiter((getattr(c, attr, np.nan) for c in coords),
+                           dtype=dtype, count=n)
+
+    columns = {'x': _column('x'), 'y': _column('y')}
+
+    if n and all(hasattr(coords[0], a) for a in ('x2', 'y2')):
+        columns['x2'] = _column('x2')
+        columns['y2'] = _column('y2')
+
+    columns['label'] = np.array([c.label for c in coords], dtype=str)
+
+    for attr in extraColumns or []:
+        columns[attr] = _column(attr)
+
+    return columns
+
+
+def loadCoordinates(model, micId, columns, clear=False):
+    """ Load the coordinates columns into a micrograph of the model.
+
+    The coordinates are created with the model createCoordinate method.
+    Columns other than 'x', 'y' and 'label' are passed as properties.
+
+    Args:
+        model: The :class:`PickerModel <datavis.models.PickerModel>`.
+        micId: The micrograph ID.
+        columns: A dict with a numpy array for each column.
+        clear: If True, the existing coordinates will be removed.
+
+    Returns:
+        :class:`Result <datavis.models.PickerModel.Result>` instance
+    """
+    n = len(columns['x'])
+    xs = columns['x'].tolist()
+    ys = columns['y'].tolist()
+    labels = columns['label'].tolist() if 'label' in columns else ['M'] * n
+    extra = [(k, v.tolist()) for k, v in columns.items()
+             if k not in ('x', 'y', 'label')]
+    create = model.createCoordinate
+
+    if extra:
+        coords = [create(xs[i], ys[i], labels[i],
+                         **{k: v[i] for k, v in extra})
+                  for i in range(n)]
+    else:
+        coords = [create(x, y, label) for x, y, label in zip(xs, ys, labels)]
+
+    if clear:
+        model.clearMicrograph(micId)
+
+    model.addCoordinates(micId, coords)
+
+    return model.Result(currentCoordsChanged=True, tableModelChanged=True)
+
+
+def importCoordinates(model, paths, fmt=None, workers=1, clear=False):
+    """ Import the coordinates from files into the model.
+
+    Args:
+        model: The :class:`PickerModel <datavis.models.PickerModel>`.
+        paths: A dict {micId: path} with one file per micrograph for text or
+            csv formats, or the path of a single binary file with all
+            micrographs for the binary format.
+        fmt: One of COORDS_FORMAT_TEXT, COORDS_FORMAT_CSV or
+            COORDS_FORMAT_BINARY. If None, it is taken from the extension.
+        workers: Number of processes used to read the files in parallel.
+            If None, the number of CPUs will be used.
+        clear: If True, the existing coordinates will be removed.
+
+    Returns:
+        :class:`Result <datavis.models.PickerModel.Result>` instance
+    """
+    if isinstance(paths, str):
+        fmt = fmt or getCoordinatesFormat(paths)
+        if fmt != COORDS_FORMAT_BINARY:
+            raise Exception("A dict {micId: path} is required for format '%s'"
+                            % fmt)
+        micColumns = readBinaryCoordinates(paths).items()
+    else:
+        micIds = list(paths.keys())
+        files = [paths[micId] for micId in micIds]
+        if not files:
+            return model.Result()
+        reader = _READERS.get(fmt or getCoordinatesFormat(files[0]))
+        if reader is None:
+            raise Exception("Invalid coordinates format '%s'" % fmt)
+
+        workers = min(workers or os.cpu_count() or 1, len(files))
+        if workers == 1:
+            micColumns = zip(micIds, map(reader, files))
+        else:
+            # Many small files are read per task to reduce the overhead
+            chunk = max(1, len(files) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                micColumns = list(zip(micIds, executor.map(reader, files,
+                                                           chunksize=chunk)))
+
+    for micId, columns in micColumns:
+        loadCoordinates(model, micId, columns, clear=clear)
+
+    return model.Result(currentCoordsChanged=True, tableModelChanged=True)
+
+
+def exportCoordinates(model, paths, fmt=None, extraColumns=None):
+    """ Export the coordinates of the model into files.
+
+    Args:
+        model: The :class:`PickerModel <datavis.models.PickerModel>`.
+        paths: A dict {micId: path} with one file per micrograph for text or
+            csv formats, or the path of a single binary file where all
+            micrographs of the model will be written.
+        fmt: One of COORDS_FORMAT_TEXT, COORDS_FORMAT_CSV or
+            COORDS_FORMAT_BINARY. If None, it is taken from the extension.
+        extraColumns: A list with the names of other coordinates properties
+            that will be also exported, e.g ['score']. Ignored for
+            the text format.
+    """
+    if isinstance(paths, str):
+        fmt = fmt or getCoordinatesFormat(paths)
+        if fmt != COORDS_FORMAT_BINARY:
+            raise Exception("A dict {micId: path} is required for format '%s'"
+                            % fmt)
+        writeBinaryCoordinates(paths, {
+            mic.getId(): getCoordinatesColumns(model, mic.getId(),
+                                               extraColumns)
+            for mic in model})
+    else:
+        for micId, path in paths.items():
+            writer = _WRITERS.get(fmt or getCoordinatesFormat(path))
+            if writer is None:
+                raise Exception("Invalid coordinates format '%s'" % fmt)
+            writer(path, getCoordinatesColumns(model, micId, extraColumns))
+
+
+def parseTextCoordinates(path):
+    """ Parse (x, y) coordinates from a texfile assuming
+     that the first two columns on each line are x and y.
+
+    Yields (x, y, label) or (x1, y1, x2, y2, label) tuples with int
+    coordinates, or '' for the lines with an invalid number of columns.
+    See :func:`readTextCoordinates` to read all the coordinates at once.
+    """
+    with open(path) as f:
+        for line in f:
+            li = line.strip()
+            if li:
+                parts = li.strip().split()
+                size = len(parts)
+                if size == 2:  # (x, y)
+                    yield int(parts[0]), int(parts[1]), ''
+                elif size == 3:  # (x, y, label)
+                    yield int(parts[0]), int(parts[1]), str(parts[2])
+                elif size == 4:  # (x1, y1, x2, y2)
+                    yield int(parts[0]), int(parts[1]), \
+                          int(parts[2]), int(parts[3]), ''
+                elif size == 5:  # (x1, y1, x2, y2, label):
+                    yield int(parts[0]), int(parts[1]), \
+                          int(parts[2]), int(parts[3]), str(parts[4])
+                else:
+                    yield ''
@@ -1,5 +1,7 @@
 
 from collections import OrderedDict
+from functools import partial
+import weakref
 
 from ._constants import *
 
@@ -24,6 +26,16 @@ class ColumnInfo:
         return self._type
 
 
+class _ColumnProperties:
+    """ Values of the properties of a :class:`ColumnConfig`. """
+    __slots__ = (VISIBLE, VISIBLE_RO, RENDERABLE, RENDERABLE_RO, EDITABLE,
+                 EDITABLE_RO)
+
+
+# Names of the properties of a ColumnConfig, for fast membership tests
+_PROPERTY_NAMES = frozenset(_ColumnProperties.__slots__)
+
+
 class ColumnConfig(ColumnInfo):
     """ Extend :class:`ColumnInfo <datavis.models.ColumnInfo>` class to store
     properties about the visualization of a given column.
@@ -50,6 +62,10 @@ class ColumnConfig(ColumnInfo):
         self._label = kwargs.get('label', name)
         self._description = kwargs.get(DESCRIPTION, '')
         self._propertyNames = []
+        self._properties = _ColumnProperties()
+        # Functions called as f(columnConfig, name, oldValue) when a property
+        # changes, used by TableConfig to update its index
+        self._listeners = []
         self._labels = kwargs.get(LABELS) or []
         self.__setProperty__(VISIBLE, True, False, **kwargs)
         self.__setProperty__(RENDERABLE, False, False, **kwargs)
@@ -68,12 +84,22 @@ class ColumnConfig(ColumnInfo):
         Keyword Args:
             keyword-arguments from where to read the values
         """
-        setattr(self, '__%s' % name, kwargs.get(name, default))
+        setattr(self._properties, name, kwargs.get(name, default))
         self._propertyNames.append(name)
         roName = name + 'ReadOnly'
-        setattr(self, '__%s' % roName, kwargs.get(roName, defaultRO))
+        setattr(self._properties, roName, kwargs.get(roName, defaultRO))
         self._propertyNames.append(roName)
 
+    def addListener(self, listener):
+        """ Add a function that will be called as
+        listener(columnConfig, name, oldValue) when the value of a property
+        changes. """
+        self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        """ Remove a function added with :meth:`addListener`. """
+        self._listeners.remove(listener)
+
     def getLabel(self):
         """ Return the string that will be used to display this column. """
         return self._label
@@ -114,18 +140,23 @@ class ColumnConfig(ColumnInfo):
         """ Return the value of a given property.
         If the property does not exits, an Exception is raised.
         """
-        if propertyName not in self._propertyNames:
+        if propertyName not in _PROPERTY_NAMES:
             raise Exception("Invalid property name: %s" % propertyName)
 
-        return getattr(self, '__%s' % propertyName)
+        return getattr(self._properties, propertyName)
 
     def __setitem__(self, propertyName, value):
-        """ Return the value of a given property.
+        """ Set the value of a given property.
         If the property does not exits, an Exception is raised.
         """
-        if propertyName not in self._propertyNames:
+        if propertyName not in _PROPERTY_NAMES:
             raise Exception("Invalid property name: %s" % propertyName)
-        return setattr(self, '__%s' % propertyName, value)
+        oldValue = getattr(self._properties, propertyName)
+        setattr(self._properties, propertyName, value)
+        if oldValue != value:
+            # The listeners can be removed while they are notified
+            for listener in list(self._listeners):
+                listener(self, propertyName, oldValue)
 
     def __str__(self):
         """ A readable representation. """
@@ -300,12 +331,36 @@ class EmptyTableModel(TableModel):
         return 0, 0
 
 
+def _onColumnPropertyChanged(configRef, col, columnConfig, name, oldValue):
+    """ Update the index of a TableConfig when a property of its column
+    col changes. The TableConfig is given as a weak reference, so the
+    columns do not keep it alive. """
+    config = configRef()
+    if config is not None:
+        config._index[(name, oldValue)].discard(col)
+        config._index.setdefault((name, columnConfig[name]), set()).add(col)
+
+
+def _removeListeners(listeners):
+    """ Remove the given (ColumnConfig, listener) pairs """
+    for columnConfig, listener in listeners:
+        columnConfig.removeListener(listener)
+
+
 class TableConfig:
     """ Contains visualization properties of the table's columns.
     """
     def __init__(self, *cols):
         # Store a list of ColumnConfig objects
-        self._cols = cols or []
+        self._cols = []
+        # Column indexes for each property value: {(name, value): set}
+        self._index = dict()
+        # Listeners added to the columns: [(ColumnConfig, listener)]. They
+        # are removed when this config is discarded.
+        self._listeners = []
+        weakref.finalize(self, _removeListeners, self._listeners)
+        for c in cols:
+            self.addColumnConfig(c)
 
     def __str__(self):
         s = "TableConfig columnConfigs: %d" % len(self._cols)
@@ -318,7 +373,26 @@ class TableConfig:
 
     def addColumnConfig(self, columnConfig):
         """ Add a new ColumnConfig to the list. """
+        i = len(self._cols)
         self._cols.append(columnConfig)
+        for name in _PROPERTY_NAMES:
+            self._index.setdefault((name, columnConfig[name]), set()).add(i)
+        listener = partial(_onColumnPropertyChanged, weakref.ref(self), i)
+        columnConfig.addListener(listener)
+        self._listeners.append((columnConfig, listener))
+
+    def __getColumns(self, props):
+        """ Return the set of indexes of the columns with the given property
+        values, or None if no properties are given. """
+        result = None
+        for k, v in props.items():
+            if k not in _PROPERTY_NAMES:
+                raise Exception("Invalid property name: %s" % k)
+            cols = self._index.get((k, v), set())
+            result = cols if result is None else result & cols
+            if not result:
+                break
+        return result
 
     def hasColumnConfig(self, **props):
         """ Returns True if has any there is any column with these properties.
@@ -327,7 +401,8 @@ class TableConfig:
 
             tableConfig.hasColumnConfig(renderable=True)
         """
-        return any(c.check(**props) for c in self._cols)
+        cols = self.__getColumns(props)
+        return bool(self._cols) if cols is None else bool(cols)
 
     def getColumnConfig(self, col):
         """
@@ -338,11 +413,16 @@ class TableConfig:
 
     def getColumnsCount(self, **props):
         """ Return the number of columns that have given properties. """
-        return len(list(self.iterColumns(**props)))
+        cols = self.__getColumns(props)
+        return len(self._cols) if cols is None else len(cols)
 
     def iterColumns(self, **props):
-        return iter((i, c) for i, c in enumerate(self._cols)
-                    if c.check(**props))
+        """ Iterate over the (index, ColumnConfig) of the columns that have
+        the given properties, in the order of the columns. """
+        cols = self.__getColumns(props)
+        if cols is None:
+            return enumerate(self._cols)
+        return iter([(i, self._cols[i]) for i in sorted(cols)])
 
 
 class SimpleTableModel(TableModel):
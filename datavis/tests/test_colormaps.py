@@ -0,0 +1,55 @@
+import unittest
+
+import datavis as dv
+import numpy as np
+
+
+class TestColorMaps(dv.tests.TestBase):
+
+    def test_ColorMapLut(self):
+        print('test_ColorMapLut')
+        self.assertIn('grey', dv.views.getColorMapNames())
+        lut = dv.views.getColorMapLut('grey')
+        self.assertEqual(lut.shape, (256, 4))
+        self.assertTrue(np.array_equal(lut[:, 0], np.arange(256)))
+        # Tables are cached and shared
+        self.assertIs(lut, dv.views.getColorMapLut('grey'))
+        inverted = dv.views.getColorMapLut('grey', invert=True)
+        self.assertTrue(np.array_equal(inverted[::-1], lut))
+        # The clip colors are added outside the colors of the map
+        clipped = dv.views.getColorMapLut('grey', clip=True)
+        self.assertEqual(clipped.shape, (258, 4))
+        self.assertEqual(tuple(clipped[-1]), (255, 0, 0, 255))
+        self.assertTrue(np.array_equal(clipped[1:-1], lut))
+        # Gamma < 1 makes the values brighter
+        self.assertGreater(dv.views.getColorMapLut('grey', gamma=0.5)[64, 0],
+                           lut[64, 0])
+
+    def test_registerColorMap(self):
+        print('test_registerColorMap')
+        cmap = dv.views.ColorMap('test-red', [(0, 0, 0), (255, 0, 0)])
+        dv.views.registerColorMap(cmap)
+        self.assertIs(dv.views.getColorMap('test-red'), cmap)
+        lut = dv.views.getColorMapLut('test-red', size=3)
+        self.assertEqual(lut[:, 0].tolist(), [0, 128, 255])
+        self.assertEqual(lut[:, 1].tolist(), [0, 0, 0])
+
+    def test_ClipLevels(self):
+        print('test_ClipLevels')
+        data = np.array([[-1, 0, 5], [10, 11, np.nan]], dtype=np.float32)
+        rgba = dv.views.renderImage(data, levels=(0, 10),
+                                    colorMap=('grey', 1, False, True))
+        self.assertEqual(tuple(rgba[0, 0]), (0, 0, 255, 255))
+        self.assertEqual(tuple(rgba[1, 1]), (255, 0, 0, 255))
+        # Only the values outside the levels are highlighted
+        self.assertEqual(tuple(rgba[0, 1]), (0, 0, 0, 255))
+        self.assertEqual(tuple(rgba[1, 0]), (255, 255, 255, 255))
+        self.assertEqual(tuple(rgba[1, 2]), (0, 0, 0, 255))
+        # Same colors with the tables of the 8 and 16 bits types
+        data = np.array([[-1, 0, 5], [10, 11, 0]], dtype=np.int16)
+        rgba16 = dv.views.renderImage(data, levels=(0, 10),
+                                      colorMap=('grey', 1, False, True))
+        self.assertTrue(np.array_equal(rgba16[:, :2], rgba[:, :2]))
+
+if __name__ == '__main__':
+    unittest.main()
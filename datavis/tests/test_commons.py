@@ -169,6 +169,7 @@ class SimpleListImageModel(dv.models.ListModel):
         if data is None:
             data = pg.gaussianFilter(np.random.normal(size=s),
                                      [5 for _ in range(len(self._imgSize))])
+            data = data.astype(np.float32)
             self._imgData[row] = data
 
         return data
@@ -238,7 +239,7 @@ class SimplePickerModel(dv.models.PickerModel):
         if micId not in self._cache:
             c, r = self._imageSize
             self._cache[micId] = pg.gaussianFilter(
-                np.random.normal(size=(r, c)), (5, 5))
+                np.random.normal(size=(r, c)), (5, 5)).astype(np.float32)
 
         return self._cache[micId]
 
@@ -291,7 +292,7 @@ def createSlicesModel(imgSize, size):
     """
     s = size, imgSize[1], imgSize[0]
     data = pg.gaussianFilter(np.random.normal(size=s), (5, 5, 5))
-    return dv.models.SlicesModel(data)
+    return dv.models.SlicesModel(data.astype(np.float32))
 
 
 def getPythonCodeExample():
@@ -545,7 +546,7 @@ def createTableModel(imgSize):
     for line in star.split('\n'):
         line = line.strip().split()
         line[1] = pg.gaussianFilter(np.random.normal(size=imgSize),
-                                    (5, 5))
+                                    (5, 5)).astype(np.float32)
         model.addRow(line)
 
     return model
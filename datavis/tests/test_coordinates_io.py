@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import datavis as dv
+
+
+class TestCoordinatesIO(dv.tests.TestBase):
+
+    def __createModel(self, picks=1):
+        return dv.tests.SimplePickerModel((512, 512), 10, picks=picks)
+
+    def __checkCoords(self, model1, model2, score=True):
+        for mic in model1:
+            coords1 = list(model1.iterCoordinates(mic.getId()))
+            coords2 = list(model2.iterCoordinates(mic.getId()))
+            self.assertEqual(len(coords1), len(coords2))
+            for c1, c2 in zip(coords1, coords2):
+                self.assertAlmostEqual(c1.x, c2.x)
+                self.assertAlmostEqual(c1.y, c2.y)
+                self.assertEqual(c1.label, c2.label)
+                if score:
+                    self.assertAlmostEqual(c1.score, c2.score)
+
+    def test_ImportExport(self):
+        print('test_ImportExport')
+        model = self.__createModel(picks=20)
+        tmpDir = tempfile.mkdtemp()
+
+        def _paths(ext):
+            return {mic.getId(): os.path.join(tmpDir, '%s.%s'
+                                              % (mic.getId(), ext))
+                    for mic in model}
+
+        # Plain text files, one per micrograph
+        dv.models.exportCoordinates(model, _paths('txt'))
+        model2 = self.__createModel()
+        dv.models.importCoordinates(model2, _paths('txt'))
+        self.__checkCoords(model, model2, score=False)
+
+        # Csv files with the score column, read in parallel
+        dv.models.exportCoordinates(model, _paths('csv'),
+                                    extraColumns=['score'])
+        model2 = self.__createModel()
+        dv.models.importCoordinates(model2, _paths('csv'), workers=2)
+        self.__checkCoords(model, model2)
+
+        # A single binary file for all micrographs
+        binPath = os.path.join(tmpDir, 'coords.npz')
+        dv.models.exportCoordinates(model, binPath, extraColumns=['score'])
+        model2 = self.__createModel()
+        dv.models.importCoordinates(model2, binPath)
+        self.__checkCoords(model, model2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+import datavis as dv
+import numpy as np
+
+
+class TestExport(dv.tests.TestBase):
+
+    def test_renderImage(self):
+        print('test_renderImage')
+        data = np.arange(256, dtype=np.uint16).reshape((16, 16))
+        rgba = dv.views.renderImage(data, levels=(0, 255))
+        self.assertEqual(rgba.shape, (16, 16, 4))
+        self.assertTrue(np.array_equal(rgba[..., 0], data))
+        # Float data is rendered in the same way
+        rgba2 = dv.views.renderImage(data.astype(np.float32),
+                                     levels=(0, 255))
+        self.assertTrue(np.array_equal(rgba, rgba2))
+        mask = np.ones(data.shape)
+        mask[0] = 0
+        rgba3 = dv.views.renderImage(data, levels=(0, 255), mask=mask,
+                                     maskColor='#FFFF0000')
+        self.assertEqual(tuple(rgba3[0, 5]), (255, 0, 0, 255))
+        self.assertTrue(np.array_equal(rgba3[1:], rgba[1:]))
+
+    def test_exportMontages(self):
+        print('test_exportMontages')
+        slices = dv.models.SlicesModel(
+            np.random.rand(25, 32, 32).astype(np.float32))
+        tmpDir = tempfile.mkdtemp()
+        paths = dv.views.exportMontages(
+            slices, os.path.join(tmpDir, 'montage_%d.png'), columns=4,
+            size=12, spacing=2)
+        self.assertEqual(len(paths), 3)
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        montage = dv.views.createMontage(
+            [np.zeros((32, 32, 4), dtype=np.uint8)] * 12, 4, spacing=2)
+        self.assertEqual(montage.shape, (3 * 34 - 2, 4 * 34 - 2, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
 
+import os
+import tempfile
 import unittest
 
 import datavis as dv
@@ -29,6 +31,124 @@ class TestImageModels(dv.tests.TestBase):
 
         return
 
+    def test_ImageModelStats(self):
+        print('test_ImageModelStats')
+        data = np.arange(1000 * 1000, dtype=np.float32).reshape((1000, 1000))
+        imgModel = dv.models.ImageModel(data)
+        self.assertLessEqual(imgModel.getSample(maxSize=10000).size, 10000)
+        values, counts = imgModel.getHistogram()
+        self.assertEqual(counts.sum(), imgModel.getSample().size)
+        self.assertEqual(imgModel.getLevels(),
+                         (0, imgModel.getSample().max()))
+        # Statistics are cached until the data is changed
+        self.assertIs(imgModel.getHistogram(), imgModel.getHistogram())
+        imgModel.setData(data[:10, :10])
+        self.assertEqual(imgModel.getLevels(), (0, 9009))
+
+    def test_VolumeModelStats(self):
+        print('test_VolumeModelStats')
+        data = np.random.rand(40, 30, 20).astype(np.float32)
+        volModel = dv.models.VolumeModel(data)
+        slicesModels = [volModel.getSlicesModel(a) for a in
+                        (dv.models.AXIS_X, dv.models.AXIS_Y, dv.models.AXIS_Z)]
+        minMax = slicesModels[0].getMinMax()
+        self.assertEqual(minMax, (data.min(), data.max()))
+        # The statistics of the volume are shared by all axes
+        for model in slicesModels + [volModel]:
+            self.assertIs(model.getMinMax(), minMax)
+        # A new model for the same volume can reuse them
+        other = dv.models.VolumeModel(data)
+        other.setStatistics(volModel.getStatistics())
+        self.assertIs(other.getMinMax(), minMax)
+        other.setData(data[:2])
+        self.assertIsNot(other.getMinMax(), minMax)
+
+    def test_Projections(self):
+        print('test_Projections')
+        data = np.random.rand(40, 30, 20).astype(np.float32)
+        volModel = dv.models.VolumeModel(data)
+        proj = volModel.getProjection(dv.models.AXIS_X,
+                                      dv.models.PROJECTION_MAX)
+        self.assertTrue(np.array_equal(proj, data.max(axis=2)))
+        # Projections are cached for each axis
+        self.assertIs(proj, volModel.getProjection(dv.models.AXIS_X,
+                                                   dv.models.PROJECTION_MAX))
+        mean = volModel.getProjection(dv.models.AXIS_Z,
+                                      dv.models.PROJECTION_MEAN)
+        self.assertTrue(np.allclose(mean, data.mean(axis=0)))
+
+        slicesModel = volModel.getSlicesModel(dv.models.AXIS_Z)
+        self.assertTrue(np.allclose(slicesModel.getSlabData(10, 5),
+                                    data[8:13].mean(axis=0)))
+        # The slab is clipped at the first slice
+        self.assertTrue(np.allclose(slicesModel.getSlabData(0, 5),
+                                    data[:5].mean(axis=0)))
+
+        # The cumulative sums are not kept for memory-mapped volumes
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'volume.npy')
+            np.save(path, data)
+            mmapModel = dv.models.VolumeModel(np.load(path, mmap_mode='r'))
+            slicesModel = mmapModel.getSlicesModel(dv.models.AXIS_X)
+            self.assertTrue(np.allclose(slicesModel.getSlabData(10, 5),
+                                        data[:, :, 8:13].mean(axis=2)))
+            self.assertEqual(slicesModel.getSlabsNBytes(), 0)
+            del mmapModel, slicesModel
+
+    def test_ObliqueSlice(self):
+        print('test_ObliqueSlice')
+        data = np.random.rand(20, 30, 40).astype(np.float32)
+        volModel = dv.models.VolumeModel(data)
+        # Planes normal to the axes give the orthogonal slices
+        zSlice = volModel.getObliqueSliceData(center=(19.5, 14.5, 7),
+                                              size=(40, 30))
+        self.assertTrue(np.allclose(zSlice, data[7]))
+        xSlice = volModel.getObliqueSliceData(center=(10, 14.5, 9.5),
+                                              normal=(1, 0, 0), size=(30, 20))
+        self.assertTrue(np.allclose(xSlice, data[:, :, 10]))
+        # Interpolated value between two voxels along the normal
+        slice1 = volModel.getObliqueSliceData(center=(19.5, 14.5, 7.25),
+                                              size=(40, 30))
+        self.assertTrue(np.allclose(slice1, 0.75 * data[7] + 0.25 * data[8]))
+        # Pixels outside the volume are filled
+        big = volModel.getObliqueSliceData(size=(60, 60), fill=-1)
+        self.assertEqual(big[0, 0], -1)
+
+    def test_ChunkedVolume(self):
+        print('test_ChunkedVolume')
+        data = np.random.randint(0, 1000, (20, 30, 40)).astype(np.uint16)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            npyPath = os.path.join(tmpDir, 'volume.npy')
+            np.save(npyPath, data)
+            volPath = os.path.join(tmpDir, 'volume')
+            dv.models.convertToChunked(npyPath, volPath, chunks=(8, 8, 8),
+                                       levels=(1, 2))
+            volModel = dv.models.ChunkedVolumeModel(volPath)
+            self.assertEqual(volModel.getDim(), (40, 30, 20))
+            self.assertEqual(volModel.getMinMax(),
+                             (data.min(), data.max()))
+            for axis, expected in [(dv.models.AXIS_Z, data[5]),
+                                   (dv.models.AXIS_Y, data[:, 5, :]),
+                                   (dv.models.AXIS_X, data[:, :, 5])]:
+                self.assertTrue(np.array_equal(
+                    volModel.getSliceData(axis, 5), expected))
+            slicesModel = volModel.getSlicesModel(dv.models.AXIS_X)
+            self.assertTrue(np.array_equal(slicesModel.getData(7),
+                                           data[:, :, 7]))
+            self.assertTrue(np.allclose(slicesModel.getSlabData(7, 3),
+                                        data[:, :, 6:9].mean(axis=2)))
+            chunked = volModel.getData()
+            self.assertTrue(np.array_equal(chunked[3:17:2, -5, 1:],
+                                           data[3:17:2, -5, 1:]))
+            zSlice = volModel.getObliqueSliceData(center=(19.5, 14.5, 7),
+                                                  size=(40, 30))
+            self.assertTrue(np.allclose(zSlice, data[7]))
+            # Each voxel of level 2 is the average of 2x2x2 voxels
+            level2 = chunked.openLevel(2)
+            self.assertEqual(level2.shape, (10, 15, 20))
+            self.assertEqual(level2[0, 0, 0],
+                             np.rint(data[:2, :2, :2].mean()))
+
     # def test_VolumeModel(self):
     #     volName = self.getDataPaths()[2]
     #     print("Checking %s" % volName)
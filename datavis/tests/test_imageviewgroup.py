@@ -0,0 +1,37 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pyqtgraph as pg
+import PyQt5.QtWidgets as qtw
+
+import datavis as dv
+
+
+class TestImageViewGroup(dv.tests.TestView):
+    __title = "ImageViewGroup example: 3x3 linked views"
+
+    def __init__(self, methodName='runTest'):
+        dv.tests.TestView.__init__(self, methodName=methodName)
+
+    def createView(self):
+        widget = qtw.QWidget()
+        layout = qtw.QGridLayout(widget)
+        views = []
+        for i in range(9):
+            data = pg.gaussianFilter(np.random.normal(size=(1024, 1024)),
+                                     (5, 5)).astype(np.float32)
+            imageView = dv.views.ImageView(parent=widget, toolBar=False,
+                                           model=dv.models.ImageModel(data))
+            layout.addWidget(imageView, i // 3, i % 3)
+            views.append(imageView)
+        widget._viewGroup = dv.views.ImageViewGroup(views, parent=widget)
+        widget.resize(1200, 1000)
+        return widget
+
+    def test_ImageViewGroup(self):
+        print('test_ImageViewGroup')
+
+
+if __name__ == '__main__':
+    TestImageViewGroup().runApp()
@@ -37,6 +37,23 @@ class TestMaskCreator(dv.tests.TestView):
     def test_MaskCreator(self):
         print('test_MaskCreator')
 
+    def test_CompactMask(self):
+        print('test_CompactMask')
+        imageView = dv.views.ImageView(
+            parent=None, maskParams={'type': dv.views.CONSTANT, 'data': 0,
+                                     'operation': dv.views.ADD})
+        imageView.setModel(dv.models.ImageModel(np.zeros((40, 60))))
+        mask = np.zeros((40, 60), dtype=np.uint8)
+        mask[10:20, 5:50] = 1
+        imageView.setCompactMask(dv.models.BitMask(mask))
+        self.assertTrue(np.array_equal(imageView.getMaskImage(), mask))
+        # The compact mask can be restored later
+        compact = imageView.getMaskImage(compact=True)
+        imageView.setCompactMask()
+        self.assertFalse(imageView.getMaskImage().any())
+        imageView.setCompactMask(compact)
+        self.assertTrue(np.array_equal(imageView.getMaskImage(), mask))
+
 
 if __name__ == '__main__':
     argParser = argparse.ArgumentParser(usage='Mask Creator',
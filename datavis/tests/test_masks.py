@@ -0,0 +1,57 @@
+import unittest
+
+import datavis as dv
+import numpy as np
+
+
+class TestMasks(dv.tests.TestBase):
+
+    def test_BitMask(self):
+        print('test_BitMask')
+        data = np.zeros((100, 70), dtype=np.int8)
+        data[10:40, 5:61] = 1
+        mask = dv.models.BitMask(data)
+        self.assertEqual(mask.getShape(), (100, 70))
+        self.assertEqual(mask.getNBytes(), 100 * 9)
+        self.assertTrue(np.array_equal(mask.toArray(), data))
+        region = mask.getRegion(slice(5, 20), slice(3, 13))
+        self.assertTrue(np.array_equal(region, data[5:20, 3:13]))
+
+    def test_RLEMask(self):
+        print('test_RLEMask')
+        data = np.full((256, 256), 2, dtype=np.int8)
+        data[100:150, 30:200] = 1
+        mask = dv.models.RLEMask(data)
+        self.assertLess(mask.getNBytes(), data.nbytes / 10)
+        restored = mask.toArray()
+        self.assertEqual(restored.dtype, data.dtype)
+        self.assertTrue(np.array_equal(restored, data))
+
+    def test_MaskHistory(self):
+        print('test_MaskHistory')
+        history = dv.models.MaskHistory(maxLevels=2)
+        data = np.zeros((10, 10), dtype=np.int8)
+        self.assertFalse(history.canUndo())
+        self.assertFalse(history.isModified())
+        for v in range(1, 4):
+            history.push(data)
+            data = np.full((10, 10), v, dtype=np.int8)
+
+        # Only the last two states are kept
+        data = history.undo(data)
+        self.assertTrue(np.all(data == 2))
+        data = history.undo(data)
+        self.assertTrue(np.all(data == 1))
+        self.assertIsNone(history.undo(data))
+        data = history.redo(data)
+        self.assertTrue(np.all(data == 2))
+        self.assertTrue(history.canRedo())
+        history.push(data)
+        self.assertFalse(history.canRedo())
+        self.assertTrue(history.isModified())
+        history.clear()
+        self.assertFalse(history.isModified())
+
+
+if __name__ == '__main__':
+    unittest.main()
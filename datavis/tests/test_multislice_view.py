@@ -30,6 +30,19 @@ class TestMultiSliceView(dv.tests.TestView):
         print('test_MultiSliceView')
 
 
+class TestObliqueMultiSliceView(TestMultiSliceView):
+    __title = "MultiSliceView oblique mode example"
+
+    def createView(self):
+        msv = TestMultiSliceView.createView(self)
+        msv.setObliqueMode(True)
+        msv.getObliqueView().setPlane(tilt=30, azimuth=45)
+        return msv
+
+    def test_ObliqueMode(self):
+        print('test_ObliqueMode')
+
+
 if __name__ == '__main__':
     TestMultiSliceView().runApp()
 
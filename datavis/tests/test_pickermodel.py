@@ -0,0 +1,31 @@
+import unittest
+
+import datavis as dv
+import numpy as np
+
+
+class TestPickerModel(dv.tests.TestBase):
+
+    def test_extractBoxes(self):
+        print('test_extractBoxes')
+        data = np.arange(100 * 120, dtype=np.float32).reshape((100, 120))
+        # The second box is crossing the top-left corner of the image
+        boxes = dv.models.extractBoxes(data, [60, 2], [50, 3], 10, fill=-1)
+        self.assertEqual(boxes.shape, (2, 10, 10))
+        self.assertTrue(np.array_equal(boxes[0], data[45:55, 55:65]))
+        self.assertTrue(np.array_equal(boxes[1][2:, 3:], data[0:8, 0:7]))
+        self.assertTrue(np.all(boxes[1][:2] == -1))
+        self.assertTrue(np.all(boxes[1][:, :3] == -1))
+
+    def test_getBoxesModel(self):
+        print('test_getBoxesModel')
+        model = dv.tests.SimplePickerModel((512, 512), 2, boxSize=32)
+        micId = model.getMicrographByIndex(0).getId()
+        n = len(list(model.iterCoordinates(micId)))
+        boxesModel = model.getBoxesModel(micId)
+        self.assertEqual(boxesModel.getRowsCount(), n)
+        self.assertEqual(boxesModel.getDim(), (32, 32))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,22 +10,14 @@ from datavis.models import ColumnConfig, TYPE_INT, TYPE_STRING
 class MyPickerModel(dv.models.PickerCmpModel):
     def __init__(self, *args, **kwargs):
         dv.models.PickerCmpModel.__init__(self, *args, **kwargs)
-        self._scoreThreshold = 0.5
+        self.setScoreThreshold(0.5)
         # Modify 'Auto' label to set red color
         self._labels['B'] = self.Label(name='B', color='#FF0000')
         self._showBelow = True
 
-    def __coordsBelow(self, micId):
-        return len([c for c in self._getCoordsList(micId)
-                    if c.score < self._scoreThreshold])
-
     def getParams(self):
         Param = dv.models.Param
-        scoreThreshold = Param('scoreThreshold', 'float', value=0.5,
-                               display='slider', range=(0, 1.0),
-                               label='Score threshold',
-                               help='Display coordinates with score above '
-                                    'this value.')
+        scoreThreshold = self.createScoreThresholdParam()
 
         proximityRadius = Param('proximityRadius', 'int', value=40,
                                 display='slider', range=(0, 100),
@@ -59,8 +51,8 @@ class MyPickerModel(dv.models.PickerCmpModel):
             self._models[0].pickRandomly(micId, n=values['n'])
             self._models[1].pickRandomly(micId, n=values['n'])
             self.markAll()
-        elif paramName == 'scoreThreshold':
-            self._scoreThreshold = getValuesFunc()['scoreThreshold']
+        elif paramName == dv.models.PARAM_SCORE_THRESHOLD:
+            r = self.setScoreThreshold(paramValue)
         elif paramName == 'clear':
             self.clearMicrograph(micId)
         elif paramName == 'showBelow':
@@ -73,10 +65,13 @@ class MyPickerModel(dv.models.PickerCmpModel):
     def iterCoordinates(self, micId):
         # Re-implement this to show only these above the threshold
         # or with a different color (label)
-        for coord in self._getCoordsList(micId):
-            good = coord.score > self._scoreThreshold
-            if good or self._showBelow:
-                yield coord
+        if self._showBelow:
+            coords = self._getCoordsList(micId)
+        else:
+            coords = self.iterCoordinatesAbove(micId)
+
+        for coord in coords:
+            yield coord
 
     def getRowsCount(self):
         return self._models[0].getRowsCount()
@@ -101,7 +96,7 @@ class MyPickerModel(dv.models.PickerCmpModel):
             return dv.models.PickerCmpModel.getValue(self, row, col)
         elif col == 4:  # Coordinates
             mic2 = self._models[1].getMicrographByIndex(row)
-            return len(mic2) + len(mic) - self.__coordsBelow(micId)
+            return len(mic2) + len(mic) - self.countBelow(micId)
         else:
             raise Exception("Invalid column value '%s'" % col)
 
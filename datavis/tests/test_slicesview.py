@@ -16,7 +16,7 @@ class TestSlicesView(dv.tests.TestView):
     def createView(self):
         model = dv.tests.createSlicesModel((512, 512), 50)
         return dv.views.SlicesView(model=model, text='Slice, image number: ',
-                                   currentValue=1)
+                                   currentValue=1, fps=25)
 
     def test_SlicesView(self):
         print('test_SlicesView')
@@ -0,0 +1,42 @@
+
+import gc
+import unittest
+import weakref
+
+import datavis as dv
+
+
+class TestTableModels(dv.tests.TestBase):
+
+    def test_TableConfig(self):
+        print('test_TableConfig')
+        ColumnConfig = dv.models.ColumnConfig
+        cols = [ColumnConfig('c%d' % i, dv.models.TYPE_INT,
+                             renderable=(i % 10 == 0)) for i in range(500)]
+        config = dv.models.TableConfig(*cols)
+        self.assertEqual(config.getColumnsCount(), 500)
+        self.assertEqual(config.getColumnsCount(renderable=True), 50)
+        self.assertEqual(config.getColumnsCount(renderable=True,
+                                                visible=False), 0)
+        # The index is updated when the properties change
+        cols[0].config(visible=False)
+        cols[5][dv.models.RENDERABLE] = True
+        self.assertEqual([i for i, _ in config.iterColumns(visible=False)],
+                         [0])
+        self.assertEqual([i for i, _ in config.iterColumns(
+            renderable=True)][:3], [0, 5, 10])
+        self.assertTrue(config.hasColumnConfig(renderable=True,
+                                               visible=False))
+        self.assertFalse(config.hasColumnConfig(editable=True))
+        with self.assertRaises(Exception):
+            config.getColumnsCount(invalid=True)
+        # The columns do not keep alive the configs that were discarded
+        ref = weakref.ref(config)
+        del config
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertEqual(cols[0]._listeners, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
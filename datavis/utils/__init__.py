@@ -1,2 +1,3 @@
 
 from .path import *
+from .cache import *
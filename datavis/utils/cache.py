@@ -0,0 +1,228 @@
+"""
+This module contains the caching related utilities
+inside the utils module
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+__all__ = ['LRUCache', 'Prefetcher']
+
+
+class LRUCache:
+    """ Simple dict-like cache that keeps at most maxSize items, discarding
+    the least recently used ones when new items are added.
+
+    Optionally, the cache can also have a memory budget: the size of each
+    item is measured with sizeFunc when it is stored or accessed, and the
+    least recently used items are discarded while the total size is over
+    maxBytes (the last used item is always kept). Items that grow while they
+    are used (e.g. models that cache data) can be measured again with
+    updateSize.
+    """
+    def __init__(self, maxSize, maxBytes=None, sizeFunc=None):
+        """ Create a new LRUCache.
+
+        Args:
+            maxSize: (int) The maximum number of items in the cache.
+            maxBytes: (int) The maximum total size of the items, or None.
+            sizeFunc: Function that returns the size (bytes) of an item.
+                Required if maxBytes is given.
+        """
+        if maxBytes is not None and sizeFunc is None:
+            raise Exception("A sizeFunc is required to limit the cache size")
+        self._maxSize = maxSize
+        self._maxBytes = maxBytes
+        self._sizeFunc = sizeFunc
+        self._items = OrderedDict()
+        # Size of each item: {key: bytes}
+        self._sizes = dict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getitem__(self, key):
+        value = self._items[key]
+        self._items.move_to_end(key)
+        self.updateSize(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.pop(key)
+        self._items[key] = value
+        self.updateSize(key)
+
+    def updateSize(self, key):
+        """ Measure again the size of the given item, if it is cached, and
+        discard the least recently used items if the cache is over budget.
+        """
+        if self._sizeFunc is not None and key in self._items:
+            self._nbytes -= self._sizes.get(key, 0)
+            self._sizes[key] = self._sizeFunc(self._items[key])
+            self._nbytes += self._sizes[key]
+        while len(self._items) > self._maxSize or (
+                self._maxBytes is not None and len(self._items) > 1 and
+                self._nbytes > self._maxBytes):
+            self.pop(next(iter(self._items)))
+
+    def get(self, key, default=None):
+        """ Return the value for key if it is cached, else default. """
+        return self[key] if key in self._items else default
+
+    def pop(self, key, default=None):
+        """ Remove the given key and return its value, or default. """
+        self._nbytes -= self._sizes.pop(key, 0)
+        return self._items.pop(key, default)
+
+    def clear(self):
+        """ Remove all items from the cache. """
+        self._items.clear()
+        self._sizes.clear()
+        self._nbytes = 0
+
+    def getNBytes(self):
+        """ Return the total size of the items, measured with sizeFunc. """
+        return self._nbytes
+
+    def getMaxSize(self):
+        """ Return the maximum number of items in the cache. """
+        return self._maxSize
+
+
+class Prefetcher:
+    """ Load values in background threads and keep them in a
+    :class:`LRUCache`.
+
+    The values are loaded by calling loadFunc(key). Keys requested with
+    prefetch are loaded in a worker thread, so a later call to get
+    will find them in the cache (or wait for the load already in progress).
+    After shutdown, the values are loaded in the calling thread of get and
+    prefetch does nothing.
+    """
+    def __init__(self, loadFunc, maxSize=4, workers=1, maxBytes=None,
+                 sizeFunc=None):
+        """ Create a new Prefetcher.
+
+        Args:
+            loadFunc: Function that will be called to load the value of a key.
+                It will be called from the worker threads, so it should be
+                thread-safe.
+            maxSize: (int) The maximum number of cached values.
+            workers: (int) The number of worker threads.
+            maxBytes: (int) Memory budget of the cache, see :class:`LRUCache`.
+            sizeFunc: Function that returns the size (bytes) of a value.
+        """
+        self._loadFunc = loadFunc
+        self._cache = LRUCache(maxSize, maxBytes=maxBytes, sizeFunc=sizeFunc)
+        # Loads in progress: {key: (token, future)}
+        self._pending = dict()
+        # Invalidated loads that were already running: {key: future}
+        self._stale = dict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._shutdown = False
+
+    def __isPending(self, key, token):
+        return self._pending.get(key, (None, None))[0] is token
+
+    def __waitStale(self, key):
+        """ Wait for an invalidated load of the key that is still running, so
+        loadFunc is never called twice at the same time for the same key. """
+        with self._lock:
+            future = self._stale.get(key)
+        if future is not None:
+            wait([future])
+            with self._lock:
+                if self._stale.get(key) is future:
+                    del self._stale[key]
+
+    def __load(self, key, token):
+        """ Load the value in a worker thread and store it in the cache, only
+        if the key was not invalidated in the meantime.
+        """
+        try:
+            self.__waitStale(key)
+            value = self._loadFunc(key)
+            with self._lock:
+                if self.__isPending(key, token):
+                    self._cache[key] = value
+            return value
+        finally:
+            with self._lock:
+                if self.__isPending(key, token):
+                    del self._pending[key]
+
+    def get(self, key):
+        """ Return the value for the given key. If the value is being loaded
+        in background, wait for it, otherwise load it in the calling thread.
+        """
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            future = self._pending.get(key, (None, None))[1]
+
+        if future is not None:
+            return future.result()
+
+        self.__waitStale(key)
+        value = self._loadFunc(key)
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+    def updateSize(self, key):
+        """ Measure again the size of the cached value of the given key,
+        see :meth:`LRUCache.updateSize`. """
+        with self._lock:
+            self._cache.updateSize(key)
+
+    def prefetch(self, keys):
+        """ Load the given keys in background, if they are not already cached.
+        Queued loads of other keys that have not started yet are cancelled.
+
+        Args:
+            keys: An iterable over the keys that will be loaded.
+        """
+        keys = list(keys)
+        with self._lock:
+            if self._shutdown:
+                return
+            for k, (_, future) in list(self._pending.items()):
+                if k not in keys and future.cancel():
+                    del self._pending[k]
+
+            for k in keys:
+                if k not in self._cache and k not in self._pending:
+                    token = object()
+                    self._pending[k] = token, self._executor.submit(
+                        self.__load, k, token)
+
+    def invalidate(self, key=None):
+        """ Remove the given key from the cache, ignoring the result of its
+        load if it is in progress. If key is None, all keys are removed.
+        A new load of a key waits until its invalidated load has finished.
+        """
+        with self._lock:
+            keys = list(self._pending) if key is None else [key]
+            for k in keys:
+                if k in self._pending:
+                    future = self._pending.pop(k)[1]
+                    if not future.cancel():
+                        self._stale[k] = future
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key)
+
+    def shutdown(self):
+        """ Stop the worker threads. Pending loads will be cancelled. """
+        with self._lock:
+            self._shutdown = True
+        self.invalidate()
+        self._executor.shutdown(wait=False)
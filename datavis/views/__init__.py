@@ -1,9 +1,15 @@
 from ._constants import *
+from ._colormap import (ColorMap, registerColorMap, getColorMap,
+                        getColorMapNames, getColorMapLut)
 
 # Basic Image views
 from ._image_view import ImageView
 from ._slices_view import SlicesView
 from ._multislice_view import MultiSliceView
+from ._oblique_view import ObliqueSliceView
+from ._view_group import ImageViewGroup
+from ._export import (renderImage, writeImage, createMontage, exportImages,
+                      exportMontages)
 
 # Table related views
 from ._gallery import GalleryView
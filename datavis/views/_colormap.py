@@ -0,0 +1,200 @@
+
+from functools import lru_cache
+
+import numpy as np
+
+
+# Colors used to highlight the values outside the levels (clip mode). They
+# are added to the lookup tables as two extra entries, before and after the
+# colors of the map.
+CLIP_LOW_COLOR = (0, 0, 255, 255)
+CLIP_HIGH_COLOR = (255, 0, 0, 255)
+
+# Types rendered through a lookup table indexed by the raw bits of the
+# values: {dtype: unsigned type of the same size}
+NATIVE_LUT_TYPES = {
+    np.dtype(np.uint8): np.dtype(np.uint8),
+    np.dtype(np.int8): np.dtype(np.uint8),
+    np.dtype(np.uint16): np.dtype(np.uint16),
+    np.dtype(np.int16): np.dtype(np.uint16),
+    np.dtype(np.float16): np.dtype(np.uint16)
+}
+
+
+class ColorMap:
+    """ Color map defined by a list of colors placed at given positions in
+    the [0, 1] range. The colors between them are linearly interpolated.
+
+    Example of use:
+        cmap = ColorMap('fire', [(0, 0, 0), (255, 0, 0), (255, 255, 0)])
+        registerColorMap(cmap)
+        imageView.setColorMap('fire', gamma=0.8)
+    """
+    def __init__(self, name, colors, positions=None):
+        """ Create a new ColorMap.
+
+        Args:
+            name:      (str) The name of the color map.
+            colors:    List of (r, g, b) or (r, g, b, a) colors, with values
+                       in the [0, 255] range.
+            positions: List of increasing positions of the colors, in the
+                       [0, 1] range. By default, the colors are equally spaced.
+        """
+        colors = np.array([tuple(c) + (255,) * (4 - len(c)) for c in colors],
+                          dtype=np.float64)
+        if positions is None:
+            positions = np.linspace(0, 1, len(colors))
+        positions = np.asarray(positions, dtype=np.float64)
+        if len(colors) < 2 or positions.shape != (len(colors),):
+            raise Exception("Invalid color map '%s': at least two colors and "
+                            "one position for each color are required" % name)
+        self._name = name
+        self._colors = colors
+        self._positions = positions
+
+    def getName(self):
+        """ Return the name of the color map """
+        return self._name
+
+    def createLut(self, size=256, gamma=1.0, invert=False, clip=False):
+        """ Create the lookup table for this color map.
+
+        Args:
+            size:   (int) The number of colors of the table.
+            gamma:  (float) Gamma correction applied to the positions.
+            invert: (boolean) If True, the color map is reversed.
+            clip:   (boolean) If True, CLIP_LOW_COLOR and CLIP_HIGH_COLOR are
+                    added before and after the colors of the map, for the
+                    values outside the levels (see levelsToIndex).
+
+        Returns:
+            A (size, 4) uint8 array with RGBA colors, or (size + 2, 4) if
+            clip is True.
+        """
+        x = np.linspace(0, 1, size)
+        if gamma != 1:
+            x = x ** gamma
+        if invert:
+            x = 1 - x
+        lut = np.empty((size, 4), dtype=np.uint8)
+        for i in range(4):
+            lut[:, i] = np.rint(np.interp(x, self._positions,
+                                          self._colors[:, i]))
+        if clip:
+            lut = np.concatenate([np.array([CLIP_LOW_COLOR], dtype=np.uint8),
+                                  lut,
+                                  np.array([CLIP_HIGH_COLOR], dtype=np.uint8)])
+        return lut
+
+
+_COLORMAPS = dict()
+
+
+def registerColorMap(colorMap):
+    """ Register the given :class:`ColorMap`, replacing any previous color map
+    with the same name. """
+    _COLORMAPS[colorMap.getName()] = colorMap
+    # The tables of a replaced color map are not valid anymore
+    getColorMapLut.cache_clear()
+    getLevelsLut.cache_clear()
+
+
+def getColorMap(name):
+    """ Return the registered :class:`ColorMap` with the given name """
+    if name not in _COLORMAPS:
+        raise Exception("Unknown color map: '%s'" % name)
+    return _COLORMAPS[name]
+
+
+def getColorMapNames():
+    """ Return the names of the registered color maps """
+    return list(_COLORMAPS.keys())
+
+
+@lru_cache(maxsize=64)
+def getColorMapLut(name, gamma=1.0, invert=False, clip=False, size=256):
+    """ Return the cached lookup table of the given color map.
+    See :meth:`ColorMap.createLut`. The returned array is read-only, it is
+    shared by all the views that use the same color map. """
+    lut = getColorMap(name).createLut(size=size, gamma=gamma, invert=invert,
+                                      clip=clip)
+    lut.setflags(write=False)
+    return lut
+
+
+def levelsToIndex(values, levels, size, clip=False):
+    """ Map the given float values to the indexes of a lookup table with
+    size colors, for the given levels. NaN values are mapped to the first
+    color.
+
+    Args:
+        values: (numpy array) The float values.
+        levels: (min, max) The values mapped to the first and last colors.
+        size:   (int) The number of colors of the table.
+        clip:   (boolean) If True, the table has the two extra clip entries
+                (see ColorMap.createLut): the values below the levels are
+                mapped to the first entry and the values above them to the
+                last one. The colors of the map start at index 1.
+
+    Returns:
+        A numpy array of unsigned int indexes with the shape of values.
+    """
+    scale = size - 1
+    minLevel, maxLevel = float(levels[0]), float(levels[1])
+    diff = (maxLevel - minLevel) or 1
+    index = values - values.dtype.type(minLevel)
+    index *= values.dtype.type(scale / diff)
+    with np.errstate(invalid='ignore'):
+        np.clip(index, 0, scale, out=index)
+    index = np.nan_to_num(index, copy=False)
+    if not clip:
+        return index.astype(np.min_scalar_type(scale))
+
+    index = index.astype(np.min_scalar_type(size + 1))
+    index += 1
+    with np.errstate(invalid='ignore'):
+        index[values < minLevel] = 0
+        index[values > maxLevel] = size + 1
+    return index
+
+
+def createLevelsLut(dtype, levels, lut=None, clip=False):
+    """ Return the lookup table that maps every value of the given 8 or 16
+    bits type to its display value (or color if lut is given), for the given
+    levels. The table is indexed by the raw bits of the values, so it has
+    256 or 65536 entries. NaN values are mapped to the first color.
+    If clip is True, lut should have the two extra clip entries (see
+    ColorMap.createLut), used for the values outside the levels.
+    """
+    viewType = NATIVE_LUT_TYPES[dtype]
+    values = np.arange(np.iinfo(viewType).max + 1,
+                       dtype=viewType).view(dtype).astype(np.float64)
+    if lut is None:
+        return levelsToIndex(values, levels, 256)
+    lut = np.asarray(lut)
+    size = lut.shape[0] - 2 if clip else lut.shape[0]
+    return lut[levelsToIndex(values, levels, size, clip)]
+
+
+@lru_cache(maxsize=16)
+def getLevelsLut(dtype, minLevel, maxLevel, colorMapKey):
+    """ Return the cached table created by :func:`createLevelsLut` for
+    the color map given as a (name, gamma, invert, clip) tuple. """
+    lut = createLevelsLut(dtype, (minLevel, maxLevel),
+                          getColorMapLut(*colorMapKey), clip=colorMapKey[3])
+    lut.setflags(write=False)
+    return lut
+
+
+for _cmap in [
+    ColorMap('grey', [(0, 0, 0), (255, 255, 255)]),
+    ColorMap('hot', [(0, 0, 0), (230, 0, 0), (255, 210, 0), (255, 255, 255)],
+             [0, 0.375, 0.75, 1]),
+    ColorMap('jet', [(0, 0, 143), (0, 0, 255), (0, 255, 255), (255, 255, 0),
+                     (255, 0, 0), (128, 0, 0)],
+             [0, 0.125, 0.375, 0.625, 0.875, 1]),
+    ColorMap('viridis', [(68, 1, 84), (71, 44, 122), (59, 81, 139),
+                         (44, 113, 142), (33, 144, 141), (39, 173, 129),
+                         (92, 200, 99), (170, 220, 50), (253, 231, 37)])]:
+    registerColorMap(_cmap)
+del _cmap
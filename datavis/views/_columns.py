@@ -284,6 +284,17 @@ class ColumnsView(PagingView):
         self._pageItemModel.modelConfigChanged()
         self.__updateSelectionInView(self._pagingInfo.currentPage - 1)
 
+    def updateRows(self, rows, columns=None):
+        """ Updates the visualization of the given rows, only if they are
+        in the current page.
+
+        Args:
+            rows: Iterable over the rows (in the whole table model).
+            columns: Iterable over the column indexes that changed. If None,
+                all columns will be updated.
+        """
+        self._pageItemModel.dataRowsChanged(rows, columns)
+
     @qtc.pyqtSlot()
     def modelChanged(self):
         """ Slot for model data changed notification. Informs about external
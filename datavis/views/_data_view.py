@@ -98,6 +98,11 @@ class DataView(qtw.QWidget):
         self._selection = set()
         self._selectionMode = PagingView.NO_SELECTION
         self._tablePref = dict()
+        # The views are created the first time they are shown, with these args
+        self.__viewKwargs = dict(kwargs)
+        # Config of the views whose model has not been set yet: {view: config}
+        self.__pendingConfigs = dict()
+        self.__pageBarVisible = True
 
         self._defaultRowHeight = kwargs.get('size', 64)
         self._maxRowHeight = kwargs.get('maxCellSize', 300)
@@ -143,7 +148,6 @@ class DataView(qtw.QWidget):
         # Create views and add to StackedLayout
         self._stackedLayout = qtw.QStackedLayout(viewsContainerLayout)
         self._stackedLayout.setSpacing(0)
-        self.__createViews(model=EmptyTableModel(), **kwargs)
         # Create status bar
         self._statusBar = qtw.QStatusBar(self)
         self._statusBar.setVisible(False)  # hide for now
@@ -411,7 +415,11 @@ class DataView(qtw.QWidget):
 
         d = pref[TABLE_CONFIG]
         for v in self._viewsDict.keys():
-            d[v] = self.getView(v).getDisplayConfig()
+            viewWidget = self.__getCreatedView(v)
+            if viewWidget is not None:
+                d[v] = viewWidget.getDisplayConfig()
+            elif v in self.__pendingConfigs:
+                d[v] = self.__pendingConfigs[v]
 
     def __loadPreferencesForCurrentTable(self):
         """ Load preferences for the current table """
@@ -457,20 +465,6 @@ class DataView(qtw.QWidget):
         viewWidget.sigSelectionChanged.connect(
             self.__onCurrentViewSelectionChanged)
 
-    def __disconnectViewSignals(self, viewWidget):
-        """
-        Disconnects the view signals form the internal slots
-
-        Args:
-           viewWidget: The view widget.
-        """
-        viewWidget.sigCurrentRowChanged.disconnect(self.__onViewRowChanged)
-        viewWidget.getPageBar().sigPagingInfoChanged.disconnect(
-            self.__onPageConfigChanged)
-        viewWidget.sigSelectionChanged.disconnect(
-            self.__onCurrentViewSelectionChanged)
-        viewWidget.sigCurrentRowChanged.disconnect(self.__onViewRowChanged)
-
     def __createView(self, viewType, **kwargs):
         """ Create and return a view. The parent of the view will be self.
 
@@ -484,35 +478,33 @@ class DataView(qtw.QWidget):
         kwargs['parent'] = self
         return viewClass(**kwargs)
 
-    def __createViews(self, **kwargs):
-        """ Create the views if necessary. Inserts the views in the GUI. """
-        for view in self.VIEWS_DEFAULT.keys():
-            if self.hasView(view):
-                viewInfo = self._viewsDict[view]
-                if viewInfo.get(VIEW) is None:
-                    viewWidget = self.__createView(view, **kwargs)
-                    viewInfo[VIEW] = viewWidget
-                    if viewWidget is not None:
-                        viewWidget.setContextMenuPolicy(
-                            qtc.Qt.ActionsContextMenu)
-                        viewWidget.addAction(self._actSelectAll)
-                        viewWidget.addAction(self._actSelectFromHere)
-                        viewWidget.addAction(self._actSelectToHere)
-                        self._stackedLayout.addWidget(viewWidget)
-                        self.__connectViewSignals(viewWidget)
-            else:
-                self.__removeView(view)
-
-    def __removeView(self, view):
-        """ If the given view exist in the GUI then will be removed. """
-        viewInfo = self._viewsDict[view]
-        viewWidget = viewInfo[VIEW]
-        if viewWidget is not None:
-            self._stackedLayout.removeWidget(viewWidget)
-            viewInfo[VIEW] = None
-            viewWidget.setParent(None)
-            self.__disconnectViewSignals(viewWidget)
-            del viewWidget
+    def __initView(self, viewType):
+        """ Create the view of the given type and insert it in the GUI. The
+        current state of the DataView (selection mode, page bar, cell size)
+        is applied to the new view. """
+        viewInfo = self._viewsDict[viewType]
+        viewWidget = self.__createView(viewType, model=EmptyTableModel(),
+                                       **self.__viewKwargs)
+        viewInfo[VIEW] = viewWidget
+        viewWidget.addAction(self._actSelectAll)
+        viewWidget.addAction(self._actSelectFromHere)
+        viewWidget.addAction(self._actSelectToHere)
+        viewWidget.setSelectionMode(self._selectionMode)
+        viewWidget.setContextMenuPolicy(
+            qtc.Qt.ActionsContextMenu if self._actSelections.isVisible()
+            else qtc.Qt.NoContextMenu)
+        viewWidget.showPageBar(self.__pageBarVisible)
+        self._stackedLayout.addWidget(viewWidget)
+        self.__connectViewSignals(viewWidget)
+        return viewWidget
+
+    def __getCreatedView(self, viewType=None):
+        """ Return the view of the given type (or the current view) only if it
+        has been created and has the current model, None otherwise. """
+        viewType = viewType or self._viewKey
+        if viewType in self.__pendingConfigs:
+            return None
+        return self._viewsDict[viewType].get(VIEW)
 
     def __setupAllWidgets(self):
         """
@@ -551,7 +543,7 @@ class DataView(qtw.QWidget):
         """
         if viewType is None:
             viewType = self._viewKey
-        viewWidget = self._viewsDict[viewType][VIEW]
+        viewWidget = self.__getCreatedView(viewType)
         config = None if viewWidget is None else viewWidget.getDisplayConfig()
         return config is not None and config.hasColumnConfig(renderable=True)
 
@@ -606,19 +598,26 @@ class DataView(qtw.QWidget):
                 gConfig = viewWidget.getDisplayConfig()
                 if not gConfig.hasColumnConfig(renderable=True):
                     setup = False
-                    for viewInfo in self._viewsDict.values():
-                        widget = viewInfo[VIEW]
-                        viewType = widget.getViewType()
-                        if not viewType == GALLERY:
+                    for viewType in self._viewsDict.keys():
+                        if viewType == GALLERY:
+                            continue
+                        widget = self.__getCreatedView(viewType)
+                        if widget is not None:
                             config = widget.getDisplayConfig()
-                            if config is not None:
-                                for i, r in config.iterColumns(renderable=True):
-                                    c = gConfig.getColumnConfig(i)
-                                    if not c[RENDERABLE_RO]:
-                                        c[RENDERABLE] = True
-                                        setup = True
-                                        viewWidget.setModelColumn(i)
-                                        break
+                        elif viewType in self.__pendingConfigs:
+                            # The view will get this config when it is shown
+                            config = (self.__pendingConfigs[viewType] or
+                                      self._model.createDefaultConfig())
+                        else:
+                            config = None
+                        if config is not None:
+                            for i, r in config.iterColumns(renderable=True):
+                                c = gConfig.getColumnConfig(i)
+                                if not c[RENDERABLE_RO]:
+                                    c[RENDERABLE] = True
+                                    setup = True
+                                    viewWidget.setModelColumn(i)
+                                    break
                         if setup:
                             break
         else:
@@ -647,9 +646,8 @@ class DataView(qtw.QWidget):
         tableName = self._model.getTableName()
         self.__loadPreferencesForCurrentTable()
         d = self.__getTableConfig(tableName) if config is None else config
-        for viewType in self._viewsDict.keys():
-            w = self.getView(viewType)
-            w.setModel(self._model, d.get(viewType))
+        # The model is set in each view when it is shown (see getView)
+        self.__pendingConfigs = {v: d.get(v) for v in self._viewsDict.keys()}
 
         self.__setupCurrentViewMode()
         self.__setupSpinBoxRowHeigth()
@@ -859,7 +857,8 @@ class DataView(qtw.QWidget):
                 markers += ' %s' % p['marker']
 
             # sorted column
-            columnsWidget = self.getView(COLUMNS)
+            columnsWidget = (self.__getCreatedView(COLUMNS)
+                             if self.hasView(COLUMNS) else None)
             sOrder = None
             if columnsWidget is not None:
                 hHeader = columnsWidget.getHorizontalHeader()
@@ -1010,7 +1009,7 @@ class DataView(qtw.QWidget):
     @qtc.pyqtSlot()
     def _showViewDims(self):
         """ Update the widgets used to display the column and row count """
-        viewWidget = self.getView()
+        viewWidget = self.__getCreatedView()
         if viewWidget is None:
             rows = "0"
             cols = "0"
@@ -1115,6 +1114,7 @@ class DataView(qtw.QWidget):
 
     def showPageBar(self, visible):
         """ Show or hide the page bar """
+        self.__pageBarVisible = visible
         for widget in self.getAllViews():
             widget.showPageBar(visible)
 
@@ -1132,16 +1132,30 @@ class DataView(qtw.QWidget):
         return the view.
         if viewType=None then return the current view.
         viewType that can be used: COLUMNS, GALLERY, ITEMS
+
+        The views are created, and the current model is set, the first time
+        they are requested, so the views that are never shown are not created.
         """
-        return self._viewsDict[viewType or self._viewKey][VIEW]
+        viewType = viewType or self._viewKey
+        viewWidget = self._viewsDict[viewType].get(VIEW)
+        if viewWidget is None:
+            viewWidget = self.__initView(viewType)
+        if viewType in self.__pendingConfigs:
+            config = self.__pendingConfigs.pop(viewType)
+            viewWidget.setModel(self._model, config)
+            if viewType in [COLUMNS, GALLERY]:
+                size = self._spinBoxRowHeight.getValue()
+                viewWidget.setIconSize((size, size))
+        return viewWidget
 
     def hasView(self, viewKey):
         """ Return True if the given viewKey is present in the DataView. """
         return viewKey in self._viewsDict
 
     def getAllViews(self):
-        """ Returns a list with the current view widgets """
-        return [v[VIEW] for v in self._viewsDict.values()]
+        """ Returns a list with the view widgets that have been created """
+        return [v[VIEW] for v in self._viewsDict.values()
+                if v.get(VIEW) is not None]
 
     def setView(self, viewKey):
         """ Sets view as current view """
@@ -0,0 +1,273 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import PyQt5.QtCore as qtc
+import PyQt5.QtGui as qtg
+
+from .. import models
+from ._colormap import (NATIVE_LUT_TYPES, getColorMapLut, getLevelsLut,
+                        levelsToIndex)
+
+
+# QGuiApplication created for headless rendering, if there was not any
+_app = None
+
+
+def _initHeadless():
+    """ Make sure there is a Qt application for writing images, using the
+    offscreen platform if no application has been created. """
+    global _app
+    if qtc.QCoreApplication.instance() is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        _app = qtg.QGuiApplication([])
+
+
+def _getColorMapKey(colorMap):
+    """ Return the (name, gamma, invert, clip) tuple for the given color map,
+    that can be None (grey), a name or a tuple. """
+    if colorMap is None:
+        colorMap = 'grey'
+    if isinstance(colorMap, str):
+        return colorMap, 1.0, False, False
+    name, gamma, invert, clip = colorMap
+    return name, float(gamma), bool(invert), bool(clip)
+
+
+def renderImage(data, levels=None, percentiles=(0, 100), colorMap=None,
+                mask=None, maskColor='#66212a55'):
+    """ Render the given image data to RGBA colors, in the same way as
+    :class:`ImageView <datavis.views.ImageView>` does, but without any widget.
+
+    Args:
+        data:        2D array with the image data.
+        levels:      (min, max) levels. If None, the levels are computed from
+                     the given percentiles of the data.
+        percentiles: (lower, upper) percentiles used when levels is None.
+        colorMap:    The name of a registered color map or a
+                     (name, gamma, invert, clip) tuple, as returned by
+                     ImageView.getColorMap. By default, grey.
+        mask:        2D array with the same shape than data. The pixels where
+                     the mask is 0 are covered with maskColor.
+        maskColor:   (str or QColor) The mask color in #ARGB format.
+
+    Returns:
+        A (rows, columns, 4) uint8 array with the RGBA colors.
+    """
+    data = np.asarray(data)
+    if data.ndim != 2:
+        raise Exception("Image data should be two-dimensional. (%s)"
+                        % str(data.shape))
+    if levels is None:
+        levels = models.ImageModel(data).getLevels(*percentiles) or (0, 1)
+    key = _getColorMapKey(colorMap)
+    minLevel, maxLevel = float(levels[0]), float(levels[1])
+
+    if data.dtype in NATIVE_LUT_TYPES:
+        table = getLevelsLut(data.dtype, minLevel, maxLevel, key)
+        rgba = table[data.view(NATIVE_LUT_TYPES[data.dtype])]
+    else:
+        lut = getColorMapLut(*key)
+        clip = key[3]
+        size = lut.shape[0] - 2 if clip else lut.shape[0]
+        # Keep single precision, the index is clipped to the table anyway
+        rgba = lut[levelsToIndex(data.astype(np.float32, copy=False),
+                                 (minLevel, maxLevel), size, clip)]
+
+    if mask is not None:
+        c = qtg.QColor(maskColor)
+        alpha = c.alpha() / 255.
+        color = np.array([c.red(), c.green(), c.blue()], dtype=np.float32)
+        covered = np.asarray(mask) == 0
+        rgb = rgba[covered, :3] * (1 - alpha) + color * alpha
+        rgba[covered, :3] = np.rint(rgb).astype(np.uint8)
+
+    return rgba
+
+
+def writeImage(path, rgba):
+    """ Write the given RGBA image to a file. The format is taken from the
+    file extension (PNG, TIFF, JPG...), see QImageWriter. """
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    h, w = rgba.shape[:2]
+    buffer = rgba.tobytes()
+    image = qtg.QImage(buffer, w, h, 4 * w, qtg.QImage.Format_RGBA8888)
+    if not image.save(path):
+        raise Exception("Could not write image: '%s'" % path)
+
+
+def createMontage(images, columns, spacing=2, background=(0, 0, 0, 255)):
+    """ Arrange the given RGBA images in a grid.
+
+    Args:
+        images:     List of (rows, columns, 4) uint8 arrays. Images smaller
+                    than the biggest one are centered in their cell.
+        columns:    (int) The number of images in each row of the grid.
+        spacing:    (int) The number of pixels between the images.
+        background: (r, g, b, a) The color of the empty space.
+
+    Returns:
+        A (rows, columns, 4) uint8 array with the montage.
+    """
+    if not images:
+        raise Exception("There are no images for the montage")
+    h = max(img.shape[0] for img in images)
+    w = max(img.shape[1] for img in images)
+    columns = min(columns, len(images))
+    rows = -(-len(images) // columns)
+    sheet = np.empty((rows * (h + spacing) - spacing,
+                      columns * (w + spacing) - spacing, 4), dtype=np.uint8)
+    sheet[...] = background
+    for i, img in enumerate(images):
+        y = (i // columns) * (h + spacing) + (h - img.shape[0]) // 2
+        x = (i % columns) * (w + spacing) + (w - img.shape[1]) // 2
+        sheet[y:y + img.shape[0], x:x + img.shape[1]] = img
+    return sheet
+
+
+def _binImage(data, factor):
+    """ Reduce the size of the image by averaging blocks of factor x factor
+    pixels. """
+    if factor <= 1:
+        return data
+    h, w = data.shape[0] // factor, data.shape[1] // factor
+    blocks = data[:h * factor, :w * factor].reshape((h, factor, w, factor))
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+
+def _exportImage(path, data, renderKwargs):
+    """ Render and write a single image. Executed in the worker processes. """
+    writeImage(path, renderImage(data, **renderKwargs))
+    return path
+
+
+def _exportMontage(path, dataList, columns, spacing, binning, renderKwargs):
+    """ Render and write a montage. Executed in the worker processes. """
+    tiles = [renderImage(_binImage(data, binning), **renderKwargs)
+             for data in dataList]
+    writeImage(path, createMontage(tiles, columns, spacing=spacing))
+    return path
+
+
+def _runJobs(func, jobs, workers):
+    """ Execute func(*args) for each args of the jobs iterable, using a pool
+    of worker processes. Only a few jobs are submitted in advance, so the
+    data of the jobs is not loaded at once.
+
+    Returns:
+        The list with the result of each job, in the same order.
+    """
+    if workers <= 1:
+        _initHeadless()
+        return [func(*args) for args in jobs]
+
+    results = []
+    pending = deque()
+    # Forking a process with a Qt application running is not safe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_initHeadless) as executor:
+        for args in jobs:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= 2 * workers:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    return results
+
+
+def _getImagesSource(model, col, rows):
+    """ Return the (TableModel, column, rows) that will be exported from the
+    given TableModel or SlicesModel. """
+    if isinstance(model, models.SlicesModel):
+        model = models.SlicesTableModel(model, 'Slice')
+    if col is None:
+        cols = [i for i, _ in
+                model.createDefaultConfig().iterColumns(renderable=True)]
+        if not cols:
+            raise Exception("The model does not have any renderable column")
+        col = cols[0]
+    if rows is None:
+        rows = range(model.getRowsCount())
+    return model, col, rows
+
+
+def exportImages(model, pathTemplate, col=None, rows=None, workers=1,
+                 **kwargs):
+    """ Export the images of a renderable column of a TableModel, or the
+    slices of a SlicesModel, to image files. No widget is needed, the
+    images are rendered with :func:`renderImage` in a pool of worker
+    processes (using the Qt offscreen platform).
+
+    Example of use, with the same settings than an ImageView:
+        exportImages(model, 'particle_%06d.png', workers=8,
+                     levels=imageView.getLevels(),
+                     colorMap=imageView.getColorMap(),
+                     mask=imageView.getMaskImage())
+
+    Args:
+        model:        A TableModel or SlicesModel.
+        pathTemplate: (str) The path of the files, with a %d placeholder
+                      that will be replaced by the row (or slice) index.
+        col:          (int) The column with the images. By default, the
+                      first renderable column.
+        rows:         Iterable with the row indexes. By default, all rows.
+        workers:      (int) The number of worker processes. If 1, the images
+                      are exported in the current process.
+
+    Keyword Args:
+        The render params (levels, percentiles, colorMap, mask, maskColor),
+        see :func:`renderImage`.
+
+    Returns:
+        The list of the written paths.
+    """
+    model, col, rows = _getImagesSource(model, col, rows)
+    jobs = ((pathTemplate % row, model.getData(row, col), kwargs)
+            for row in rows)
+    return _runJobs(_exportImage, jobs, workers)
+
+
+def exportMontages(model, pathTemplate, col=None, rows=None, columns=10,
+                   size=100, spacing=2, binning=1, workers=1, **kwargs):
+    """ Export the images of a renderable column of a TableModel, or the
+    slices of a SlicesModel, to montage sheets. See :func:`exportImages`.
+
+    Args:
+        model:        A TableModel or SlicesModel.
+        pathTemplate: (str) The path of the sheets, with a %d placeholder
+                      that will be replaced by the sheet index.
+        col:          (int) The column with the images. By default, the
+                      first renderable column.
+        rows:         Iterable with the row indexes. By default, all rows.
+        columns:      (int) The number of images in each row of the sheets.
+        size:         (int) The number of images in each sheet.
+        spacing:      (int) The number of pixels between the images.
+        binning:      (int) Reduce the images by this factor before
+                      rendering them.
+        workers:      (int) The number of worker processes.
+
+    Keyword Args:
+        The render params (levels, percentiles, colorMap, mask, maskColor),
+        see :func:`renderImage`. The mask should have the size of the
+        binned images.
+
+    Returns:
+        The list of the written paths.
+    """
+    model, col, rows = _getImagesSource(model, col, rows)
+    rows = list(rows)
+
+    def _jobs():
+        for i, first in enumerate(range(0, len(rows), size)):
+            dataList = [model.getData(row, col)
+                        for row in rows[first:first + size]]
+            yield (pathTemplate % i, dataList, columns, spacing, binning,
+                   kwargs)
+
+    return _runJobs(_exportMontage, _jobs(), workers)
@@ -1,6 +1,8 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+from functools import lru_cache
+
 import pyqtgraph as pg
 from pyqtgraph.exporters import ImageExporter as pgImageExporter
 from pyqtgraph import functions as fn
@@ -15,6 +17,8 @@ import PyQt5.QtGui as qtg
 
 from .. import widgets
 from .. import models
+from ._colormap import (NATIVE_LUT_TYPES, createLevelsLut, getLevelsLut,
+                        getColorMapLut, getColorMapNames, levelsToIndex)
 from ._constants import (AXIS_BOTTOM_LEFT, AXIS_TOP_LEFT, AXIS_TOP_RIGHT,
                          CIRCLE_ROI, RECT_ROI, ADD, REMOVE)
 
@@ -86,6 +90,17 @@ class ImageView(qtw.QWidget):
                        for image display. By default is None, so the data from
                        the pixel values will be used. Passing a different range
                        is useful for normalization of the slices in volumes.
+            percentiles: (lower, upper) The percentiles of the data used
+                       as levels when no levels are given. The levels and
+                       the histogram are computed over a sample of the data,
+                       that is cached in the image model. Default (0, 100).
+            colorMap:  (str) The name of the color map used to display the
+                       image (see getColorMapNames). By default, the
+                       histogram gradient is used.
+            gamma:     (float) Gamma correction of the color map. Default 1.
+            invertColorMap: (Bool) Reverse the color map. False by default.
+            clipHighlight: (Bool) Highlight the pixels outside the levels in
+                       blue (low) and red (high). False by default.
             preferredSize: (tuple). Minimum and maximum preferred image size.
 
             maskParams: Dictionary with mask-related params. Following are
@@ -103,6 +118,8 @@ class ImageView(qtw.QWidget):
                   should be a numpy array with values of the mask.
                 * color: (QColor or str) The color for the mask.
                   Example: '#66212a55' in ARGB format.
+                * undoLevels: (int) The maximum number of mask edits that
+                  can be undone. Default value: 20
                 * operation: What operation will be performed in the mask
                   * NONE (the mask editor is not shown) or
                   * ADD  (add 1 values to the mask with the pen) or
@@ -158,6 +175,9 @@ class ImageView(qtw.QWidget):
         self._axisPos = kwargs.get('axisPos', AXIS_BOTTOM_LEFT)
         self._axisColor = kwargs.get('axisColor')
         self._levels = kwargs.get('levels', None)
+        self._percentiles = kwargs.get('percentiles', (0, 100))
+        self._colorMap = None
+        colorMap = kwargs.get('colorMap')
         # mask params
         self.__updatingImage = False
         # ARGB format
@@ -174,9 +194,15 @@ class ImageView(qtw.QWidget):
         self._maskOperation = maskParams.get('operation')
         self._maskPenSize = maskParams.get('penSize', 50)
         self._showMaskHandles = maskParams.get('showHandles', True)
+        self._maskHistory = models.MaskHistory(
+            maskParams.get('undoLevels', 20))
         self.__setupGUI()
         self.__setupImageView()
         self._roi = None
+        if colorMap is not None:
+            self.setColorMap(colorMap, gamma=kwargs.get('gamma', 1.0),
+                             invert=kwargs.get('invertColorMap', False),
+                             clip=kwargs.get('clipHighlight', False))
         self.setModel(model)
         #if scale:
         #    self.setScale(scale)
@@ -188,7 +214,8 @@ class ImageView(qtw.QWidget):
         self._mainLayout = qtw.QHBoxLayout(self)
         self._mainLayout.setSpacing(0)
         self._mainLayout.setContentsMargins(1, 1, 1, 1)
-        self._imageView = pg.ImageView(parent=self, view=pg.PlotItem())
+        self._imageView = pg.ImageView(parent=self, view=pg.PlotItem(),
+                                       imageItem=_ModelImageItem())
         v = self.getViewBox()
         v.addItem(self._maskPen)
         self._maskPen.setAcceptedMouseButtons(qtc.Qt.NoButton)
@@ -234,6 +261,23 @@ class ImageView(qtw.QWidget):
         toolbar.addAction(self._actHistOnOff)
         vLayout.addWidget(toolbar)
 
+        # --Color Map--
+        toolbar = qtw.QToolBar(displayPanel)
+        toolbar.addWidget(qtw.QLabel('Color map ', toolbar))
+        self._comboColorMap = qtw.QComboBox(toolbar)
+        self._comboColorMap.addItem('default', None)
+        for name in getColorMapNames():
+            self._comboColorMap.addItem(name, name)
+        self._comboColorMap.currentIndexChanged.connect(
+            self.__onComboColorMapChanged)
+        toolbar.addWidget(self._comboColorMap)
+        self._actInvertColorMap = widgets.TriggerAction(
+            parent=toolbar, actionName="ICMap", text="Invert color map",
+            faIconName='fa5s.exchange-alt', checkable=True,
+            slot=self.__onInvertColorMapTriggered)
+        toolbar.addAction(self._actInvertColorMap)
+        vLayout.addWidget(toolbar)
+
         # -- Axis --
         toolbar = qtw.QToolBar(displayPanel)
         toolbar.addWidget(qtw.QLabel('Axis ', toolbar))
@@ -325,7 +369,7 @@ class ImageView(qtw.QWidget):
         vLayout.addWidget(btnReset)
 
         vLayout.addStretch()
-        displayPanel.setFixedHeight(260)
+        displayPanel.setFixedHeight(295)
         actDisplay = widgets.TriggerAction(parent=self._toolBar,
                                            actionName="ADisplay",
                                            text='Display',
@@ -415,7 +459,7 @@ class ImageView(qtw.QWidget):
         tb.addWidget(self._radioButtonAddMask)
         self._radioButtonRemoveMask = qtw.QRadioButton(text='Remove', parent=tb)
         tb.addWidget(self._radioButtonRemoveMask)
-        maskPanel.setFixedHeight(190)
+        maskPanel.setFixedHeight(225)
         self._maskButtonGroup = qtw.QButtonGroup(tb)
         self._maskButtonGroup.setExclusive(True)
         self._maskButtonGroup.addButton(self._radioButtonRemoveMask)
@@ -439,6 +483,18 @@ class ImageView(qtw.QWidget):
         btn.clicked.connect(self.__resetMask)
         btn.setToolTip('Reset image mask to initial state')
         layout.addWidget(btn)
+        tb = qtw.QToolBar(maskPanel)
+        layout.addWidget(tb)
+        btn = qtw.QPushButton(parent=tb, text='Undo',
+                              icon=qta.icon('fa5s.undo'))
+        btn.clicked.connect(self.undoMask)
+        btn.setToolTip('Undo the last mask edit (Ctrl+Z)')
+        tb.addWidget(btn)
+        btn = qtw.QPushButton(parent=tb, text='Redo',
+                              icon=qta.icon('fa5s.redo'))
+        btn.clicked.connect(self.redoMask)
+        btn.setToolTip('Redo the last undone mask edit (Ctrl+Shift+Z)')
+        tb.addWidget(btn)
         toolbar.addAction(self._actMaskCreator, maskPanel, exclusive=False,
                           checked=showMaskCreator)
 
@@ -446,9 +502,26 @@ class ImageView(qtw.QWidget):
         self._maskPen.setVisible(showMaskCreator)
         self.__onSpinBoxMaskPenValueChanged(self._spinBoxMaskPen.getValue())
 
+    def __onComboColorMapChanged(self, index):
+        """ Invoked when a color map is selected in the combo box """
+        name = self._comboColorMap.itemData(index)
+        if name is None:
+            self.setColorMap(None)
+        else:
+            _, gamma, _, clip = self._colorMap or (None, 1.0, False, False)
+            self.setColorMap(name, gamma=gamma, clip=clip,
+                             invert=self._actInvertColorMap.isChecked())
+
+    def __onInvertColorMapTriggered(self, checked):
+        """ Invoked when the invert color map action is triggered """
+        if self._colorMap is not None:
+            name, gamma, _, clip = self._colorMap
+            self.setColorMap(name, gamma=gamma, invert=checked, clip=clip)
+
     def __resetMask(self):
         """ Reset the image mask according to the mask operation """
         if isinstance(self._maskItem, _CustomMaskItem):
+            self.__saveMaskState()
             data = self._maskItem.image
             v = 2 if self._maskOperation == REMOVE else 0
             data[...] = v
@@ -457,10 +530,24 @@ class ImageView(qtw.QWidget):
     def __invertMask(self):
         """ Invert the image mask data"""
         if isinstance(self._maskItem, _CustomMaskItem):
+            self.__saveMaskState()
             data = self._maskItem.image
             data[...] = 3 - data
             self._maskItem.updateImage()
 
+    def __saveMaskState(self):
+        """ Save the current state of the mask creator, before it is
+        modified, so the modification can be undone. """
+        if isinstance(self._maskItem, _CustomMaskItem):
+            self._maskHistory.push(self._maskItem.image)
+
+    def __restoreMaskState(self, data):
+        """ Set the mask creator data to the state returned by the
+        mask history """
+        if data is not None and isinstance(self._maskItem, _CustomMaskItem):
+            self._maskItem.image[...] = data
+            self._maskItem.updateImage()
+
     def __onSelectColor(self):
         """ Invoked when select color action is triggered. Show a QColorDialog
         for color selection """
@@ -523,19 +610,7 @@ class ImageView(qtw.QWidget):
     def __createMaskCreatorBrush(self, size):
         """ Create the mask creator brush """
         if isinstance(self._maskItem, _CustomMaskItem):
-            roi = pg.CircleROI((0, 0), size)
-            path = roi.shape()
-            k = []
-            pos = pg.Point()
-            for i in range(size):
-                r = []
-                for j in range(size):
-                    pos.setX(i)
-                    pos.setY(j)
-                    v = 1 if path.contains(pos) else 0
-                    r.append(v)
-                k.append(r)
-            kern = np.array(k)
+            kern = _createCircleKernel(size)
             self._maskItem.setDrawKernel(kern, mask=kern,
                                          center=(int(size/2), int(size/2)),
                                          mode=self.__drawMask)
@@ -549,21 +624,29 @@ class ImageView(qtw.QWidget):
         else:
             image[ts] = image[ts] * (1 - mask)
 
-        self._maskItem.updateImage()
+        # Only the region touched by the brush needs to be rendered again
+        self._maskItem.updateImageRegion(ts)
 
     def __createMaskItem(self, data=0):
         """ Create the mask item, initializing the mask with the given value.
 
         Args:
-            data: int or numpy array
+            data: int, numpy array, BitMask or RLEMask
         """
         imageItem = self.getImageItem()
         w, h = (imageItem.width(), imageItem.height())
         viewBox = self.getViewBox()
+        self._maskHistory.clear()
         if w is not None and h is not None:
             if isinstance(data, int):
                 value = 1 if data == 0 else 2
                 data = np.full(shape=(w, h), fill_value=value, dtype=np.int8)
+            elif isinstance(data, models.BitMask):
+                # The Mask Creator uses 1 for the masked out pixels and 2
+                # for the pixels in the mask
+                data = data.toArray(dtype=np.int8) + 1
+            elif isinstance(data, models.RLEMask):
+                data = data.toArray()
 
             if self._rowMajor:
                 data = data.T
@@ -575,6 +658,9 @@ class ImageView(qtw.QWidget):
                                                  self._maskColor,
                                                  data)
                 viewBox.addItem(self._maskItem)
+                if self._maskOperation is not None:
+                    self._maskItem.sigDrawStarted.connect(
+                        self.__saveMaskState)
             else:
                 self._maskItem.setMaskColor(self._maskColor)
                 self._maskItem.setImage(data)
@@ -678,6 +764,14 @@ class ImageView(qtw.QWidget):
             if ev.modifiers() & ctrl == ctrl:
                 self.export()
 
+        if ev.key() == qtc.Qt.Key_Z:
+            ctrl = qtc.Qt.ControlModifier
+            if ev.modifiers() & ctrl == ctrl:
+                if ev.modifiers() & qtc.Qt.ShiftModifier:
+                    self.redoMask()
+                else:
+                    self.undoMask()
+
     def __setupImageView(self):
         """
         Setups the pg.ImageView widget according to the internal
@@ -787,17 +881,7 @@ class ImageView(qtw.QWidget):
         Returns: (u8bit numpy array) the mask
         """
         if self._maskItem is not None:
-            data = self._maskItem.image
-            w, h = (data.shape[1],
-                    data.shape[0])
-            maskData = np.zeros(shape=(w, h), dtype=np.uint8)
-            for i in range(w):
-                for j in range(h):
-                    if data[i][j] <= 1:
-                        maskData[i][j] = 0
-                    else:
-                        maskData[i][j] = 1
-            return maskData
+            return (self._maskItem.image > 1).astype(np.uint8)
         return None
 
     @qtc.pyqtSlot()
@@ -943,7 +1027,7 @@ class ImageView(qtw.QWidget):
             data:   If the type is ROI_CIRCLE or ROI_RECT, it is the value of
                     the radius of the mask. If type is CONSTANT it is the value
                     of entire mask. Finally, if the type is DATA, this should be
-                    a numpy array with values of the mask.
+                    a numpy array, BitMask or RLEMask with values of the mask.
             showHandles: (boolean) Enable/Disable the ROI handles
         """
         self.__removeMask()  # remove previous mask
@@ -1032,9 +1116,10 @@ class ImageView(qtw.QWidget):
             else:
                 data = imageModel.getData()
 
+            self.getImageItem().setModel(imageModel)
             self._imageView.setImage(data,
                                      autoRange=True,
-                                     levels=self._levels)
+                                     levels=self.__getLevels(imageModel))
 
             if not fitToSize and dim == imageModel.getDim():
                 self.setViewRect(rect or self.getViewRect())
@@ -1064,6 +1149,66 @@ class ImageView(qtw.QWidget):
                                       (b.height() - r.height()) / 2))
         self.sigScaleChanged.emit(self._scale)
 
+    def setColorMap(self, name, gamma=1.0, invert=False, clip=False):
+        """ Set the color map used to display the image. The lookup tables
+        are cached and shared by all the views using the same color map, so
+        changing the color map or the levels does not touch the image data.
+
+        Args:
+            name:   (str) The name of a registered color map
+                    (see getColorMapNames) or None to use the histogram
+                    gradient.
+            gamma:  (float) Gamma correction of the color map.
+            invert: (Bool) Reverse the color map.
+            clip:   (Bool) Highlight the pixels outside the levels.
+        """
+        key = None if name is None else (name, float(gamma), bool(invert),
+                                          bool(clip))
+        if key == self._colorMap:
+            return
+        # Raises an exception if the color map is not registered
+        lut = None if key is None else getColorMapLut(name, key[1], key[2])
+
+        self._colorMap = key
+        gradient = self._imageView.ui.histogram.gradient
+        if key is None:
+            # The histogram will set the lookup table of the gradient
+            gradient.loadPreset('grey')
+            self.getImageItem().setColorMap(None)
+        else:
+            # Show the color map in the histogram gradient
+            pos = np.linspace(0, 1, 9)
+            ticks = [(p, tuple(int(v) for v in lut[int(p * (len(lut) - 1))]))
+                     for p in pos]
+            gradient.restoreState({'mode': 'rgb', 'ticks': ticks})
+            self.getImageItem().setColorMap(key)
+
+        index = self._comboColorMap.findData(name)
+        self._comboColorMap.blockSignals(True)
+        self._comboColorMap.setCurrentIndex(max(index, 0))
+        self._comboColorMap.blockSignals(False)
+        self._actInvertColorMap.setChecked(bool(invert))
+
+    def getLevels(self):
+        """ Return the (min, max) levels used to display the current image,
+        or None if there is no image. """
+        levels = self.getImageItem().getLevels()
+        return None if levels is None else (float(levels[0]),
+                                             float(levels[1]))
+
+    def getColorMap(self):
+        """ Return the current color map as a (name, gamma, invert, clip)
+        tuple, or None if no color map has been set. """
+        return self._colorMap
+
+    def __getLevels(self, imageModel):
+        """ Return the levels for displaying the given image model: the
+        levels of the view if they were set or the levels computed by the
+        model for the configured percentiles. """
+        if self._levels is not None or imageModel is None:
+            return self._levels
+        return imageModel.getLevels(*self._percentiles)
+
     def updateImageScale(self):
         """ Update the image scale, calculating the current scale. """
         self.__viewRect = self.getViewRect()
@@ -1090,10 +1235,27 @@ class ImageView(qtw.QWidget):
         self.__updatingImage = True
         if self._rowMajor:
             data = data.T
-        self._imageView.setImage(data, transform=t, levels=self._levels)
+        self.getImageItem().setModel(self._model)
+        self._imageView.setImage(data, transform=t,
+                                 levels=self.__getLevels(self._model))
         self._imageView.getView().setRange(rect=self.__viewRect, padding=0.0)
         self.__updatingImage = False
 
+    def setPreviewData(self, data, shape):
+        """ Show a low resolution version of the image, e.g. while the user
+        drags a slider. The preview is stretched to the size of the full
+        image and rendered with the current levels, without updating the
+        model or the histogram. It is shown until imageModelChanged or
+        setModel is called.
+
+        Args:
+            data:  2D array with the low resolution image data.
+            shape: (rows, columns) shape of the full resolution image.
+        """
+        if self._rowMajor:
+            data, shape = data.T, tuple(shape[:2])[::-1]
+        self.getImageItem().setPreview(data, shape)
+
     def setViewRect(self, rect):
         """ Set the current view rect.
         The view rect is the rect region that will be visible in the view.
@@ -1165,6 +1327,7 @@ class ImageView(qtw.QWidget):
         """ Clear the view, setting a null image """
         self.__updatingImage = True
         self.__resetOperationParams()
+        self.getImageItem().setModel(None)
         self._imageView.clear()
         self._scale = 0
         self._textEditPath.setText("")
@@ -1417,15 +1580,62 @@ class ImageView(qtw.QWidget):
         self._exporter.parameters()['antialias'] = antialias
         self._exporter.export(path)
 
-    def getMaskImage(self):
+    def getMaskImage(self, compact=False):
         """ Return the mask created by the user using the Mask Creator Tools.
 
-        Returns: (u8bit numpy array) or None
+        Args:
+            compact: (boolean) If True, the mask is returned as a
+                     :class:`BitMask <datavis.models.BitMask>`, using 1 bit
+                     per pixel.
+
+        Returns: (u8bit numpy array), BitMask or None
         """
         m = self.__normalizeMask()
         if m is not None and self._rowMajor:
             m = m.T
-        return m
+        return models.BitMask(m) if compact and m is not None else m
+
+    def getCompactMask(self):
+        """ Return the current state of the Mask Creator as a
+        :class:`RLEMask <datavis.models.RLEMask>`, that can be used later to
+        restore it with setImageMask(type=DATA, data=mask).
+
+        Returns: RLEMask or None
+        """
+        if not isinstance(self._maskItem, _CustomMaskItem):
+            return None
+        data = self._maskItem.image
+        return models.RLEMask(data.T if self._rowMajor else data)
+
+    def setCompactMask(self, mask=None):
+        """ Restore the state of the Mask Creator from a mask returned by
+        getCompactMask. The undo history is cleared.
+
+        Args:
+            mask: (RLEMask, BitMask or numpy array) The mask data for the
+                  current image. If None, the initial mask is restored.
+        """
+        if isinstance(self._maskItem, _CustomMaskItem):
+            self.__createMaskItem(self._maskData if mask is None else mask)
+
+    def isMaskModified(self):
+        """ Return True if the mask has been edited with the Mask Creator
+        since it was created or restored with setCompactMask. """
+        return self._maskHistory.isModified()
+
+    @qtc.pyqtSlot()
+    def undoMask(self):
+        """ Undo the last edit of the Mask Creator """
+        if isinstance(self._maskItem, _CustomMaskItem):
+            self.__restoreMaskState(
+                self._maskHistory.undo(self._maskItem.image))
+
+    @qtc.pyqtSlot()
+    def redoMask(self):
+        """ Redo the last undone edit of the Mask Creator """
+        if isinstance(self._maskItem, _CustomMaskItem):
+            self.__restoreMaskState(
+                self._maskHistory.redo(self._maskItem.image))
 
     def getMaskType(self):
         """ Return the mask-type. Possible values are:
@@ -1642,9 +1852,182 @@ class _MaskItem(qtw.QAbstractGraphicsShapeItem):
         self._roi.maxBounds = bounds
 
 
-class _CustomMaskItem(pg.ImageItem):
+class _NativeImageItem(pg.ImageItem):
+    """ Image item that renders 8 and 16 bits images (integer or half
+    precision) through a lookup table with an entry for every possible value,
+    instead of rescaling the pixels to float. The table is built again only
+    when the levels, the lookup table or the image type change.
+    """
+    def __init__(self, *args, **kwargs):
+        self._colorMapKey = self._colorMapLut = None
+        # Table of the color map, with the clip entries if any
+        self._colorMapTable = None
+        # Shape of the full image while a preview is shown (see setPreview)
+        self._previewShape = None
+        pg.ImageItem.__init__(self, *args, **kwargs)
+
+    def setImage(self, image=None, autoLevels=None, **kargs):
+        """ Reimplemented from pg.ImageItem to discard the preview """
+        if image is not None and self._previewShape is not None:
+            self._previewShape = None
+            self.prepareGeometryChange()
+        pg.ImageItem.setImage(self, image, autoLevels=autoLevels, **kargs)
+
+    def setPreview(self, image, shape):
+        """ Show a low resolution version of an image, stretched to the size
+        of the full image, keeping the current levels. The preview is shown
+        until a new image is set.
+
+        Args:
+            image: The low resolution image, in the same axis order than
+                   the images given to setImage.
+            shape: The shape of the full resolution image.
+        """
+        if self._previewShape != tuple(shape[:2]):
+            self.prepareGeometryChange()
+        self._previewShape = tuple(shape[:2])
+        pg.ImageItem.setImage(self, image, autoLevels=False)
+
+    def width(self):
+        """ Reimplemented from pg.ImageItem """
+        if self._previewShape is None:
+            return pg.ImageItem.width(self)
+        return self._previewShape[0 if self.axisOrder == 'col-major' else 1]
+
+    def height(self):
+        """ Reimplemented from pg.ImageItem """
+        if self._previewShape is None:
+            return pg.ImageItem.height(self)
+        return self._previewShape[1 if self.axisOrder == 'col-major' else 0]
+
+    def paint(self, p, *args):
+        """ Reimplemented from pg.ImageItem to stretch the preview """
+        if self._previewShape is None:
+            pg.ImageItem.paint(self, p, *args)
+            return
+        if self.qimage is None:
+            self.render()
+            if self.qimage is None:
+                return
+        if self.paintMode is not None:
+            p.setCompositionMode(self.paintMode)
+        p.drawImage(self.boundingRect(), self.qimage)
+
+    def setColorMap(self, key):
+        """ Set the color map used as lookup table.
+
+        Args:
+            key: (name, gamma, invert, clip) tuple. See getColorMapLut.
+                 If None, the lookup table is removed.
+        """
+        self._colorMapKey = key
+        if key is None:
+            self._colorMapTable = self._colorMapLut = None
+        else:
+            self._colorMapTable = getColorMapLut(*key)
+            # pyqtgraph only gets the colors of the map, the values outside
+            # the levels are highlighted by _makeClipARGB
+            self._colorMapLut = (self._colorMapTable[1:-1] if key[3]
+                                 else self._colorMapTable)
+        self.setLookupTable(self._colorMapLut)
+
+    def _canRenderNative(self, image):
+        """ Return True if the given image can be rendered with the native
+        lookup table """
+        return (image is not None and image.ndim == 2 and
+                image.dtype in NATIVE_LUT_TYPES and
+                self.levels is not None and self.levels.ndim == 1)
+
+    def _makeNativeARGB(self, image):
+        """ Convert the given (col-major) image to ARGB using the native
+        lookup table.
+
+        Returns: (argb, alpha) tuple as returned by pg.functions.makeARGB.
+        """
+        if self._effectiveLut is None:
+            lut = self.lut(self.image) if callable(self.lut) else self.lut
+            if lut is not None and lut is self._colorMapLut:
+                # Tables of color maps are shared by all the views
+                self._effectiveLut = getLevelsLut(
+                    image.dtype, float(self.levels[0]), float(self.levels[1]),
+                    self._colorMapKey)
+            else:
+                self._effectiveLut = createLevelsLut(image.dtype, self.levels,
+                                                     lut)
+        if self.axisOrder == 'col-major':
+            image = image.T
+        # Index the table with the raw bits of the values
+        return fn.makeARGB(image.view(NATIVE_LUT_TYPES[image.dtype]),
+                           lut=self._effectiveLut)
+
+    def _canRenderClip(self, image):
+        """ Return True if the values of the given image outside the levels
+        should be highlighted with the clip colors of the color map """
+        return (image is not None and image.ndim == 2 and
+                self._colorMapKey is not None and self._colorMapKey[3] and
+                self.lut is self._colorMapLut and
+                self.levels is not None and self.levels.ndim == 1)
+
+    def _makeClipARGB(self, image):
+        """ Convert the given (col-major) image to ARGB using the table of
+        the color map with the clip entries. Only used for the types that can
+        not be rendered with the native lookup table, that already contains
+        the clip colors.
+
+        Returns: (argb, alpha) tuple as returned by pg.functions.makeARGB.
+        """
+        if self.axisOrder == 'col-major':
+            image = image.T
+        table = self._colorMapTable
+        index = levelsToIndex(image.astype(np.float32, copy=False),
+                              self.levels, table.shape[0] - 2, clip=True)
+        # The index is not scaled again with these levels
+        return fn.makeARGB(index, lut=table, levels=(0, table.shape[0] - 1))
+
+    def render(self):
+        """ Reimplemented from pg.ImageItem """
+        if self.autoDownsample:
+            pg.ImageItem.render(self)
+        elif self._canRenderNative(self.image):
+            if self.image.size:
+                argb, alpha = self._makeNativeARGB(self.image)
+                self.qimage = fn.makeQImage(argb, alpha, transpose=False)
+        elif self._canRenderClip(self.image):
+            if self.image.size:
+                argb, alpha = self._makeClipARGB(self.image)
+                self.qimage = fn.makeQImage(argb, alpha, transpose=False)
+        else:
+            pg.ImageItem.render(self)
+
+
+class _ModelImageItem(_NativeImageItem):
+    """ Image item that takes the histogram from the cached statistics of
+    the displayed image model, instead of computing it from the image every
+    time the image is set. """
+    def __init__(self, *args, **kwargs):
+        _NativeImageItem.__init__(self, *args, **kwargs)
+        self._model = None
+
+    def setModel(self, imageModel):
+        """ Set the image model whose data is being displayed """
+        self._model = imageModel
+
+    def getHistogram(self, bins='auto', step='auto', **kwds):
+        """ Reimplemented from pg.ImageItem. The histogram of the model is
+        used when the default arguments are given. """
+        if (self._model is not None and bins == 'auto' and step == 'auto'
+                and not kwds):
+            return self._model.getHistogram()
+        return pg.ImageItem.getHistogram(self, bins=bins, step=step, **kwds)
+
+
+class _CustomMaskItem(_NativeImageItem):
     """ Represents a graphics image mask item that can add to a QGraphicsScene.
     It can be configured with specific mask data and color """
+
+    """ Signal emitted before the mask is modified by a draw operation """
+    sigDrawStarted = qtc.pyqtSignal()
+
     def __init__(self, imageItem, maskColor, maskData):
         """
         Construct an _CustomMaskItem object
@@ -1658,7 +2041,7 @@ class _CustomMaskItem(pg.ImageItem):
         if imageItem is None:
             raise Exception("Invalid ImageItem: None value")
 
-        pg.ImageItem.__init__(self, image=maskData)
+        _NativeImageItem.__init__(self, image=maskData)
         self.setMaskColor(maskColor)
         self._imageItem = imageItem
         self.maskData = maskData
@@ -1687,6 +2070,45 @@ class _CustomMaskItem(pg.ImageItem):
         """ Return the mask data """
         return self.maskData
 
+    def mouseDragEvent(self, ev):
+        if (self.drawKernel is not None and ev.isStart() and
+                ev.button() == qtc.Qt.LeftButton):
+            self.sigDrawStarted.emit()
+        pg.ImageItem.mouseDragEvent(self, ev)
+
+    def mouseClickEvent(self, ev):
+        if (self.drawKernel is not None and
+                ev.button() == qtc.Qt.LeftButton):
+            self.sigDrawStarted.emit()
+        pg.ImageItem.mouseClickEvent(self, ev)
+
+    def updateImageRegion(self, region):
+        """ Render again only the given region of the mask image, after its
+        values were modified in place.
+
+        Args:
+            region: (x-slice, y-slice) tuple with the modified region.
+        """
+        qimage = self.qimage
+        if (qimage is None or getattr(qimage, 'data', None) is None or
+                self.axisOrder != 'col-major' or self.autoDownsample):
+            self.updateImage()
+            return
+
+        xs, ys = region
+        if xs.stop <= xs.start or ys.stop <= ys.start:
+            return
+
+        # Same conversion done by render, but only for the region
+        image = self.image[region]
+        if self._canRenderNative(image):
+            argb, _ = self._makeNativeARGB(image)
+        else:
+            argb, _ = fn.makeARGB(image.T, lut=self.lut, levels=self.levels)
+        qimage.data[ys, xs] = argb
+        x0, y0 = xs.start, ys.start
+        self.update(qtc.QRectF(x0, y0, xs.stop - x0, ys.stop - y0))
+
     def setMaxBounds(self, bounds):
         """
         Set the maz bounds
@@ -1696,6 +2118,20 @@ class _CustomMaskItem(pg.ImageItem):
         pass
 
 
+@lru_cache(maxsize=16)
+def _createCircleKernel(size):
+    """ Return a (size, size) read-only array with 1 for the pixels inside
+    the circle inscribed in the array and 0 outside. The kernels are cached,
+    so they are not created again when the pen size is changed back.
+    """
+    c = (size - 1) / 2.0
+    i = np.arange(size) - c
+    kern = ((i[:, None] ** 2 + i[None, :] ** 2) <= (size / 2.0) ** 2)
+    kern = kern.astype(np.int8)
+    kern.setflags(write=False)
+    return kern
+
+
 class EMImageItemDelegate(qtw.QStyledItemDelegate):
     """
     ImageItemDelegate class provides display and editing facilities for
@@ -1841,6 +2277,13 @@ class EMImageItemDelegate(qtw.QStyledItemDelegate):
         """
         self._imageView.setLevels(levels)
 
+    def setColorMap(self, name, gamma=1.0, invert=False, clip=False):
+        """ Set the color map used to render the thumbnails.
+        See :meth:`ImageView.setColorMap <datavis.views.ImageView.setColorMap>`
+        """
+        self._imageView.setColorMap(name, gamma=gamma, invert=invert,
+                                    clip=clip)
+
     def getTextHeight(self):
         """ The height of text """
         return self._textHeight
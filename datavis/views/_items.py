@@ -54,6 +54,12 @@ class ItemsView(PagingView):
         self._model = None
         self._config = None
         self._pageItemModel = None
+        # ImageModel of the current row, reused for the next rows
+        self._imageModel = None
+        # (key, [(column, QStandardItem)]) with the items that show the values
+        # of the visible columns. They are created once for each config and
+        # updated in place when the row changes.
+        self.__rowTemplate = None
         self.setModel(model, kwargs.get('displayConfig', None))
 
     def _createContentWidget(self):
@@ -79,10 +85,18 @@ class ItemsView(PagingView):
         """ Makes the current selection in internal widget used to display the
         data values """
         if self.isMultiSelection() and self.__selectionItem is not None:
-            if self._row in self._selection:
-                self.__selectionItem.setCheckState(qtc.Qt.Checked)
-            else:
-                self.__selectionItem.setCheckState(qtc.Qt.Unchecked)
+            item = self.__selectionItem
+            state = (qtc.Qt.Checked if self._row in self._selection
+                     else qtc.Qt.Unchecked)
+            if item.checkState() != state:
+                # The item is reused for all rows, so the change should not
+                # be handled as a selection made by the user
+                model = self._itemsViewTable.model()
+                blocker = qtc.QSignalBlocker(model)
+                item.setCheckState(state)
+                del blocker
+                index = item.index()
+                model.dataChanged.emit(index, index)
 
     def __updatePagingInfo(self):
         """ Updates the paging information according to the model rows count """
@@ -111,9 +125,6 @@ class ItemsView(PagingView):
         Args:
             row: (int) The row index. First index is 0.
         """
-        self._imageView.clear()
-        model = self._itemsViewTable.model()
-        model.clear()
         self._row = row
         self._loadRowValues()
         self.__loadRowImages()
@@ -135,13 +146,23 @@ class ItemsView(PagingView):
         if indexes > 0:
             data = self._model.getData(self._row, self._column)
             if data is not None:
-                self._imageView.setModel(ImageModel(data))
+                imgModel = self._imageModel
+                if imgModel is not None and imgModel.getData() is not None \
+                        and imgModel.getData().shape == data.shape:
+                    # Same size, keep the view rect and only update the data
+                    imgModel.setData(data)
+                    self._imageView.imageModelChanged()
+                else:
+                    self._imageModel = ImageModel(data)
+                    self._imageView.setModel(self._imageModel)
                 self._imageView.setImageInfo(
                     path=self._model.getValue(self._row, self._column),
                     format=' ',  # FIXME[phv] set image format and type
                     data_type=' ')
-        else:
-            self._imageView.clear()
+                return
+
+        self._imageModel = None
+        self._imageView.clear()
 
     @qtc.pyqtSlot('QStandardItem*')
     def __onItemDataChanged(self, item):
@@ -163,17 +184,11 @@ class ItemsView(PagingView):
         """ Invoked when change the current page """
         self.__loadRow(page - 1)
 
-    def _loadRowValues(self):
-        """ Load the table values for the current row.
-         Values will be displayed as rows of this view.
-         """
+    def __createRowTemplate(self, key, columns):
+        """ Create the items used to display the values of the given columns
+        and the selection item (in multi-selection mode). """
         model = self._itemsViewTable.model()
         model.clear()
-        # FIXME: (Important) Every time that we change the selected row
-        # FIXME: do we need to create new QStandardItems() ?????
-        # FIXME: This might be the cause of some noticeable flickering
-        # FIXME: If the model haven't changed, we can populate the model once
-        # FIXME: and then set the values
         vLabels = []
 
         if self.isMultiSelection():
@@ -181,25 +196,39 @@ class ItemsView(PagingView):
             self.__selectionItem = qtg.QStandardItem()
             self.__selectionItem.setCheckable(True)
             self.__selectionItem.setEditable(False)
-            if self._selection is not None and self._row in self._selection:
-                self.__selectionItem.setCheckState(qtc.Qt.Checked)
             model.appendRow([self.__selectionItem])
         else:
             self.__selectionItem = None
 
-        for i, colConfig in self._config.iterColumns(visible=True):
+        items = []
+        for i in columns:
             item = qtg.QStandardItem()
-            item.setData(
-                self._pageItemModel.data(self._pageItemModel.createIndex(
-                    self._row, i)), qtc.Qt.DisplayRole)
             item.setEditable(False)
             model.appendRow([item])
+            items.append((i, item))
             label = self._pageItemModel.headerData(i, qtc.Qt.Horizontal)
-            if isinstance(label, str) or isinstance(label, unicode):
+            if isinstance(label, str):
                 vLabels.append(label)
         model.setHorizontalHeaderLabels(["Values"])
         model.setVerticalHeaderLabels(vLabels)
         self._itemsViewTable.horizontalHeader().setStretchLastSection(True)
+        self.__rowTemplate = key, items
+
+    def _loadRowValues(self):
+        """ Load the table values for the current row.
+        Values will be displayed as rows of this view. The items are only
+        created when the visible columns change, otherwise their values are
+        updated in place.
+        """
+        columns = [i for i, _ in self._config.iterColumns(visible=True)]
+        key = id(self._config), tuple(columns), self.isMultiSelection()
+        if self.__rowTemplate is None or self.__rowTemplate[0] != key:
+            self.__createRowTemplate(key, columns)
+
+        pageModel = self._pageItemModel
+        for i, item in self.__rowTemplate[1]:
+            item.setData(pageModel.data(pageModel.createIndex(self._row, i)),
+                         qtc.Qt.DisplayRole)
 
     @qtc.pyqtSlot(set)
     def changeSelection(self, selection):
@@ -245,6 +274,7 @@ class ItemsView(PagingView):
         self._row = 0
         self._column = 0
         self.__selectionItem = None
+        self.__rowTemplate = None
         self._model = model
         self._config = displayConfig or model.createDefaultConfig()
 
@@ -1,11 +1,14 @@
 
+import threading
+
 import PyQt5.QtCore as qtc
 import PyQt5.QtWidgets as qtw
 
 from datavis.widgets import ViewPanel, SpinSlider, FormWidget
+from datavis.utils import LRUCache, Prefetcher
 from datavis.models import EmptyTableModel, ImageModel
 from datavis.views import (ColumnsView, ImageView, VolumeView, RECT_ROI,
-                           CIRCLE_ROI)
+                           CIRCLE_ROI, ImageViewGroup)
 
 import numpy as np
 
@@ -171,10 +174,62 @@ class VolumeListView(ImageListView):
                 method.
 
         Keyword Args:
+            prefetch:   (int) The number of volumes before and after the
+                        current one that are loaded in background.
+                        Default value: 1.
+            cacheBytes: (int) Memory budget for the loaded volumes, including
+                        their statistics and slab caches, that are measured
+                        again when another volume is shown. Default: 1 GB.
             kwargs: The keyword arguments for the internal
                 :class:`~datavis.views.VolumeView` widget.
+
+        The volumes are loaded in a worker thread, so the getModel method of
+        the model should be thread-safe.
         """
+        self._prefetch = kwargs.pop('prefetch', 1)
+        # Loaded volumes (with their statistics computed): {row: VolumeModel}
+        self.__volumePrefetcher = Prefetcher(
+            self.__loadVolume, maxSize=2 * self._prefetch + 16,
+            maxBytes=kwargs.pop('cacheBytes', 1 << 30),
+            sizeFunc=lambda m: m.getNBytes())
+        # Min-max and levels of the last shown volumes: {row: stats}, so
+        # going back to a volume does not scan its data again, even if the
+        # volume was discarded from the cache
+        self.__volumeStats = LRUCache(64)
+        # Row of the volume that is shown
+        self.__volumeRow = None
+        self.__statsLock = threading.Lock()
         ImageListView.__init__(self, model, parent=parent, **kwargs)
+        # Embedded views are not closed, so the workers are also stopped when
+        # the view is destroyed
+        prefetcher = self.__volumePrefetcher
+        self.destroyed.connect(lambda *args: prefetcher.shutdown())
+
+    def __loadVolume(self, row):
+        """ Return the VolumeModel of the given row, with its statistics
+        computed. This method is called from the prefetch worker thread. """
+        model = self._model.getModel(row)
+        with self.__statsLock:
+            stats = self.__volumeStats.get(row)
+        if stats is not None:
+            model.setStatistics(dict(stats))
+        model.getMinMax()
+        model.getLevels()
+        # Only the scalar statistics are kept, the arrays (sample, histogram,
+        # projections) are released with the volume
+        stats = {k: v for k, v in model.getStatistics().items()
+                 if k == 'minmax' or k[0] == 'levels'}
+        with self.__statsLock:
+            self.__volumeStats[row] = stats
+        return model
+
+    def __prefetchVolumes(self):
+        """ Load in background the volumes around the current row, starting
+        with the closest ones. """
+        row, size = self.currentItem, self._model.getRowsCount()
+        rows = [row + d * i for i in range(1, self._prefetch + 1)
+                for d in (1, -1)]
+        self.__volumePrefetcher.prefetch(r for r in rows if 0 <= r < size)
 
     def __getVolumeView(self):
         panel = self._rightPanel.getWidget('topRightPanel')
@@ -199,9 +254,19 @@ class VolumeListView(ImageListView):
 
     def updateImagePanel(self):
         """ Reimplemented from :class:`~datavis.views.ImageListView` """
-        model = self._model.getModel(self.currentItem)
+        if self.__volumeRow is not None:
+            # Charge the caches built while the volume was shown
+            self.__volumePrefetcher.updateSize(self.__volumeRow)
+        self.__volumeRow = self.currentItem
+        model = self.__volumePrefetcher.get(self.currentItem)
         view = self.__getVolumeView()
         view.setModel(model)
+        self.__prefetchVolumes()
+
+    def closeEvent(self, event):
+        """ Reimplemented from QWidget to stop the background loads """
+        self.__volumePrefetcher.shutdown()
+        ImageListView.closeEvent(self, event)
 
     def setModel(self, model):
         """ Reimplemented from :class:`~datavis.views.ImageListView`.
@@ -209,6 +274,10 @@ class VolumeListView(ImageListView):
         The model must provide a :class:`~datavis.models.VolumeModel>`
         in getModel() method
         """
+        self.__volumePrefetcher.invalidate()
+        self.__volumeRow = None
+        with self.__statsLock:
+            self.__volumeStats.clear()
         ImageListView.setModel(self, model)
         view = self.__getVolumeView()
         view.fitToSize()
@@ -266,8 +335,9 @@ class DualImageListView(ImageListView):
         leftImageView = ImageView(parent=self, model=None, **k)
         panel.addWidget(leftImageView, 'leftImageView')
         rightImageView = ImageView(parent=self, model=None, **k)
-        leftImageView.setXLink(rightImageView)
-        leftImageView.setYLink(rightImageView)
+        # Pan and zoom are linked, each image keeps its own levels
+        self._viewGroup = ImageViewGroup([leftImageView, rightImageView],
+                                         parent=self, levels=False)
         panel.addWidget(rightImageView, 'rightImageView')
         return panel
 
@@ -339,13 +409,16 @@ class ImageMaskListView(ImageListView):
             kwargs: The keyword arguments for the internal
                 :class:`~datavis.views.ImageView`.
         """
+        maskParams = kwargs.get('maskParams', dict())
+        # Masks edited with the Mask Creator: {row: RLEMask}
+        self.__masks = dict() if maskParams.get('operation') else None
+        self.__maskRow = None
         ImageListView.__init__(self, model, parent=parent, **kwargs)
 
         spinSlider = self.__getSpinSlider()
         spinSlider.sigValueChanged.connect(self.__onSpinSliderValueChanged)
         spinSlider.sigSliderReleased.connect(self.__onSpinSliderReleased)
         imageView = self.__getImageView()
-        maskParams = kwargs.get('maskParams', dict())
         maskType = maskParams.get('type')
         if maskType == CIRCLE_ROI or maskType == RECT_ROI:  # ROI MASK
             imageView.sigMaskSizeChanged.connect(self.__onRoiSizeChanged)
@@ -396,9 +469,17 @@ class ImageMaskListView(ImageListView):
     def updateImagePanel(self):
         """ Reimplemented from
         :class:`ImageListView <datavis.views.ImageListView>` """
+        imgView = self.__getImageView()
+        if (self.__masks is not None and self.__maskRow is not None
+                and imgView.isMaskModified()):
+            self.__masks[self.__maskRow] = imgView.getCompactMask()
+
         ImageListView.updateImagePanel(self)
+        if self.__masks is not None:
+            imgView.setCompactMask(self.__masks.get(self.currentItem))
+            self.__maskRow = self.currentItem
+
         spinSlider = self.__getSpinSlider()
-        imgView = self.__getImageView()
         b = imgView.getImageItem().boundingRect()
         spinSlider.setRange(
             1, int(min(b.width(), b.height()) / 2))
@@ -406,6 +487,28 @@ class ImageMaskListView(ImageListView):
         if s is not None:
             spinSlider.setValue(int(s / 2))
 
+    def setModel(self, model):
+        """ Reimplemented from
+        :class:`ImageListView <datavis.views.ImageListView>`. The masks
+        edited for the previous model are discarded. """
+        if self.__masks is not None:
+            self.__masks.clear()
+            self.__maskRow = None
+        ImageListView.setModel(self, model)
+
+    def getMask(self, row):
+        """ Return the mask edited with the Mask Creator for the given row.
+
+        Returns: (u8bit numpy array) or None if the mask of the row has not
+        been edited yet.
+        """
+        if self.__masks is None:
+            return None
+        if row == self.__maskRow:
+            return self.__getImageView().getMaskImage()
+        mask = self.__masks.get(row)
+        return None if mask is None else (mask.toArray() > 1).astype(np.uint8)
+
     def setMaskColor(self, color):
         """
          Set the mask color.
@@ -6,6 +6,7 @@ import PyQt5.QtGui as qtg
 import datavis as dv
 
 from ._slices_view import SlicesView
+from ._oblique_view import ObliqueSliceView
 from ._constants import AXIS_BOTTOM_LEFT, AXIS_BOTTOM_RIGHT, AXIS_TOP_LEFT
 
 
@@ -34,6 +35,10 @@ class MultiSliceView(qtw.QWidget):
             slicesKwargs: (dict) A dict with keys of axis(AXIS_X, AXIS_Y,
                           AXIS_Z) and values for the model for each axis.
                           See :class:`SlicesView <datavis.views.SlicesView>`
+                          The slices are shown as a low resolution preview
+                          while the sliders are dragged, with at most
+                          'previewSize' pixels (256 by default, None to
+                          disable it).
             mode:         (int) Specifies which axis will be visible.
                           Possible values: AXIS_X, AXIS_Y, AXIS_Z, AXIS_XYZ
         """
@@ -43,6 +48,7 @@ class MultiSliceView(qtw.QWidget):
         self._axis = dv.models.AXIS_X
         self._slice = -1
         self._mode = mode
+        self._obliqueView = None
         self.__setupGUI()
         w, h = self.getPreferredSize()
         self.setGeometry(0, 0, w, h)
@@ -113,6 +119,7 @@ class MultiSliceView(qtw.QWidget):
             sv = SlicesView(model, parent=self, text=args.get('text', text),
                             currentValue=args.get('currentValue',
                                                   int((n + 1)/2)),
+                            previewSize=args.get('previewSize', 256),
                             imageViewKwargs=imgViewKargs)
             sv.sigSliceChanged.connect(slot)
             imgView = sv.getImageView()
@@ -261,6 +268,60 @@ class MultiSliceView(qtw.QWidget):
                 self._slicesDict[axis].setModel(model, **kwargs)
         else:
             self.clear()
+        if self._obliqueView is not None:
+            self._obliqueView.setModel(self.__createVolumeModel())
+
+    def __createVolumeModel(self):
+        """ Return a VolumeModel with the data of the AXIS_Z slices, that is
+        the (z, y, x) volume, sharing its statistics. """
+        slicesModel = self._slicesDict[dv.models.AXIS_Z].getModel()
+        if slicesModel is None or slicesModel.getData() is None:
+            return None
+        model = dv.models.VolumeModel(slicesModel.getData())
+        model.setStatistics(slicesModel.getStatistics())
+        return model
+
+    def setObliqueMode(self, enabled):
+        """
+        Show or hide an :class:`ObliqueSliceView
+        <datavis.views.ObliqueSliceView>`, where the volume is sliced along
+        a plane that can be rotated interactively. In AXIS_XYZ mode it
+        replaces the axis widget, otherwise it replaces the current axis.
+
+        Args:
+            enabled: (bool) True to show the oblique slice.
+        """
+        if enabled and self._obliqueView is None:
+            self._obliqueView = ObliqueSliceView(
+                self.__createVolumeModel(), parent=self,
+                imageViewKwargs={'histogram': False, 'toolBar': False,
+                                 'autoFill': True})
+            if self._mode == dv.models.AXIS_XYZ:
+                self._mainLayout.addWidget(self._obliqueView, 0, 1)
+            else:
+                s = self._mainLayout.itemAtPosition(0, 0).layout()
+                s.addWidget(self._obliqueView)
+        if self._obliqueView is None:
+            return
+
+        if self._mode == dv.models.AXIS_XYZ:
+            self._axisWidget.setVisible(not enabled)
+            self._obliqueView.setVisible(enabled)
+        else:
+            s = self._mainLayout.itemAtPosition(0, 0).layout()
+            s.setCurrentWidget(self._obliqueView if enabled else
+                               self._slicesDict[self._axis])
+
+    def isObliqueMode(self):
+        """ Return True if the oblique slice is visible """
+        return self._obliqueView is not None and \
+            self._obliqueView.isVisibleTo(self)
+
+    def getObliqueView(self):
+        """ Return the :class:`ObliqueSliceView
+        <datavis.views.ObliqueSliceView>` or None if the oblique mode has not
+        been enabled. """
+        return self._obliqueView
 
     def setScale(self, scale):
         """ Set the image scale for all axis
@@ -270,6 +331,44 @@ class MultiSliceView(qtw.QWidget):
         for v in self._slicesDict.values():
             v.setScale(scale)
 
+    def setColorMap(self, name, gamma=1.0, invert=False, clip=False):
+        """ Set the color map for all axis. The three views share the
+        cached lookup tables.
+        See :meth:`ImageView.setColorMap <datavis.views.ImageView.setColorMap>`
+        """
+        for v in self._slicesDict.values():
+            v.getImageView().setColorMap(name, gamma=gamma, invert=invert,
+                                         clip=clip)
+
+    def setProjection(self, mode, axis=None):
+        """ Show the projection of the volume instead of the slices.
+        See :meth:`SlicesView.setProjection
+        <datavis.views.SlicesView.setProjection>`
+
+        Args:
+            mode: PROJECTION_MAX, PROJECTION_MIN, PROJECTION_MEAN,
+                  PROJECTION_SUM or None to show the slices.
+            axis: The axis (AXIS_X, AXIS_Y or AXIS_Z) or None for all axes.
+        """
+        views = self._slicesDict.values() if axis is None else \
+            [self._slicesDict[axis]]
+        for v in views:
+            v.setProjection(mode)
+
+    def setSlab(self, thickness, axis=None):
+        """ Show the average of a slab of slices around the current ones.
+        See :meth:`SlicesView.setSlab <datavis.views.SlicesView.setSlab>`
+
+        Args:
+            thickness: (int) The number of slices of the slab.
+            axis:      The axis (AXIS_X, AXIS_Y or AXIS_Z) or None for all
+                       axes.
+        """
+        views = self._slicesDict.values() if axis is None else \
+            [self._slicesDict[axis]]
+        for v in views:
+            v.setSlab(thickness)
+
     def getMode(self):
         """ Return the current mode. Possible values:
         AXIS_X, AXIS_Y, AXIS_Z, AXIS_XYZ """
@@ -0,0 +1,173 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import PyQt5.QtWidgets as qtw
+import PyQt5.QtCore as qtc
+
+from datavis.models import ImageModel
+from datavis.widgets import SpinSlider
+from ._image_view import ImageView
+
+
+class ObliqueSliceView(qtw.QWidget):
+    """
+    View that shows a slice of a volume along an arbitrary plane. The plane
+    is rotated with the tilt, azimuth and rotation sliders, and moved along
+    its normal with the offset slider.
+
+    While a slider is dragged, the slice is computed at a lower resolution
+    and only the last requested plane is rendered. The full resolution slice
+    is computed when the slider is released.
+    See :meth:`VolumeModel.getObliqueSliceData
+    <datavis.models.VolumeModel.getObliqueSliceData>`.
+    """
+    # Signal for plane changed (center, normal, angle)
+    sigPlaneChanged = qtc.pyqtSignal(object, object, float)
+
+    def __init__(self, model, **kwargs):
+        """ Construct an ObliqueSliceView instance.
+
+        Args:
+            model:  The :class:`VolumeModel <datavis.models.VolumeModel>`
+
+        Keyword Args:
+            parent:          (QWidget) The parent widget.
+            size:            (int) The size of the slice in pixels. By
+                             default, the largest dimension of the volume.
+            previewStep:     (int) The slice is computed with this step while
+                             the sliders are dragged. Default value: 2.
+            renderInterval:  (int) Minimum time (ms) between two renders of
+                             the slice. Default value: 16.
+            imageViewKwargs: The :class:`ImageView <datavis.views.ImageView>`
+                             arguments.
+        """
+        qtw.QWidget.__init__(self, parent=kwargs.get('parent'))
+        self._model = None
+        self._size = kwargs.get('size')
+        self._previewStep = kwargs.get('previewStep', 2)
+        self._imageViewKwargs = kwargs.get('imageViewKwargs', {})
+        self._imageModel = None
+        self.__renderTimer = qtc.QTimer(self)
+        self.__renderTimer.setSingleShot(True)
+        self.__renderTimer.setInterval(kwargs.get('renderInterval', 16))
+        self.__renderTimer.timeout.connect(self.__render)
+        self.__setupGUI()
+        self.setModel(model)
+
+    def __setupGUI(self):
+        """ This is the standard method for the GUI creation """
+        self._imageView = ImageView(parent=self, **self._imageViewKwargs)
+        self._imageView.setSizePolicy(
+            qtw.QSizePolicy(qtw.QSizePolicy.MinimumExpanding,
+                            qtw.QSizePolicy.MinimumExpanding))
+        layout = qtw.QVBoxLayout(self)
+        layout.setSpacing(0)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self._imageView)
+
+        self._sliders = dict()
+        for name, text, minValue, maxValue in [
+                ('tilt', 'Tilt', 0, 180), ('azimuth', 'Azimuth', -180, 180),
+                ('angle', 'Rotation', -180, 180), ('offset', 'Offset', 0, 0)]:
+            slider = SpinSlider(self, text=text, minValue=minValue,
+                                maxValue=maxValue, currentValue=0)
+            slider.setMaximumWidth(400)
+            slider.sigValueChanged.connect(self.__onPlaneChanged)
+            slider.sigSliderReleased.connect(self.__render)
+            layout.addWidget(slider, 0, qtc.Qt.AlignCenter)
+            self._sliders[name] = slider
+
+    def __onPlaneChanged(self, value):
+        """ Schedule the rendering of the slice for the new plane """
+        if not self.__renderTimer.isActive():
+            self.__renderTimer.start()
+
+    def __isSliderDown(self):
+        return any(s.isSliderDown() for s in self._sliders.values())
+
+    def __render(self):
+        """ Compute and show the slice of the current plane. While a slider
+        is dragged, a low resolution slice is shown. """
+        self.__renderTimer.stop()
+        if self._model is None or self._model.getData() is None:
+            return
+        center, normal, angle = self.getPlane()
+        size = self._size or max(self._model.getDim())
+        step = 1
+        if self._imageModel is not None and self.__isSliderDown():
+            step = self._previewStep
+        data = self._model.getObliqueSliceData(
+            center=center, normal=normal, angle=angle,
+            size=(-(-size // step),) * 2, step=step)
+
+        if self._imageModel is None:
+            self._imageModel = ImageModel(data)
+            self._imageView.setModel(self._imageModel)
+        elif step > 1:
+            self._imageView.setPreviewData(data, (size, size))
+        else:
+            self._imageModel.setData(data)
+            self._imageView.imageModelChanged()
+        self.sigPlaneChanged.emit(center, normal, angle)
+
+    def getPlane(self):
+        """ Return the (center, normal, angle) of the current plane, with the
+        (x, y, z) center and normal vector and the rotation angle (degrees)
+        around the normal. """
+        tilt = np.radians(self._sliders['tilt'].getValue())
+        azimuth = np.radians(self._sliders['azimuth'].getValue())
+        normal = np.array([np.sin(tilt) * np.cos(azimuth),
+                           np.sin(tilt) * np.sin(azimuth), np.cos(tilt)])
+        x, y, z = self._model.getDim()
+        center = np.array([(x - 1) / 2., (y - 1) / 2., (z - 1) / 2.])
+        center += self._sliders['offset'].getValue() * normal
+        return center, normal, float(self._sliders['angle'].getValue())
+
+    def setPlane(self, tilt=0, azimuth=0, angle=0, offset=0):
+        """
+        Set the plane of the slice.
+
+        Args:
+            tilt:    (int) Angle (degrees) between the normal and the Z axis.
+            azimuth: (int) Angle (degrees) between the projection of the
+                     normal in the XY plane and the X axis.
+            angle:   (int) Rotation (degrees) of the slice around the normal.
+            offset:  (int) Distance (voxels) between the plane and the center
+                     of the volume.
+        """
+        for k, v in zip(('tilt', 'azimuth', 'angle', 'offset'),
+                        (tilt, azimuth, angle, offset)):
+            blocker = qtc.QSignalBlocker(self._sliders[k])
+            self._sliders[k].setValue(v)
+            del blocker
+        self.__render()
+
+    def setModel(self, model):
+        """
+        Set the :class:`VolumeModel <datavis.models.VolumeModel>`
+
+        Args:
+            model: The model or None for clear the view
+        """
+        self._model = model
+        self._imageModel = None
+        if model is None or model.getData() is None:
+            self._imageView.clear()
+            return
+
+        d = max(model.getDim()) // 2
+        self._sliders['offset'].setRange(-d, d)
+        self._imageView.setLevels(model.getLevels())
+        self.__render()
+
+    def getModel(self):
+        """ Return the current model """
+        return self._model
+
+    def getImageView(self):
+        """
+        Return the :class:`ImageView <datavis.views.ImageView>` widget,
+        used to visualize the slice.
+        """
+        return self._imageView
@@ -1,11 +1,15 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import numpy as np
+import qtawesome as qta
 import PyQt5.QtWidgets as qtw
 import PyQt5.QtCore as qtc
 
-from datavis.models import EmptySlicesModel
+from datavis.models import (EmptySlicesModel, PROJECTION_MAX, PROJECTION_MIN,
+                            PROJECTION_MEAN, PROJECTION_SUM)
 from datavis.widgets import SpinSlider
+from datavis.utils import Prefetcher
 from ._image_view import ImageView
 
 
@@ -19,6 +23,8 @@ class SlicesView(qtw.QWidget):
     big images and will take much memory loading all of them at once.
     """
     sigSliceChanged = qtc.pyqtSignal(int)  # Signal for current slice changed
+    # Signal for the achieved frame rate while playing (frames per second)
+    sigFrameRateChanged = qtc.pyqtSignal(float)
 
     def __init__(self, model, **kwargs):
         """ Construct an SlicesView instance.
@@ -34,6 +40,23 @@ class SlicesView(qtw.QWidget):
                         If None, then the SlicesView is created with no parent.
             text:       (str) Text to be display in the slider.
             currentValue:  (int) The index (starting at 1) of the initial slice.
+            fps:        (float) The target frame rate for the play mode.
+                        Default value: 10.
+            prefetch:   (int) The number of upcoming slices that are loaded
+                        in background while playing. Default value: 4.
+            previewSize: (int) If given, while the slider is dragged the
+                        slices are shown as a low resolution preview, with
+                        at most previewSize pixels in each dimension. The
+                        full resolution slice is shown when the slider is
+                        released. By default, the preview is not used.
+            projection: PROJECTION_MAX, PROJECTION_MIN, PROJECTION_MEAN or
+                        PROJECTION_SUM to show the projection of all slices
+                        instead of a single slice. None by default.
+            slab:       (int) If greater than 1, the average of this number
+                        of slices around the current one is shown.
+            renderInterval: (int) Changes of the slice made by the user are
+                        coalesced and only the last one is rendered, at most
+                        once in this interval (ms). Default value: 16.
 
             imageViewKwargs: The :class:`ImageView <datavis.views.ImageView>`
                              arguments
@@ -44,6 +67,41 @@ class SlicesView(qtw.QWidget):
         self._currentValue = kwargs.get('currentValue', 1)
         self._imageViewKwargs = kwargs.get('imageViewKwargs', {})
         self._imageModel = None
+        self._fps = float(kwargs.get('fps', 10))
+        self._prefetch = kwargs.get('prefetch', 4)
+        # Slices loaded in background while playing
+        self.__slicePrefetcher = Prefetcher(self.__loadSlice,
+                                            maxSize=self._prefetch + 2)
+        # Embedded views are not closed, so the workers are also stopped when
+        # the view is destroyed
+        prefetcher = self.__slicePrefetcher
+        self.destroyed.connect(lambda *args: prefetcher.shutdown())
+        self.__playTimer = qtc.QTimer(self)
+        self.__playTimer.setTimerType(qtc.Qt.PreciseTimer)
+        self.__playTimer.setInterval(max(1, int(1000 / self._fps)))
+        self.__playTimer.timeout.connect(self.__onPlayTimeout)
+        # Clock of the play schedule, started at the slice __playStart
+        self.__playClock = qtc.QElapsedTimer()
+        self.__playStart = 1
+        self.__playStep = False
+        # Clock and number of rendered frames for the frame rate measure
+        self.__rateClock = qtc.QElapsedTimer()
+        self.__rateFrames = 0
+        self.__frameRate = 0.0
+        # Changes of the slice by the user are coalesced, so only the last
+        # requested slice is rendered
+        self._previewSize = kwargs.get('previewSize')
+        self.__pendingValue = None
+        self.__previewShown = False
+        self.__renderTimer = qtc.QTimer(self)
+        self.__renderTimer.setSingleShot(True)
+        self.__renderTimer.setInterval(kwargs.get('renderInterval', 16))
+        self.__renderTimer.timeout.connect(self.__renderPendingSlice)
+        self._projection = kwargs.get('projection')
+        self._slab = kwargs.get('slab', 1)
+        # Levels of the volume if the view is normalized (see setModel), and
+        # the levels that were set in the ImageView
+        self.__levels = self.__viewLevels = None
         self.__setupGUI()
         self.setModel(model, **kwargs)
 
@@ -69,23 +127,212 @@ class SlicesView(qtw.QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self._imageView)
         self._spinSlider.setMaximumWidth(400)
+        # Play/pause button and achieved frame rate
+        self._playButton = qtw.QToolButton(self)
+        self._playButton.setIcon(qta.icon('fa.play'))
+        self._playButton.setToolTip('Play/pause the slices')
+        self._playButton.setCheckable(True)
+        self._playButton.toggled.connect(self.__onPlayToggled)
+        self._frameRateLabel = qtw.QLabel(self)
+        self._frameRateLabel.setToolTip('Achieved frame rate')
         l = qtw.QHBoxLayout()
+        l.addWidget(self._playButton)
         l.addWidget(self._spinSlider, qtc.Qt.AlignCenter)
+        l.addWidget(self._frameRateLabel)
+        # Projection and slab thickness
+        self._projectionCombo = qtw.QComboBox(self)
+        self._projectionCombo.setToolTip('Show the slices or a projection')
+        self.__projections = [None, PROJECTION_MAX, PROJECTION_MIN,
+                              PROJECTION_MEAN, PROJECTION_SUM]
+        self._projectionCombo.addItems(['Slices', 'Max', 'Min', 'Mean', 'Sum'])
+        self._projectionCombo.setCurrentIndex(
+            self.__projections.index(self._projection))
+        self._projectionCombo.currentIndexChanged.connect(
+            self.__onProjectionChanged)
+        self._slabSpinBox = qtw.QSpinBox(self)
+        self._slabSpinBox.setToolTip('Number of slices averaged in the slab')
+        self._slabSpinBox.setPrefix('Slab: ')
+        self._slabSpinBox.setRange(1, n)
+        self._slabSpinBox.setValue(self._slab)
+        self._slabSpinBox.valueChanged.connect(self.setSlab)
+        l.addWidget(self._projectionCombo)
+        l.addWidget(self._slabSpinBox)
         layout.addLayout(l)
 
-        self._spinSlider.sigValueChanged.connect(self._onSliceChanged)
+        self._spinSlider.sigValueChanged.connect(self.__onValueChanged)
+        self._spinSlider.sigSliderReleased.connect(self.__onSliderReleased)
+
+    def __onValueChanged(self, value):
+        """ Store the requested slice and schedule its rendering """
+        self.__pendingValue = value
+        if not self.__renderTimer.isActive():
+            self.__renderTimer.start()
+
+    def __onSliderReleased(self):
+        """ Show the full resolution slice if a preview was rendered """
+        self.__renderPendingSlice()
+        if self.__previewShown:
+            self._onSliceChanged(self.getValue())
+
+    def __renderPendingSlice(self):
+        """ Render the last requested slice, if any. While the slider is
+        dragged, a low resolution preview is rendered if it is enabled. """
+        self.__renderTimer.stop()
+        value, self.__pendingValue = self.__pendingValue, None
+        if value is None:
+            return
+        if (self._previewSize and self._imageModel is not None and
+                self._slab == 1 and self._spinSlider.isSliderDown() and
+                self.__showPreview(value)):
+            return
+        self._onSliceChanged(value)
+
+    def __showPreview(self, value):
+        """ Show the preview of the given slice (starting at 1).
+
+        Returns:
+            False if the slice is small and the preview is not needed.
+        """
+        data = self._model.getData(value - 1)
+        if data is None:
+            return False
+        step = -(-max(data.shape) // self._previewSize)
+        if step <= 1:
+            return False
+        self._imageView.setPreviewData(np.asarray(data[::step, ::step]),
+                                       data.shape)
+        self.__previewShown = True
+        self.sigSliceChanged.emit(value - 1)
+        return True
+
+    def __loadSlice(self, index):
+        """ Load the data of the given slice. This method is called from the
+        prefetch worker thread, so memory-mapped and non-contiguous slices
+        (e.g. the X and Y axes of a volume) are read and copied there. """
+        return np.array(self._model.getData(index), order='C')
+
+    def __getSliceData(self, index):
+        """ Return the data that is shown for the given slice: the
+        projection, the slab or the slice, from the prefetched slices if the
+        view is playing. """
+        if self._projection is not None:
+            return self._model.getProjection(self._projection)
+        if self._slab > 1:
+            return self._model.getSlabData(index, self._slab)
+        if self.isPlaying():
+            return self.__slicePrefetcher.get(index)
+        return self._model.getData(index)
+
+    def __updateLevels(self):
+        """ Set the levels of the volume in the ImageView when the slices
+        are shown, or the levels of the shown image for the projections and
+        slabs, whose values have a different range. Only done if the view is
+        normalized.
+
+        Returns:
+            True if the levels were changed and the image was rendered again.
+        """
+        if self.__levels is None:
+            return False
+        if self._projection is not None or self._slab > 1:
+            levels = None
+        else:
+            levels = self.__levels
+        if levels == self.__viewLevels:
+            return False
+        self.__viewLevels = levels
+        self._imageView.setLevels(levels)
+        return True
+
+    def __onProjectionChanged(self, index):
+        """ Called when the projection is selected in the combo box """
+        self.setProjection(self.__projections[index])
+
+    def __updateSliceControls(self):
+        """ Enable the slice controls, that are not used in the projections
+        """
+        slices = self._projection is None
+        self._spinSlider.setEnabled(slices)
+        self._slabSpinBox.setEnabled(slices)
+        self._playButton.setEnabled(slices)
+
+    def __prefetchSlices(self, value):
+        """ Load in background the slices that follow the given one
+        (starting at 1), wrapping around at the end. """
+        minSlice, maxSlice = self.getRange()
+        n = maxSlice - minSlice + 1
+        self.__slicePrefetcher.prefetch(
+            (value - minSlice + i) % n
+            for i in range(1, min(self._prefetch, n - 1) + 1))
+
+    def __restartSchedule(self, value):
+        """ Start the play schedule at the given slice """
+        self.__playStart = value
+        self.__playClock.start()
+
+    def __onPlayToggled(self, checked):
+        """ Called when the play button is toggled """
+        if checked:
+            self.play()
+        else:
+            self.pause()
+
+    def __updatePlayButton(self, playing):
+        """ Update the play button state without emitting its signals """
+        blocker = qtc.QSignalBlocker(self._playButton)
+        self._playButton.setChecked(playing)
+        self._playButton.setIcon(qta.icon('fa.pause' if playing else 'fa.play'))
+        del blocker
+
+    def __onPlayTimeout(self):
+        """ Show the slice that corresponds to the elapsed time since the
+        play started. If the rendering can not keep up with the frame rate,
+        the slices in between are dropped. """
+        minSlice, maxSlice = self.getRange()
+        n = maxSlice - minSlice + 1
+        frames = int(self.__playClock.elapsed() * self._fps / 1000.0)
+        value = minSlice + (self.__playStart - minSlice + frames) % n
+
+        if value != self.getValue():
+            self.__playStep = True
+            try:
+                self.setValue(value)
+            finally:
+                self.__playStep = False
+            self.__rateFrames += 1
+
+        elapsed = self.__rateClock.elapsed()
+        if elapsed >= 1000:
+            self.__setFrameRate(self.__rateFrames * 1000.0 / elapsed)
+            self.__rateFrames = 0
+            self.__rateClock.start()
+
+    def __setFrameRate(self, fps):
+        """ Store and show the achieved frame rate """
+        self.__frameRate = fps
+        self._frameRateLabel.setText('%.1f fps' % fps if fps else '')
+        self.sigFrameRateChanged.emit(fps)
 
     def _onSliceChanged(self, value):
         """ Load the slice indexed by the given index value """
+        if self.isPlaying():
+            if not self.__playStep:  # the slice was changed by the user
+                self.__restartSchedule(value)
+            self.__prefetchSlices(value)
         value -= 1
+        self.__previewShown = False
         if self._imageModel is None:
             self._imageModel = self._model.getImageModel(value)
+            if self._projection is not None or self._slab > 1:
+                self._imageModel.setData(self.__getSliceData(value))
+            self.__updateLevels()
             self._imageView.setModel(self._imageModel, True)
         else:
-            imgData = self._model.getData(value)
+            imgData = self.__getSliceData(value)
             if imgData is not None:
                 self._imageModel.setData(imgData)
-                self._imageView.imageModelChanged()
+                if not self.__updateLevels():
+                    self._imageView.imageModelChanged()
             else:
                 self._imageView.clear()
 
@@ -96,8 +343,10 @@ class SlicesView(qtw.QWidget):
         return self._spinSlider.getValue()
 
     def setValue(self, value):
-        """ Set the current value to a different one. """
+        """ Set the current value to a different one. The slice is rendered
+        before returning. """
         self._spinSlider.setValue(value)
+        self.__renderPendingSlice()
 
     def getRange(self):
         """ Returns a tuple (min, max) with the slices range. """
@@ -132,23 +381,149 @@ class SlicesView(qtw.QWidget):
             model: The model or None for clear the view
 
         Keyword Args:
-            normalize: (bool) If true, set the ImageView levels
+            normalize: (bool) If true, set the ImageView levels to the
+                       min/max of the volume while the slices are shown.
+                       The projections and slabs use their own levels.
             slice: (int) If not None, set this as the initial slice
         """
         self._model = model
         self._imageModel = None
+        self.__slicePrefetcher.invalidate()
 
         minSlice, maxSlice = 1, 1 if model is None else model.getDim()[2]
         self._currentValue = kwargs.get('slice', 1)
 
         self._spinSlider.setRange(minSlice, maxSlice)
+        self._slab = min(self._slab, maxSlice)
+        blocker = qtc.QSignalBlocker(self._slabSpinBox)
+        self._slabSpinBox.setRange(1, maxSlice)
+        self._slabSpinBox.setValue(self._slab)
+        del blocker
+        self.__updateSliceControls()
         if model is not None and kwargs.get('normalize', False):
-            self._imageView.setLevels(model.getMinMax())
+            # Set by __updateLevels when the first image is shown (False
+            # forces the update)
+            self.__levels = model.getMinMax()
+            self.__viewLevels = False
+        else:
+            self.__levels = None
 
+        self.__pendingValue = None
         if self._spinSlider.getValue() == self._currentValue:
             self._onSliceChanged(self._currentValue)
         else:
-            self._spinSlider.setValue(self._currentValue)
+            self.setValue(self._currentValue)
+
+    def setProjection(self, mode):
+        """
+        Show the projection of all slices instead of the current slice.
+        The projections are computed once by the model and cached.
+
+        Args:
+            mode: PROJECTION_MAX, PROJECTION_MIN, PROJECTION_MEAN,
+                  PROJECTION_SUM or None to show the slices.
+        """
+        if mode not in self.__projections:
+            raise Exception("Invalid projection: '%s'" % mode)
+        if mode is not None:
+            self.pause()
+        self._projection = mode
+        blocker = qtc.QSignalBlocker(self._projectionCombo)
+        self._projectionCombo.setCurrentIndex(self.__projections.index(mode))
+        del blocker
+        self.__updateSliceControls()
+        self._onSliceChanged(self.getValue())
+
+    def getProjection(self):
+        """ Return the projection that is shown, or None """
+        return self._projection
+
+    def setSlab(self, thickness):
+        """
+        Show the average of a slab of slices centered at the current slice.
+        Moving the slab costs a single subtraction of two cumulative sums,
+        see :meth:`SlicesModel.getSlabData
+        <datavis.models.SlicesModel.getSlabData>`.
+
+        Args:
+            thickness: (int) The number of slices of the slab, 1 to show
+                       single slices.
+        """
+        self._slab = max(1, int(thickness))
+        blocker = qtc.QSignalBlocker(self._slabSpinBox)
+        self._slabSpinBox.setValue(self._slab)
+        del blocker
+        if self._projection is None:
+            self._onSliceChanged(self.getValue())
+
+    def getSlab(self):
+        """ Return the thickness of the slab, 1 if single slices are shown
+        """
+        return self._slab
+
+    def play(self, fps=None):
+        """
+        Start showing the slices one after another, at the given frame rate.
+        The upcoming slices are loaded in a background thread. If the
+        rendering can not keep up with the frame rate, some slices are
+        dropped, so the playback keeps the requested speed.
+
+        Args:
+            fps: (float) The target frame rate. If None, the current one.
+        """
+        if fps is not None:
+            self.setFrameRate(fps)
+        if not self.isPlaying():
+            self.__restartSchedule(self.getValue())
+            self.__rateFrames = 0
+            self.__rateClock.start()
+            self.__playTimer.start()
+            self.__prefetchSlices(self.getValue())
+        self.__updatePlayButton(True)
+
+    def pause(self):
+        """ Stop showing the slices in play mode """
+        self.__playTimer.stop()
+        self.__updatePlayButton(False)
+        self.__slicePrefetcher.prefetch([])
+        self.__setFrameRate(0.0)
+
+    def isPlaying(self):
+        """ Return True if the view is in play mode """
+        return self.__playTimer.isActive()
+
+    def setFrameRate(self, fps):
+        """
+        Set the target frame rate for the play mode.
+
+        Args:
+            fps: (float) Frames per second
+        """
+        if fps <= 0:
+            raise Exception("Invalid frame rate: %s" % fps)
+        self._fps = float(fps)
+        self.__playTimer.setInterval(max(1, int(1000 / self._fps)))
+        if self.isPlaying():
+            self.__restartSchedule(self.getValue())
+
+    def getFrameRate(self):
+        """ Return the target frame rate for the play mode """
+        return self._fps
+
+    def getAchievedFrameRate(self):
+        """ Return the frame rate achieved in the last second of play mode,
+        or 0 if the view is not playing. """
+        return self.__frameRate
+
+    def getModel(self):
+        """ Return the current :class:`SlicesModel
+        <datavis.models.SlicesModel>` """
+        return self._model
+
+    def closeEvent(self, event):
+        """ Reimplemented from QWidget to stop the background loads """
+        self.__slicePrefetcher.shutdown()
+        qtw.QWidget.closeEvent(self, event)
 
     def getImageView(self):
         """
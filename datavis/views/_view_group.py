@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import PyQt5.QtCore as qtc
+
+from ._image_view import ImageView
+from ._slices_view import SlicesView
+
+
+LINK_RECT = 'rect'
+LINK_LEVELS = 'levels'
+LINK_SLICE = 'slice'
+
+
+class ImageViewGroup(qtc.QObject):
+    """ Group of linked :class:`ImageView <datavis.views.ImageView>` or
+    :class:`SlicesView <datavis.views.SlicesView>` widgets.
+
+    When the visible region (pan and zoom), the levels or the slice index
+    changes in one view, the other views are updated. The changes are not
+    applied immediately, they are coalesced and applied once per frame, so
+    only the last state is rendered when many events arrive. Hidden views are
+    not updated until they are shown again.
+
+    Example of use:
+        group = ImageViewGroup([imageView1, imageView2, imageView3])
+        group.addView(slicesView)
+    """
+    def __init__(self, views=(), parent=None, **kwargs):
+        """ Create a new ImageViewGroup.
+
+        Args:
+            views:  List of ImageView or SlicesView widgets to link.
+            parent: (QObject) The parent object.
+
+        Keyword Args:
+            pan:      (Bool) Link the visible region (pan and zoom) of the
+                      views. True by default.
+            levels:   (Bool) Link the image levels. True by default.
+            slice:    (Bool) Link the slice index of the SlicesView widgets.
+                      True by default.
+            interval: (int) Minimum time (ms) between two updates of the views.
+                      Default value: 16 (about 60 frames per second).
+        """
+        qtc.QObject.__init__(self, parent)
+        self._links = {LINK_RECT: kwargs.get('pan', True),
+                       LINK_LEVELS: kwargs.get('levels', True),
+                       LINK_SLICE: kwargs.get('slice', True)}
+        # {view: _ViewEntry}
+        self._entries = dict()
+        # Last value for each kind of link: {kind: value}
+        self._state = dict()
+        self._applying = False
+        self._timer = qtc.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(kwargs.get('interval', 16))
+        self._timer.timeout.connect(self.__applyChanges)
+
+        for view in views:
+            self.addView(view)
+
+    def __connect(self, entry, signal, kind, getValue):
+        """ Connect the signal of a view to store the new value of the given
+        kind of link. """
+        def _slot(*args):
+            if not self._applying:
+                self.__setValue(entry, kind, getValue())
+
+        signal.connect(_slot)
+        entry.slots.append((signal, _slot))
+
+    def __setValue(self, entry, kind, value):
+        """ Store the last value and schedule the update of the views """
+        self._state[kind] = value
+        for e in self._entries.values():
+            if e is not entry and e.accepts(kind):
+                e.outdated.add(kind)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def __applyChanges(self):
+        """ Apply the last state to all the outdated and visible views """
+        self._applying = True
+        try:
+            for entry in self._entries.values():
+                if entry.outdated and entry.view.isVisible():
+                    self.__applyTo(entry)
+        finally:
+            self._applying = False
+
+    def __applyTo(self, entry):
+        """ Apply the outdated values to the given view, with a single
+        repaint. """
+        imgView = entry.imageView
+        imgView.setUpdatesEnabled(False)
+        try:
+            for kind in entry.outdated:
+                value = self._state[kind]
+                if kind == LINK_RECT:
+                    imgView.setViewRect(value)
+                elif kind == LINK_LEVELS:
+                    imgView.getImageView().setLevels(*value)
+                elif kind == LINK_SLICE:
+                    entry.view.setValue(value + 1)
+        finally:
+            entry.outdated.clear()
+            imgView.setUpdatesEnabled(True)
+
+    def eventFilter(self, obj, event):
+        """ Reimplemented from QObject. Update the views when they are shown.
+        """
+        if event.type() == qtc.QEvent.Show:
+            entry = self._entries.get(obj)
+            if entry is not None and entry.outdated:
+                self._timer.start()
+        return False
+
+    def addView(self, view):
+        """ Add the given ImageView or SlicesView to the group. The view will
+        be updated with the current state of the group. """
+        if isinstance(view, SlicesView):
+            imgView = view.getImageView()
+        elif isinstance(view, ImageView):
+            imgView = view
+        else:
+            raise Exception("Invalid view for ImageViewGroup: %s" % view)
+
+        if view in self._entries:
+            return
+
+        entry = _ViewEntry(view, imgView)
+        if self._links[LINK_RECT]:
+            self.__connect(entry, imgView.getViewBox().sigRangeChanged,
+                           LINK_RECT, imgView.getViewRect)
+        if self._links[LINK_LEVELS]:
+            histogram = imgView.getImageView().ui.histogram
+            self.__connect(entry, histogram.sigLevelsChanged, LINK_LEVELS,
+                           histogram.getLevels)
+        if self._links[LINK_SLICE] and isinstance(view, SlicesView):
+            self.__connect(entry, view.sigSliceChanged, LINK_SLICE,
+                           lambda: view.getValue() - 1)
+
+        entry.outdated.update(k for k in self._state if entry.accepts(k))
+        self._entries[view] = entry
+        view.installEventFilter(self)
+        if entry.outdated:
+            self._timer.start()
+
+    def removeView(self, view):
+        """ Remove the given view from the group. """
+        entry = self._entries.pop(view, None)
+        if entry is not None:
+            view.removeEventFilter(self)
+            for signal, slot in entry.slots:
+                signal.disconnect(slot)
+
+    def getViews(self):
+        """ Return the list of views in the group. """
+        return list(self._entries.keys())
+
+
+class _ViewEntry:
+    """ Information about a view of an ImageViewGroup """
+    def __init__(self, view, imageView):
+        self.view = view
+        self.imageView = imageView
+        # (signal, slot) connected for this view
+        self.slots = []
+        # Kinds of link whose last value has not been applied to the view
+        self.outdated = set()
+
+    def accepts(self, kind):
+        """ Return True if the given kind of link applies to the view """
+        return kind != LINK_SLICE or isinstance(self.view, SlicesView)
@@ -256,7 +256,9 @@ class VolumeView(qtw.QWidget):
             if maskType == CIRCLE_ROI or maskType == RECT_ROI:
                 maskParams['data'] = int(imgView.getMaskSize() / 2)
                 maskParams['showHandles'] = False
-            else:  # TODO[hv] if mask has been edited?
+            elif imgView.isMaskModified():
+                maskParams['data'] = imgView.getCompactMask()
+            else:
                 maskParams['data'] = imgView.getMaskData()
 
             iv.setImageMask(**maskParams)
@@ -26,6 +26,10 @@ class TablePageItemModel(qtc.QAbstractItemModel):
             - parent: a parent QObject of the model (NOTE: see qtc.Qt framework)
         """
         qtc.QAbstractItemModel.__init__(self, kwargs.get('parent', None))
+        # Values computed for the current page: {(row, col, role): value}
+        self._pageCache = dict()
+        # (page, pageSize) of the values in the cache
+        self._cachePage = None
         self.setModelConfig(tableModel, tableConfig, pagingInfo)
         self._defaultFont = qtg.QFont()
         self._indexWidth = 50
@@ -57,6 +61,30 @@ class TablePageItemModel(qtc.QAbstractItemModel):
 
         return data
 
+    def __getPageCache(self):
+        """ Return the dict with the values computed for the current page.
+        The cache is cleared when the page (or the page size) changes. """
+        p = self._pagingInfo
+        page = p.currentPage, p.pageSize
+        if page != self._cachePage:
+            self._pageCache.clear()
+            self._cachePage = page
+        return self._pageCache
+
+    def _getCachedPageValue(self, row, col):
+        """ Return the value for the given column and row in the current page,
+        reading it from the TableModel only the first time. """
+        cache = self.__getPageCache()
+        key = row, col, qtc.Qt.DisplayRole
+        if key not in cache:
+            cache[key] = self._getPageValue(row, col)
+        return cache[key]
+
+    def clearCache(self):
+        """ Clear the values cached for the current page. It should be called
+        when the data of the TableModel changes. """
+        self._pageCache.clear()
+
     @qtc.pyqtSlot()
     def modelConfigChanged(self):
         """
@@ -64,12 +92,41 @@ class TablePageItemModel(qtc.QAbstractItemModel):
         model configuration changes, either the PagingInfo, TableModel
         or TableConfig.
         """
+        self.clearCache()
         self.beginResetModel()
         self.headerDataChanged.emit(qtc.Qt.Vertical, 0, 0)
         self.endResetModel()
 
+    def dataRowsChanged(self, rows, columns=None):
+        """ Emit the dataChanged signal for the given rows that are visible
+        in the current page, instead of resetting the whole model.
+
+        Args:
+            rows: Iterable over the rows (in the whole TableModel).
+            columns: Iterable over the column indexes that changed. If None,
+                all columns will be notified.
+        """
+        p = self._pagingInfo
+        first = (p.currentPage - 1) * p.pageSize
+        count = self.rowCount()
+        if columns:
+            c0, c1 = min(columns), max(columns)
+        else:
+            c0, c1 = 0, self.columnCount() - 1
+
+        if c1 < 0:
+            return
+
+        self.clearCache()
+        for row in sorted(set(rows)):
+            pageRow = row - first
+            if 0 <= pageRow < count:
+                self.dataChanged.emit(self.index(pageRow, c0),
+                                      self.index(pageRow, c1))
+
     def setModelConfig(self, tableModel, tableConfig, pagingInfo):
         """"""
+        self.clearCache()
         self._model = tableModel
         # Information related to the view configuration
         self._displayConfig = tableConfig or tableModel.createDefaultConfig()
@@ -103,27 +160,35 @@ class TablePageItemModel(qtc.QAbstractItemModel):
 
         if role == widgets.LABEL_ROLE:
             d = self._displayConfig
-            cc = d.getColumnConfig(col)
             labels = cc.getLabels()
+            cache = self.__getPageCache()
+            key = row, col, role
+            # The labels list can be modified in place, so it is cached too
+            cached = cache.get(key)
+            if cached is not None and cached[0] == labels:
+                return cached[1]
             try:
                 ret = ['%s=%s' % (d.getColumnConfig(i).getLabel(),
-                                  self._getPageValue(row, i))
+                                  self._getCachedPageValue(row, i))
                        for i in labels]
             except RuntimeError:
                 print('Error labels =', labels)
+                return []
+            cache[key] = list(labels), ret
             return ret
 
         if role == qtc.Qt.DisplayRole and t != models.TYPE_BOOL:
-            return qtc.QVariant(self._getPageValue(row, col))
+            return qtc.QVariant(self._getCachedPageValue(row, col))
 
         if role == qtc.Qt.CheckStateRole and t == models.TYPE_BOOL:
             CHECKED = qtc.Qt.Checked
-            return CHECKED if self._getPageValue(row, col) else qtc.Qt.Unchecked
+            value = self._getCachedPageValue(row, col)
+            return CHECKED if value else qtc.Qt.Unchecked
 
         if (role == qtc.Qt.EditRole or role == qtc.Qt.UserRole
                 or role == qtc.Qt.AccessibleTextRole
                 or role == qtc.Qt.AccessibleDescriptionRole):
-            return qtc.QVariant(self._getPageValue(row, col))
+            return qtc.QVariant(self._getCachedPageValue(row, col))
 
         if role == qtc.Qt.SizeHintRole and cc[models.RENDERABLE]:
             return self._iconSize or qtc.QSize(50, 50)
@@ -254,6 +319,7 @@ class TablePageItemModel(qtc.QAbstractItemModel):
         """
         Sets the config how we want to display the data
         """
+        self.clearCache()
         self._displayConfig = config
 
     # TODO: We need to check about the sorting in the TableModel
@@ -1,5 +1,9 @@
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from math import cos, sin
+
+import numpy as np
 from numpy import pi
 
 import PyQt5.QtCore as qtc
@@ -11,7 +15,9 @@ import qtawesome as qta
 
 
 from datavis.widgets import (TriggerAction, OnOffAction, FormWidget)
-from datavis.models import (TableConfig, ImageModel)
+from datavis.models import (TableConfig, ImageModel, CoordinatesIndex,
+                            PARAM_SCORE_THRESHOLD, PARAM_TYPE_BUTTON)
+from datavis.utils import Prefetcher
 
 from ._image_view import ImageView, PenROI
 from ._columns import ColumnsView
@@ -40,6 +46,10 @@ class PickerView(qtw.QWidget):
     """ Signal emitted when any of the PickerModel parameters have changed. """
     sigPickerParamChanged = qtc.pyqtSignal(int, str, object)
 
+    # Emitted from the worker thread when the param changes were applied
+    # (micId, result)
+    _sigParamsApplied = qtc.pyqtSignal(object, object)
+
     def __init__(self, model, **kwargs):
         """
         Construct an PickerView instance
@@ -55,6 +65,21 @@ class PickerView(qtw.QWidget):
                         DEFAULT_MODE.
             shape:     (int) The initial shape type: SHAPE_RECT, SHAPE_CIRCLE,
                        SHAPE_CENTER, SHAPE_SEGMENT.
+            prefetch:  (int) Number of micrographs before and after the
+                       current one that will be loaded in background
+                       (0 by default, disabled). If enabled, the model
+                       methods getData, getMicrographMask and getImageInfo
+                       will be called from a worker thread, so they should
+                       be thread-safe.
+            paramsDelay: (int) Milliseconds to wait for more changes in the
+                         picker params before calling the model changeParam.
+                         Only the last value of each param is used. Button
+                         params are applied without waiting.
+            paramsWorker: (boolean) If True, changeParam is called from a
+                          worker thread, so the GUI is not blocked while the
+                          model applies the changes. The model must be
+                          thread-safe (see PickerModel.changeParam).
+                          False by default.
             The :class:`ImageView <datavis.views.ImageView>` kwargs
 
         """
@@ -68,7 +93,22 @@ class PickerView(qtw.QWidget):
         self._roiCentered = kwargs.get("roiCentered", True)
 
         self._currentMic = None
+        self._currentRow = -1
         self._currentImageDim = None
+        self._prefetch = kwargs.get('prefetch', 0)
+        # Cache for the (data, mask, info) of the current micrograph and the
+        # neighbours that are loaded in background
+        self.__micPrefetcher = Prefetcher(self.__loadMicrograph,
+                                          maxSize=2 * self._prefetch + 2)
+        # Embedded views are not closed, so the workers are also stopped when
+        # the view is destroyed
+        self.__setupParamsWorker(kwargs.get('paramsDelay', 150),
+                                 kwargs.get('paramsWorker', False))
+        prefetcher = self.__micPrefetcher
+        executor = self.__paramsExecutor
+        self.destroyed.connect(lambda *args: (
+            prefetcher.shutdown(),
+            executor is not None and executor.shutdown(wait=False)))
         self.__segmentROI = None
         self.__mousePressed = False
 
@@ -142,6 +182,11 @@ class PickerView(qtw.QWidget):
         """ Setup the ERASE objects """
         self.__eraseList = []
         self.__eraseSize = 300
+        # Spatial index over the displayed coordinates, built when an erase
+        # stroke starts (see __eraseRoiChanged)
+        self.__eraseIndex = None
+        self.__eraseHandlers = []
+        self.__erased = None
 
         roi = PenROI((0, 0), self.__eraseSize,
                      pen=pg.mkPen(color="FFF", width=1, dash=[2, 2, 2]))
@@ -310,6 +355,10 @@ class PickerView(qtw.QWidget):
             fw = None
 
         self.__formWidget = fw
+        if pickerParams is not None:
+            self.__buttonParams = {p.name for params in pickerParams
+                                   for p in params
+                                   if p.type == PARAM_TYPE_BUTTON}
         sh = gLayout.totalSizeHint()
         boxPanel.setFixedHeight(sh.height())
         toolbar.setPanelMinSize(sh.width())
@@ -318,14 +367,178 @@ class PickerView(qtw.QWidget):
                           checked=True)
         # End-picker operations
 
+    def __setupParamsWorker(self, delay, worker):
+        """ Setup the objects used to apply the picker-param changes,
+        optionally in a worker thread.
+        """
+        # Changes not applied yet: {paramName: value}, for the micrograph
+        # that was shown when they were made
+        self.__pendingParams = OrderedDict()
+        self.__pendingMicId = None
+        # Names of the button params, that are not delayed
+        self.__buttonParams = set()
+        self.__paramsRunning = False
+        # True from the first change until all the changes are applied. The
+        # actions that read or modify the coordinates (or change the current
+        # micrograph) are blocked or queued while it is set.
+        self.__paramsBusy = False
+        # Row selected while the changes were applied, shown when they finish
+        self.__pendingRow = None
+        # True if the ROIs should be created again when the changes finish
+        self.__roisOutdated = False
+        # Mouse buttons accepted by the ROI items before they were locked
+        self.__roiButtons = dict()
+        # Merged results of the changes applied while newer ones arrived
+        self.__paramsResult = self._model.Result()
+        self.__paramsExecutor = (ThreadPoolExecutor(max_workers=1)
+                                 if worker else None)
+        self.__paramsTimer = qtc.QTimer(self)
+        self.__paramsTimer.setSingleShot(True)
+        self.__paramsTimer.setInterval(delay)
+        self.__paramsTimer.timeout.connect(self.__applyParamChanges)
+        self._sigParamsApplied.connect(self.__onParamsApplied)
+
     def __onPickerParamChanged(self, paramName, value):
         """ Invoked when a picker-param value is changed """
         micId = self._currentMic.getId()
         self.sigPickerParamChanged.emit(micId, paramName, value)
-        result = self._model.changeParam(micId, paramName, value,
-                                         self.__formWidget.getParamValues)
+
+        if paramName == PARAM_SCORE_THRESHOLD and not self.__paramsRunning:
+            # The score threshold is a lookup in the model score indexes,
+            # so it can be applied right away
+            self.__pendingParams.pop(paramName, None)
+            self.__handleModelResult(self._model.changeParam(
+                micId, paramName, value, self.__formWidget.getParamValues))
+            return
+
+        # Only the last value of each param will be applied, to the
+        # micrograph shown now. Changing the micrograph is deferred until
+        # the changes are applied.
+        self.__pendingParams[paramName] = value
+        self.__pendingMicId = micId
+        self.__setParamsBusy(True)
+        if paramName in self.__buttonParams:
+            self.__paramsTimer.stop()
+            self.__applyParamChanges()
+        else:
+            self.__paramsTimer.start()
+
+    def __setParamsBusy(self, busy):
+        """ Show or hide the busy state while the param changes are
+        applied by the model.
+        """
+        if busy != self.__paramsBusy:
+            self.__paramsBusy = busy
+            self._spinBoxBoxSize.setEnabled(not busy)
+            self.__lockRois(busy)
+            if busy:
+                qtw.QApplication.setOverrideCursor(qtc.Qt.BusyCursor)
+            else:
+                qtw.QApplication.restoreOverrideCursor()
+
+    def __lockRois(self, locked):
+        """ Disable or restore the mouse interaction with the ROIs (and their
+        handles), so they can not be moved while the coordinates are being
+        changed by the model. """
+        if locked:
+            for h in self._roiList:
+                roi = h.getROI()
+                items = [roi]
+                if isinstance(roi, pg.ROI):
+                    items.extend(roi.getHandles())
+                for item in items:
+                    self.__roiButtons[item] = item.acceptedMouseButtons()
+                    item.setAcceptedMouseButtons(qtc.Qt.NoButton)
+        else:
+            for item, buttons in self.__roiButtons.items():
+                item.setAcceptedMouseButtons(buttons)
+            self.__roiButtons.clear()
+
+    @qtc.pyqtSlot()
+    def __applyParamChanges(self):
+        """ Apply the pending param changes (in the worker thread if it is
+        enabled), unless the worker is still applying previous ones.
+        """
+        if self.__paramsRunning or not self.__pendingParams:
+            return
+
+        params = list(self.__pendingParams.items())
+        micId = self.__pendingMicId
+        self.__pendingParams.clear()
+        # The widgets can not be accessed from the worker thread
+        values = self.__formWidget.getParamValues()
+        self.__paramsRunning = True
+        self.__setParamsBusy(True)
+        if self.__paramsExecutor is None:
+            self.__onParamsApplied(
+                micId, self.__runParamChanges(micId, params, values))
+        else:
+            self.__paramsExecutor.submit(self.__runParamChangesInWorker,
+                                         micId, params, values)
+
+    def __runParamChanges(self, micId, params, values):
+        """ Apply the param changes in the model.
+
+        Returns:
+            The merged Result or the exception raised by the model.
+        """
+        try:
+            result = self._model.Result()
+            for paramName, value in params:
+                result.merge(self._model.changeParam(micId, paramName, value,
+                                                     lambda: dict(values)))
+        except Exception as ex:
+            result = ex
+        return result
+
+    def __runParamChangesInWorker(self, micId, params, values):
+        """ Apply the param changes in the worker thread and notify the
+        GUI thread. """
+        self._sigParamsApplied.emit(
+            micId, self.__runParamChanges(micId, params, values))
+
+    @qtc.pyqtSlot(object, object)
+    def __onParamsApplied(self, micId, result):
+        """ Invoked in the GUI thread when the worker finished applying the
+        param changes to the given micrograph.
+        """
+        self.__paramsRunning = False
+
+        if isinstance(result, Exception):
+            self._showError(str(result))
+        elif self._currentMic is None or micId != self._currentMic.getId():
+            # The micrograph is not shown anymore, only refresh its row
+            self.__micPrefetcher.invalidate(micId)
+            self.__handleModelResult(self._model.Result(
+                tableModelChanged=result.tableModelChanged,
+                changedMicIds=result.changedMicIds,
+                changedColumns=result.changedColumns))
+        else:
+            self.__paramsResult.merge(result)
+
+        if self.__pendingParams:
+            # This result is already stale, the GUI will be refreshed when
+            # the newer changes are applied
+            if not self.__paramsTimer.isActive():
+                self.__applyParamChanges()
+            return
+
+        result = self.__paramsResult
+        self.__paramsResult = self._model.Result()
+        self.__setParamsBusy(False)
+
+        if result.currentMicChanged:
+            # The micrographs data might be different after the change
+            self.__micPrefetcher.invalidate()
+        elif self.__roisOutdated:
+            result.currentCoordsChanged = True
+        self.__roisOutdated = False
         self.__handleModelResult(result)
 
+        if self.__pendingRow is not None:
+            row, self.__pendingRow = self.__pendingRow, None
+            self.__onCurrentRowChanged(row)
+
     def __addControlsAction(self, toolbar):
         """
         Add the controls actions to the given toolBar
@@ -434,7 +647,8 @@ class PickerView(qtw.QWidget):
     def _onRoiDoubleClick(self, roi):
         """ Invoked when the mouse is double-clicked on a roi. Used to remove
         the corresponding Coordinate """
-        if self._clickAction == PICK and not self._readOnly:
+        if (self._clickAction == PICK and not self._readOnly
+                and not self.__paramsBusy):
             self.__removeCoordinates([roi])
 
     def _createRoiHandlers(self, coords=None, clear=True):
@@ -451,6 +665,7 @@ class PickerView(qtw.QWidget):
         if clear:
             self._roiList[:] = []
 
+        self.__eraseIndex = None
         if coords is None:
             coords = self._model.iterCoordinates(self._currentMic.getId())
 
@@ -495,14 +710,25 @@ class PickerView(qtw.QWidget):
             roi = roiHandler.getROI()
             roiHandler.disconnectSignals(roi)
             viewBox.removeItem(roi)
-            self._roiList.remove(roi.parent)  # remove the coordROI
+
+        # remove the coordROIs in a single pass
+        removed = set(roiHandlerList)
+        self._roiList[:] = [h for h in self._roiList if h not in removed]
+        self.__eraseIndex = None
 
     def __removeCoordinates(self, roiList):
         """ Remove all coordinates contained in the given roi list """
+        if self.__paramsBusy:
+            # The model is changing the coordinates, undo the erase stroke
+            for roi in roiList:
+                roi.setVisible(self._actionPickShowHide.get())
+            self.__eraseIndex = None
+            return
 
+        micId = self._currentMic.getId()
         result = self._model.removeCoordinates(
-            self._currentMic.getId(), [roi.coordinate for roi in roiList])
-        result.tableModelChanged = True
+            micId, [roi.coordinate for roi in roiList])
+        self.__setMicRowChanged(result, micId)
         self._destroyRoiHandlers([roi.parent for roi in roiList])
         self.__handleModelResult(result)
 
@@ -535,13 +761,34 @@ class PickerView(qtw.QWidget):
         self._destroyRoiHandlers()
         self._imageView.clear()
         micId = self._currentMic.getId()
-        imgModel = ImageModel(self._model.getData(micId))
+        data, mask, info = self.__micPrefetcher.get(micId)
+        imgModel = ImageModel(data)
         self._imageView.setModel(imgModel, fitToSize)
         self._imageView.setImageMask(
-            type=DATA, data=self._model.getMicrographMask(micId),
+            type=DATA, data=mask,
             color=self._model.getMicrographMaskColor(micId))
-        self._imageView.setImageInfo(**self._model.getImageInfo(micId))
+        self._imageView.setImageInfo(**info)
         self._createRoiHandlers()
+        self.__prefetchMicrographs()
+
+    def __loadMicrograph(self, micId):
+        """ Return the (data, mask, info) of the given micrograph. This method
+        is called from the prefetch worker thread.
+        """
+        return (self._model.getData(micId),
+                self._model.getMicrographMask(micId),
+                self._model.getImageInfo(micId))
+
+    def __prefetchMicrographs(self):
+        """ Load in background the micrographs around the current row,
+        starting with the closest ones.
+        """
+        row, size = self._currentRow, self._model.getRowsCount()
+        rows = [row + d * i for i in range(1, self._prefetch + 1)
+                for d in (1, -1)]
+        self.__micPrefetcher.prefetch(
+            self._model.getMicrographByIndex(r).getId()
+            for r in rows if 0 <= r < size)
 
     def _updateROIs(self, clear=False):
         """
@@ -580,7 +827,8 @@ class PickerView(qtw.QWidget):
         (ImageView contains a ViewBox).
         """
         pick = event.button() == qtc.Qt.LeftButton and self._clickAction == PICK
-        if self._readOnly or not pick:
+        # Do not modify the coordinates while the model is changing them
+        if self._readOnly or not pick or self.__paramsBusy:
             return
 
         if self._currentMic is None:
@@ -603,9 +851,9 @@ class PickerView(qtw.QWidget):
             coordList = [self._model.createCoordinate(
                 x, y, label=self.__currentLabelName, **kwargs)]
             self._createRoiHandlers(coords=coordList, clear=False)
-            result = self._model.addCoordinates(self._currentMic.getId(),
-                                                coordList)
-            result.tableModelChanged = True
+            micId = self._currentMic.getId()
+            result = self._model.addCoordinates(micId, coordList)
+            self.__setMicRowChanged(result, micId)
             self.__handleModelResult(result)
 
         if self.__pickerMode == DEFAULT_MODE:
@@ -628,7 +876,11 @@ class PickerView(qtw.QWidget):
 
     def _updateBoxSize(self, newBoxSize):
         """ Update the box size to be used. """
-        if newBoxSize != self._model.getBoxSize():
+        if self.__paramsBusy:
+            blocker = qtc.QSignalBlocker(self._spinBoxBoxSize)
+            self._spinBoxBoxSize.setValue(self._model.getBoxSize())
+            del blocker
+        elif newBoxSize != self._model.getBoxSize():
             self._model.setBoxSize(newBoxSize)
             self._updateROIs(False)
             self.__eraseROIText.setVisible(False)
@@ -711,8 +963,11 @@ class PickerView(qtw.QWidget):
                         return
                     self.__mousePressed = False
                     if self._clickAction == ERASE:
-                        self.__removeCoordinates(self.__eraseList)
+                        # Commit all erased coordinates in one batch
+                        if self.__eraseList:
+                            self.__removeCoordinates(self.__eraseList)
                         self.__eraseList = []
+                        self.__eraseIndex = None
                     else:
                         self.__eraseROIText.setVisible(False)
 
@@ -771,12 +1026,26 @@ class PickerView(qtw.QWidget):
                     self.__updateFilemantText(-angle, d.x(), self.__segPos)
                     self.__eraseROIText.setVisible(True)
 
+    def __setMicRowChanged(self, result, micId):
+        """ Make sure that the row of the given micrograph will be updated,
+        if the model did not notify any change in the table.
+        """
+        if not result.tableModelChanged:
+            result.tableModelChanged = True
+            result.changedMicIds = {micId}
+
     def __handleModelResult(self, result):
         """ Refresh different components depending on the result
         from the action of the model.
         """
         if result.tableModelChanged:
-            self._cvImages.updatePage()
+            if result.changedMicIds is None:
+                self._cvImages.updatePage()
+            else:
+                self._cvImages.updateRows(
+                    [self._model.getMicrographIndex(micId)
+                     for micId in result.changedMicIds],
+                    result.changedColumns)
 
         if result.currentMicChanged:
             self._showMicrograph()  # This already update coordiantes
@@ -787,7 +1056,10 @@ class PickerView(qtw.QWidget):
     def __onPickShapeChanged(self, newShape):
         """ Update the current selected shape type """
         self._shape = newShape
-        self._updateROIs(clear=True)  # FIXME: Change for updateShape???
+        if self.__paramsBusy:
+            self.__roisOutdated = True
+        else:
+            self._updateROIs(clear=True)  # FIXME: Change for updateShape???
 
     @qtc.pyqtSlot()
     def __onPickTriggered(self):
@@ -829,10 +1101,16 @@ class PickerView(qtw.QWidget):
     def __onCurrentRowChanged(self, row):
         """ Invoked when current row change in micrographs list.
         Show the new micrograph """
+        if self.__paramsBusy:
+            # Shown when the model finishes changing the current micrograph
+            self.__pendingRow = row
+            return
+
         mic = self._model.getMicrographByIndex(row)
         try:
             if mic != self._currentMic:
                 self._currentMic = mic
+                self._currentRow = row
                 self._currentImageDim = None
                 result = self._model.selectMicrograph(mic.getId())
                 self.__handleModelResult(result)
@@ -869,35 +1147,36 @@ class PickerView(qtw.QWidget):
         Show the roi handles """
         self.__showHandlers(roi, roi.mouseHovering)
 
+    def __createEraseIndex(self):
+        """ Build the spatial index over the coordinates that are currently
+        displayed. The erased ROIs will be only hidden until the stroke
+        finishes, so the index remains valid during the whole stroke.
+        """
+        self.__eraseHandlers = list(self._roiList)
+        self.__eraseIndex = CoordinatesIndex(
+            h.getCoord() for h in self.__eraseHandlers)
+        self.__erased = np.zeros(len(self.__eraseHandlers), dtype=bool)
+
     @qtc.pyqtSlot(object)
     def __eraseRoiChanged(self, eraseRoi):
         """ Handler invoked when the erase roi is moved. """
         self.__eraseROIText.setVisible(False)
-        viewBox = self._imageView.getViewBox()
-        scene = viewBox.scene()
+        if self.__paramsBusy:
+            return
+        if self.__eraseIndex is None:
+            self.__createEraseIndex()
+
         pos = self.__eraseROI.pos()
-        size = self.__eraseROI.size()
-        shape = qtg.QPainterPath()
-        shape.addEllipse(pos.x(), pos.y(), size[0], size[1])
-        scene.setSelectionArea(viewBox.mapViewToScene(shape),
-                               qtc.Qt.IntersectsItemShape)
-        items = scene.selectedItems()
-        for item in items:
-            if (not item == self.__eraseROI and item.isVisible() and
-                    (isinstance(item, CircleROI) or
-                     isinstance(item, pg.ROI) or
-                     isinstance(item, pg.ScatterPlotItem))):
-                pos = item.pos()
-                if not isinstance(item, pg.ScatterPlotItem):
-                    size = item.size()
-                    pos += size / 2
-                    rem = False
-                else:
-                    rem = True
+        r = self.__eraseROI.size()[0] / 2
+        indexes = self.__eraseIndex.findInCircle(pos.x() + r, pos.y() + r, r)
+        indexes = indexes[~self.__erased[indexes]]
+        self.__erased[indexes] = True
 
-                if rem or shape.contains(pos):
-                    item.setVisible(False)
-                    self.__eraseList.append(item)
+        for i in indexes:
+            roi = self.__eraseHandlers[i].getROI()
+            if roi.isVisible():
+                roi.setVisible(False)
+                self.__eraseList.append(roi)
 
     @qtc.pyqtSlot(object)
     def _roiRegionChanged(self, roi):
@@ -906,6 +1185,8 @@ class PickerView(qtw.QWidget):
         For example when the user stops dragging the ROI
         (or one of its handles) or if the ROI is changed programatically.
         """
+        if self.__paramsBusy:
+            return
         if self.__pickerMode == DEFAULT_MODE:
             pos = roi.pos()
             size = roi.size()
@@ -924,6 +1205,8 @@ class PickerView(qtw.QWidget):
            When the user stops dragging the ROI (or one of its handles)
            or if the ROI is changed programatically.
         """
+        if self.__paramsBusy:
+            return
         if self.__pickerMode == DEFAULT_MODE:
             pos = roi.pos()
             size = roi.size()
@@ -943,6 +1226,15 @@ class PickerView(qtw.QWidget):
                     self._spinBoxBoxSize.setValue(width)
                     self._boxSizeEditingFinished()
 
+    def closeEvent(self, event):
+        """ Reimplemented from QWidget to stop the background loads and
+        the worker that applies the param changes """
+        self.__micPrefetcher.shutdown()
+        self.__paramsTimer.stop()
+        if self.__paramsExecutor is not None:
+            self.__paramsExecutor.shutdown(wait=False)
+        qtw.QWidget.closeEvent(self, event)
+
     def getPreferredSize(self):
         """
         Returns a tuple (width, height), which represents the preferred
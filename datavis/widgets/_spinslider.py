@@ -114,6 +114,10 @@ class SpinSlider(qtw.QWidget):
         """ Invoked when the slider is released """
         self.sigSliderReleased.emit()
 
+    def isSliderDown(self):
+        """ Return True if the slider is being dragged by the user. """
+        return self._slider.isSliderDown()
+
     def getValue(self):
         """ Return the current value.
         (Same in both the slider and the spinbox).